@@ -1,8 +1,34 @@
+import asyncio
 from abc import ABC, abstractmethod
-from collections.abc import Iterator
+from collections.abc import AsyncIterator, Iterator
 
+_EXHAUSTED = object()
+
+
+async def iterate_in_executor(iterator: Iterator[str]) -> AsyncIterator[str]:
+    """Drive a blocking iterator from the event loop, running each step in the default executor."""
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            item = await loop.run_in_executor(None, next, iterator, _EXHAUSTED)
+            if item is _EXHAUSTED:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            await loop.run_in_executor(None, close)
+
+
+class AsyncCommandApp(ABC):
+    """A command the bot drives through ``handle_async()``; apps whose I/O is all async subclass this directly."""
+
+    # When True, each string the handler yields is a fragment of a single reply (not a message of its own),
+    # and the bot shows it growing by editing one Signal message.
+    stream_edits = False
+    # When True, the sender sees a typing indicator for as long as the handler is still producing.
+    typing_indicator = False
 
-class CommandApp(ABC):
     @property
     @abstractmethod
     def name(self) -> str: ...
@@ -11,5 +37,17 @@ class CommandApp(ABC):
     @abstractmethod
     def description(self) -> str: ...
 
+    @abstractmethod
+    def handle_async(self, args: str, sender: str = "") -> AsyncIterator[str]: ...
+
+
+class CommandApp(AsyncCommandApp):
+    """A command with a blocking ``handle()``, which the bot runs off the event loop."""
+
     @abstractmethod
     def handle(self, args: str, sender: str = "") -> Iterator[str]: ...
+
+    async def handle_async(self, args: str, sender: str = "") -> AsyncIterator[str]:
+        # Apps with native async I/O override this; the default runs the blocking handle() off the event loop.
+        async for response in iterate_in_executor(self.handle(args, sender=sender)):
+            yield response
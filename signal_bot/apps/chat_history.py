@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+_BLOCK_SIZE = 8192
+
+
+class ChatHistory:
+    """Per-sender chat messages as append-only JSON Lines in ``<directory>/<sender>.jsonl``.
+
+    Each exchange appends its messages, and only the last ``max_messages``
+    are read back. Once a file holds twice that many lines it is compacted
+    to the most recent ``max_messages``.
+    """
+
+    def __init__(self, directory: Path | str, max_messages: int = 100) -> None:
+        if max_messages < 1:
+            raise ValueError("max_messages must be at least 1")
+        self.directory = Path(directory)
+        self.max_messages = max_messages
+        self._lock = threading.Lock()
+        # Lines in each sender's file, counted the first time it is appended to.
+        self._line_counts: dict[str, int] = {}
+
+    def tail(self, sender: str) -> list[dict]:
+        self._migrate(sender)
+        path = self._path(sender)
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return []
+        with f:
+            lines = _read_tail(f, self.max_messages)
+        return [json.loads(line) for line in lines]
+
+    def append(self, sender: str, messages: list[dict]) -> None:
+        self._migrate(sender)
+        path = self._path(sender)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            count = self._line_count(sender)
+            with open(path, "a") as f:
+                f.write("".join(json.dumps(message) + "\n" for message in messages))
+            count += len(messages)
+            if count >= 2 * self.max_messages:
+                self._compact(sender)
+                count = self.max_messages
+            self._line_counts[sender] = count
+
+    def clear(self, sender: str) -> None:
+        with self._lock:
+            self._line_counts.pop(sender, None)
+            for path in (self._path(sender), self._legacy_path(sender)):
+                if path.exists():
+                    path.unlink()
+
+    def _path(self, sender: str) -> Path:
+        return self.directory / f"{sender}.jsonl"
+
+    def _legacy_path(self, sender: str) -> Path:
+        return self.directory / f"{sender}.json"
+
+    def _line_count(self, sender: str) -> int:
+        count = self._line_counts.get(sender)
+        if count is None:
+            try:
+                with open(self._path(sender), "rb") as f:
+                    count = sum(1 for _ in f)
+            except FileNotFoundError:
+                count = 0
+        return count
+
+    def _compact(self, sender: str) -> None:
+        path = self._path(sender)
+        with open(path, "rb") as f:
+            lines = _read_tail(f, self.max_messages)
+        tmp = path.with_name(f".{path.name}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(b"".join(line + b"\n" for line in lines))
+        os.replace(tmp, path)
+
+    def _migrate(self, sender: str) -> None:
+        # History used to be one JSON array, rewritten in full after every reply.
+        legacy = self._legacy_path(sender)
+        if not legacy.exists():
+            return
+        with self._lock:
+            if not legacy.exists():
+                return
+            messages = json.loads(legacy.read_text())[-self.max_messages:]
+            path = self._path(sender)
+            tmp = path.with_name(f".{path.name}.tmp")
+            with open(tmp, "w") as f:
+                f.writelines(json.dumps(message) + "\n" for message in messages)
+            os.replace(tmp, path)
+            legacy.unlink()
+            self._line_counts[sender] = len(messages)
+
+
+def _read_tail(f, count: int) -> list[bytes]:
+    """Return the last ``count`` non-empty lines of binary file ``f``, reading backwards from the end."""
+    f.seek(0, os.SEEK_END)
+    position = f.tell()
+    data = b""
+    while position > 0 and data.count(b"\n") <= count:
+        step = min(_BLOCK_SIZE, position)
+        position -= step
+        f.seek(position)
+        data = f.read(step) + data
+    lines = [line for line in data.split(b"\n") if line.strip()]
+    if position > 0:
+        # The first line may have been cut off at the block boundary.
+        lines = lines[1:]
+    return lines[-count:]
+
+
+def approx_tokens(message: dict) -> int:
+    """Rough token count for a chat message: about four characters per token, plus per-message overhead."""
+    return len(message.get("content", "")) // 4 + 4
+
+
+def context_window(messages: list[dict], budget: int) -> int:
+    """Return the index where the most recent ``messages`` that fit in ``budget`` tokens start.
+
+    The last message is always kept, even on its own over budget, and the
+    window never starts with an assistant reply cut off from its prompt.
+    """
+    start = len(messages)
+    used = 0
+    while start > 0:
+        cost = approx_tokens(messages[start - 1])
+        if used + cost > budget and start < len(messages):
+            break
+        used += cost
+        start -= 1
+    while start < len(messages) - 1 and messages[start].get("role") == "assistant":
+        start += 1
+    return start
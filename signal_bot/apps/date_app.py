@@ -1,4 +1,6 @@
 import json
+import os
+import threading
 from collections.abc import Iterator
 from datetime import datetime, timezone
 from pathlib import Path
@@ -6,14 +8,53 @@ from zoneinfo import ZoneInfo
 from geopy.geocoders import Nominatim
 from timezonefinder import TimezoneFinder
 from signal_bot.app_interface import CommandApp
+from signal_bot.apps.gazetteer import Gazetteer
+from signal_bot.apps.geocode_cache import GeocodeCache
+from signal_bot.apps.timezone_grid import TimezoneGrid, grid_supported
 
 
 class DateApp(CommandApp):
-    def __init__(self, data_dir: Path | str | None = None) -> None:
+    def __init__(
+        self,
+        data_dir: Path | str | None = None,
+        cache_size: int = 1000,
+        negative_ttl: float = 86400,
+        gazetteer: Gazetteer | None = None,
+    ) -> None:
         self._geolocator = Nominatim(user_agent="signal-bot-date-app")
-        self._tf = TimezoneFinder()
+        self._gazetteer = gazetteer
         self._data_dir = Path(data_dir) if data_dir is not None else None
-        self._defaults: dict[str, str] = self._load_defaults()
+        self._finders = threading.local()
+        self._tz_grid: TimezoneGrid | None = None
+        self._tz_grid_lock = threading.Lock()
+        self._defaults: dict[str, dict[str, str]] = self._load_defaults()
+        # Guards _defaults and its file; timezone lookups happen outside it.
+        self._defaults_lock = threading.Lock()
+        cache_path = self._data_dir / "date_geocode_cache.json" if self._data_dir is not None else None
+        self._cache = GeocodeCache(cache_path, max_entries=cache_size, negative_ttl=negative_ttl)
+
+    def _finder(self) -> TimezoneFinder:
+        # Built on first use, memory-mapped rather than read into RAM, and one per thread
+        # because TimezoneFinder instances are not thread-safe.
+        finder = getattr(self._finders, "finder", None)
+        if finder is None:
+            finder = self._finders.finder = TimezoneFinder(in_memory=False)
+        return finder
+
+    def _grid(self) -> TimezoneGrid | None:
+        # Like the finder, the grid (a file and its mapping, or a 13 MB array) is only built on first use.
+        if self._tz_grid is None and grid_supported():
+            with self._tz_grid_lock:
+                if self._tz_grid is None:
+                    path = self._data_dir / "tz_grid.bin" if self._data_dir is not None else None
+                    self._tz_grid = TimezoneGrid(self._finder, path)
+        return self._tz_grid
+
+    def close(self) -> None:
+        with self._tz_grid_lock:
+            if self._tz_grid is not None:
+                self._tz_grid.close()
+                self._tz_grid = None
 
     @property
     def name(self) -> str:
@@ -32,7 +73,7 @@ class DateApp(CommandApp):
             yield self._date_for_city(stripped)
             return
         if sender in self._defaults:
-            yield self._date_for_city(self._defaults[sender])
+            yield self._date_for_default(sender)
             return
         yield self._format_utc()
 
@@ -41,48 +82,90 @@ class DateApp(CommandApp):
             return None
         return self._data_dir / "date_defaults.json"
 
-    def _load_defaults(self) -> dict[str, str]:
+    def _load_defaults(self) -> dict[str, dict[str, str]]:
         path = self._defaults_path()
         if path is None or not path.exists():
             return {}
         with open(path) as f:
-            return json.load(f)
+            raw = json.load(f)
+        # Older files map sender -> location string; their timezone is resolved on first use.
+        return {
+            sender: value if isinstance(value, dict) else {"location": value, "name": _city_name(value)}
+            for sender, value in raw.items()
+        }
 
     def _save_defaults(self) -> None:
         path = self._defaults_path()
         if path is None:
             return
         path.parent.mkdir(parents=True, exist_ok=True)
-        with open(path, "w") as f:
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
             json.dump(self._defaults, f)
+        os.replace(tmp, path)
 
     def _set_default(self, location: str, sender: str) -> str:
         tz_name = self._lookup_timezone(location)
         if tz_name is None:
             return f"Could not find location: {location}"
-        city = location.split(",")[0].strip()
-        self._defaults[sender] = location
-        self._save_defaults()
+        city = _city_name(location)
+        with self._defaults_lock:
+            self._defaults[sender] = {"location": location, "name": city, "tz": tz_name}
+            self._save_defaults()
         return f"Default set to {city}."
 
+    def _date_for_default(self, sender: str) -> str:
+        with self._defaults_lock:
+            default = dict(self._defaults[sender])
+        if "tz" not in default:
+            tz_name = self._lookup_timezone(default["location"])
+            if tz_name is None:
+                return f"Could not find location: {default['location']}"
+            default["tz"] = tz_name
+            with self._defaults_lock:
+                if self._defaults.get(sender, {}).get("location") == default["location"]:
+                    self._defaults[sender] = default
+                    self._save_defaults()
+        return self._format_local(default["name"], default["tz"])
+
     def _date_for_city(self, location: str) -> str:
         tz_name = self._lookup_timezone(location)
         if tz_name is None:
             return f"Could not find location: {location}"
-        city = location.split(",")[0].strip()
-        tz = ZoneInfo(tz_name)
-        now = datetime.now(tz)
+        return self._format_local(_city_name(location), tz_name)
+
+    def _format_local(self, city: str, tz_name: str) -> str:
+        now = datetime.now(ZoneInfo(tz_name))
         return f"{city}: {now.strftime('%A %Y-%m-%d %H:%M:%S %Z')}"
 
     def _lookup_timezone(self, location: str) -> str | None:
+        cached = self._cache.get(location)
+        if cached is not None:
+            return cached.timezone
+        if self._gazetteer is not None:
+            entry = self._gazetteer.lookup(location)
+            if entry is not None:
+                return entry.timezone
         try:
             result = self._geolocator.geocode(location)
         except Exception:
+            # Network trouble says nothing about the location, so it isn't cached.
             return None
         if result is None:
+            self._cache.put_miss(location)
             return None
-        return self._tf.timezone_at(lng=result.longitude, lat=result.latitude)
+        grid = self._grid()
+        if grid is not None:
+            tz_name = grid.timezone_at(result.latitude, result.longitude)
+        else:
+            tz_name = self._finder().timezone_at(lng=result.longitude, lat=result.latitude)
+        self._cache.put(location, result.latitude, result.longitude, tz_name)
+        return tz_name
 
     def _format_utc(self) -> str:
         now = datetime.now(timezone.utc)
         return f"UTC: {now.strftime('%A %Y-%m-%d %H:%M:%S %Z')}"
+
+
+def _city_name(location: str) -> str:
+    return location.split(",")[0].strip()
@@ -0,0 +1,170 @@
+import logging
+import mmap
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from signal_bot.apps.geocode_cache import normalise_location
+
+logger = logging.getLogger(__name__)
+
+# Longest run of index lines scanned when resolving a prefix.
+_PREFIX_SCAN_LIMIT = 200
+_MIN_PREFIX_LENGTH = 3
+
+# GeoNames publishes all country names in countryInfo.txt; these cover common names and aliases
+# (UK for GB, the home nations, ...) when that file isn't next to the cities dump.
+COUNTRY_ALIASES = {
+    "uk": "GB", "united kingdom": "GB", "great britain": "GB", "britain": "GB",
+    "england": "GB", "scotland": "GB", "wales": "GB", "northern ireland": "GB",
+    "usa": "US", "united states": "US", "united states of america": "US", "america": "US",
+    "holland": "NL", "the netherlands": "NL", "netherlands": "NL",
+    "argentina": "AR", "australia": "AU", "austria": "AT", "belgium": "BE", "brazil": "BR",
+    "bulgaria": "BG", "canada": "CA", "chile": "CL", "china": "CN", "colombia": "CO",
+    "croatia": "HR", "czechia": "CZ", "czech republic": "CZ", "denmark": "DK", "egypt": "EG",
+    "estonia": "EE", "finland": "FI", "france": "FR", "germany": "DE", "greece": "GR",
+    "hungary": "HU", "iceland": "IS", "india": "IN", "indonesia": "ID", "ireland": "IE",
+    "israel": "IL", "italy": "IT", "japan": "JP", "kenya": "KE", "latvia": "LV",
+    "lithuania": "LT", "luxembourg": "LU", "malaysia": "MY", "mexico": "MX", "morocco": "MA",
+    "new zealand": "NZ", "nigeria": "NG", "norway": "NO", "pakistan": "PK", "peru": "PE",
+    "philippines": "PH", "poland": "PL", "portugal": "PT", "romania": "RO", "russia": "RU",
+    "saudi arabia": "SA", "serbia": "RS", "singapore": "SG", "slovakia": "SK", "slovenia": "SI",
+    "south africa": "ZA", "south korea": "KR", "korea": "KR", "spain": "ES", "sweden": "SE",
+    "switzerland": "CH", "thailand": "TH", "turkey": "TR", "turkiye": "TR", "ukraine": "UA",
+    "united arab emirates": "AE", "uae": "AE", "vietnam": "VN",
+}
+
+
+@dataclass
+class GazetteerEntry:
+    name: str
+    country: str
+    latitude: float
+    longitude: float
+    timezone: str
+    population: int
+
+
+def build_index(source: Path | str, index_path: Path | str) -> int:
+    """Turn a GeoNames cities dump (e.g. cities15000.txt) into a sorted, tab-separated index.
+
+    Each city gets one line per distinct normalised name (its name and ASCII
+    name): ``key, country, population, latitude, longitude, timezone, name``.
+    Lines are sorted by the UTF-8 bytes of the key so they can be binary
+    searched in place. Returns the number of index lines written.
+    """
+    lines: list[bytes] = []
+    with open(source, encoding="utf-8") as f:
+        for row in f:
+            cols = row.rstrip("\n").split("\t")
+            if len(cols) < 18 or not cols[17]:
+                continue
+            name, ascii_name, lat, lng, country, population, tz = cols[1], cols[2], cols[4], cols[5], cols[8], cols[14], cols[17]
+            for key in {normalise_location(name), normalise_location(ascii_name)}:
+                if key:
+                    lines.append(f"{key}\t{country.upper()}\t{population or 0}\t{lat}\t{lng}\t{tz}\t{name}\n".encode())
+    lines.sort()
+    index_path = Path(index_path)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = index_path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.writelines(lines)
+    os.replace(tmp, index_path)
+    return len(lines)
+
+
+def load_country_names(path: Path | str) -> dict[str, str]:
+    """Map the normalised country names in GeoNames' countryInfo.txt to their ISO codes."""
+    names = {}
+    with open(path, encoding="utf-8") as f:
+        for row in f:
+            if row.startswith("#"):
+                continue
+            cols = row.rstrip("\n").split("\t")
+            if len(cols) > 4 and cols[0] and cols[4]:
+                names[normalise_location(cols[4])] = cols[0].upper()
+    return names
+
+
+class Gazetteer:
+    """Offline city lookup over a memory-mapped index written by ``build_index``.
+
+    ``lookup("London")`` returns the most populous city called London;
+    ``lookup("London, CA")`` or ``lookup("London, Canada")`` restricts to a
+    country, given as a two-letter code or a name in ``countries`` (or
+    ``COUNTRY_ALIASES``). When no name matches exactly, names starting with
+    the query are considered.
+    """
+
+    def __init__(self, index_path: Path | str, countries: dict[str, str] | None = None) -> None:
+        self._countries = {**COUNTRY_ALIASES, **(countries or {})}
+        self._file = open(index_path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    @classmethod
+    def from_geonames(cls, source: Path | str, index_path: Path | str) -> "Gazetteer":
+        source, index_path = Path(source), Path(index_path)
+        if not index_path.exists() or index_path.stat().st_mtime < source.stat().st_mtime:
+            count = build_index(source, index_path)
+            logger.info("Built gazetteer index %s with %d names", index_path, count)
+        country_info = source.with_name("countryInfo.txt")
+        countries = load_country_names(country_info) if country_info.exists() else None
+        return cls(index_path, countries)
+
+    def close(self) -> None:
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def lookup(self, location: str) -> GazetteerEntry | None:
+        name, _, qualifier = normalise_location(location).partition(",")
+        qualifier = qualifier.strip()
+        country = self._countries.get(qualifier) or qualifier.upper()
+        if country and len(country) != 2:
+            # Not a country this index knows; leave "Paris, Texas" to the geocoder.
+            return None
+        if not name:
+            return None
+        matches = self._matches(name, exact=True, country=country)
+        if not matches and len(name) >= _MIN_PREFIX_LENGTH:
+            matches = self._matches(name, exact=False, country=country)
+        if not matches:
+            return None
+        return max(matches, key=lambda entry: entry.population)
+
+    def _matches(self, name: str, exact: bool, country: str) -> list[GazetteerEntry]:
+        key = name.encode()
+        pos = self._lower_bound(key)
+        matches = []
+        for _ in range(_PREFIX_SCAN_LIMIT):
+            end = self._mm.find(b"\n", pos)
+            if end == -1:
+                break
+            fields = self._mm[pos:end].decode().split("\t")
+            line_key = fields[0].encode()
+            if not line_key.startswith(key) or (exact and line_key != key):
+                break
+            if not country or fields[1] == country:
+                matches.append(GazetteerEntry(
+                    name=fields[6],
+                    country=fields[1],
+                    latitude=float(fields[3]),
+                    longitude=float(fields[4]),
+                    timezone=fields[5],
+                    population=int(fields[2]),
+                ))
+            pos = end + 1
+        return matches
+
+    def _lower_bound(self, key: bytes) -> int:
+        """Byte offset of the first line whose key is >= ``key``."""
+        lo, hi = 0, len(self._mm)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = self._mm.rfind(b"\n", 0, mid) + 1
+            end = self._mm.find(b"\n", start)
+            if self._mm[start:self._mm.find(b"\t", start, end)] < key:
+                lo = end + 1
+            else:
+                hi = start
+        return lo
@@ -1,21 +1,166 @@
+import asyncio
 import json
-from collections.abc import Iterator
+import logging
+import os
+import threading
+from collections.abc import AsyncIterator, Iterator
+from datetime import datetime, time
 from pathlib import Path
 
 import httpx
 import ollama
 
 # Use the top line for dev and the second when moving to the production environment
-#from app_interface import CommandApp
-from signal_bot.app_interface import CommandApp
+#from app_interface import AsyncCommandApp
+from signal_bot.app_interface import AsyncCommandApp
+from signal_bot.apps.chat_history import ChatHistory, approx_tokens, context_window
+from signal_bot.apps.generation_scheduler import GenerationScheduler, Ticket
+
+logger = logging.getLogger(__name__)
 
 MODEL = "gemma3:12b-it-qat"
 
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a chat between a user and an assistant. "
+    "Update the summary with the new messages below. Keep the facts, names, decisions "
+    "and open questions that later replies may need. Reply with the summary only."
+)
+
+UNAVAILABLE = "Gemma3 is unavailable. Is ollama running?"
+
+_COMMANDS = ("help", "stop", "stats", "clear")
+
+
+class _ReplyBuffer:
+    """Collects a streamed reply and hands out the parts that are ready to send.
+
+    Fragments are kept in lists and joined once, rather than concatenated as
+    they arrive. With ``fragments`` set every piece of text is ready at once
+    (the bot assembles them into one edited message); otherwise only complete,
+    non-blank lines are.
+    """
+
+    def __init__(self, fragments: bool) -> None:
+        self._fragments = fragments
+        self._parts: list[str] = []
+        self._line: list[str] = []
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, text: str) -> list[str]:
+        self._parts.append(text)
+        if self._fragments:
+            return [text]
+        if "\n" not in text:
+            self._line.append(text)
+            return []
+        first, *lines = text.split("\n")
+        self._line.append(first)
+        ready = ["".join(self._line), *lines[:-1]]
+        self._line = [lines[-1]]
+        return [line for line in ready if line.strip()]
+
+    def rest(self) -> list[str]:
+        """Return the last line if it did not end with a newline."""
+        line = "".join(self._line)
+        return [line] if line.strip() else []
+
+
+async def _until_cancelled(stream: AsyncIterator, ticket: Ticket, cancelled: asyncio.Future) -> AsyncIterator:
+    """Yield from ``stream`` until the ticket is cancelled, even while waiting for the first or next chunk.
 
-class Gemma3App(CommandApp):
-    def __init__(self, data_dir: str | None = None, ollama_host: str = "http://localhost:11434"):
+    ``cancelled`` is the scheduler's ``wait_cancelled()`` for the ticket, so
+    a stop during model load, prompt processing or a stalled stream closes
+    the stream straight away. Closing it drops the HTTP connection, which
+    stops Ollama generating.
+    """
+    next_chunk = None
+    try:
+        while not cancelled.done():
+            next_chunk = asyncio.ensure_future(anext(stream))
+            await asyncio.wait({next_chunk, cancelled}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_chunk.done():
+                return
+            try:
+                chunk = next_chunk.result()
+            except StopAsyncIteration:
+                return
+            # Cancelled on another thread as this chunk arrived, before the wake-up reached this loop.
+            if ticket.cancelled.is_set():
+                return
+            yield chunk
+    finally:
+        if next_chunk is not None and not next_chunk.done():
+            next_chunk.cancel()
+            await asyncio.gather(next_chunk, return_exceptions=True)
+        await stream.aclose()
+
+
+def _parse_active_hours(value: str) -> tuple[time, time]:
+    """Parse ``HH:MM-HH:MM`` into start and end times; the end may be past midnight, as in ``22:00-02:00``."""
+    try:
+        start, end = value.split("-")
+        return time.fromisoformat(start.strip()), time.fromisoformat(end.strip())
+    except ValueError:
+        raise ValueError(f"active hours must look like HH:MM-HH:MM, got '{value}'") from None
+
+
+def _parse_keep_alive(value: float | str | None) -> float | str | None:
+    # Ollama reads a bare number as seconds, but rejects a numeric string like "-1" as a duration.
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return value
+
+
+class Gemma3App(AsyncCommandApp):
+    def __init__(
+        self,
+        data_dir: str | None = None,
+        ollama_host: str = "http://localhost:11434",
+        history_messages: int = 100,
+        context_tokens: int = 3072,
+        summarize: bool = False,
+        cancel_on_new_message: bool = False,
+        stream_edits: bool = False,
+        keep_alive: float | str | None = None,
+        warm_up: bool = False,
+        keep_warm_interval: float = 0.0,
+        active_hours: str | None = None,
+        max_concurrent: int = 1,
+        typing_indicator: bool = True,
+    ):
         self.data_dir = Path(data_dir)
+        self.ollama_host = ollama_host
         self._client = ollama.Client(host=ollama_host)
+        self._async_client = ollama.AsyncClient(host=ollama_host)
+        self._history = ChatHistory(self.data_dir / "gemma3", max_messages=history_messages)
+        self.context_tokens = context_tokens
+        self.summarize = summarize
+        self.cancel_on_new_message = cancel_on_new_message
+        self.stream_edits = stream_edits
+        self.typing_indicator = typing_indicator
+        self._lock = threading.Lock()
+        # Each sender's reply that is queued or streaming right now; cancelling its ticket stops it.
+        self._active: dict[str, Ticket] = {}
+        self._scheduler = GenerationScheduler(max_concurrent)
+        # Senders whose reply was cut short by /gemma3 stop, until the stop command is answered.
+        self._stopped: set[str] = set()
+        # Passed to every Ollama request: how long the model stays loaded afterwards (None: Ollama's default).
+        self.keep_alive = _parse_keep_alive(keep_alive)
+        self.warm_up = warm_up
+        self.keep_warm_interval = keep_warm_interval
+        self.active_hours = _parse_active_hours(active_hours) if active_hours else None
+        self._closing = threading.Event()
+        self._warmer = None
+        if warm_up or keep_warm_interval > 0:
+            # Loading the model can take a while; the bot starts answering other commands meanwhile.
+            self._warmer = threading.Thread(target=self._keep_warm, name="gemma3-warmer", daemon=True)
+            self._warmer.start()
 
     @property
     def name(self) -> str:
@@ -25,57 +170,216 @@ class Gemma3App(CommandApp):
     def description(self) -> str:
         return "Have a discussion with a locally hosted instance of Gemma3"
 
-    def _history_file(self, sender: str):
-        return self.data_dir / "gemma3" / f"{sender}.json"
+    def close(self) -> None:
+        self._closing.set()
+        if self._warmer is not None:
+            self._warmer.join(timeout=1)
+        if self._warmer is None or not self._warmer.is_alive():
+            # A model load still in flight keeps using the client until the process exits.
+            self._client.close()
 
-    def _load_history(self, sender: str) -> list:
-        f = self._history_file(sender)
-        if f.exists():
-            return json.loads(f.read_text())
-        return []
+    async def close_async(self) -> None:
+        # The async client's connections belong to the event loop that opened them; a later loop gets a new client.
+        client, self._async_client = self._async_client, ollama.AsyncClient(host=self.ollama_host)
+        await client.close()
+
+    def _in_active_hours(self, now: time) -> bool:
+        if self.active_hours is None:
+            return True
+        start, end = self.active_hours
+        if start <= end:
+            return start <= now < end
+        return now >= start or now < end
+
+    def _load_model(self) -> None:
+        # A request without a prompt loads the model and returns without generating anything.
+        # Requests that aren't streamed raise ConnectionError rather than httpx.ConnectError when Ollama is down.
+        try:
+            self._client.generate(model=MODEL, keep_alive=self.keep_alive)
+        except (httpx.HTTPError, ollama.ResponseError, ConnectionError) as e:
+            logger.warning("Could not load %s: %s", MODEL, e)
+            return
+        logger.debug("Loaded %s", MODEL)
+
+    def _keep_warm(self) -> None:
+        if self.warm_up:
+            self._load_model()
+        if self.keep_warm_interval <= 0:
+            return
+        while not self._closing.wait(self.keep_warm_interval):
+            if self._in_active_hours(datetime.now().time()):
+                self._load_model()
 
-    def _save_history(self, sender: str, history: list) -> None:
-        f = self._history_file(sender)
-        f.parent.mkdir(parents=True, exist_ok=True)
-        f.write_text(json.dumps(history))
+    def interrupt(self, sender: str, args: str | None) -> None:
+        stop = args is not None and args.strip().lower() == "stop"
+        if not stop and not self.cancel_on_new_message:
+            return
+        with self._lock:
+            ticket = self._active.get(sender)
+            if ticket is None or ticket.cancelled.is_set():
+                return
+            logger.debug("Cancelling Gemma3 reply for %s", sender)
+            self._scheduler.cancel(ticket)
+            if stop:
+                self._stopped.add(sender)
 
-    def handle(self, args: str, sender: str = "") -> Iterator[str]:
+    async def handle_async(self, args: str, sender: str = "") -> AsyncIterator[str]:
+        # On Ollama's async client a reply waiting in the queue or for tokens holds no thread;
+        # file I/O (history, summary) runs on worker threads so it never blocks the event loop.
         command = args.strip().lower()
+        if command in _COMMANDS:
+            for reply in await asyncio.to_thread(list, self._command(command, sender)):
+                yield reply
+            return
+
+        prompt, history, summary, messages = await asyncio.to_thread(self._prepare, args, sender)
+        ticket = self._enqueue(sender)
+        try:
+            notice = self._queue_notice(ticket)
+            if notice is not None:
+                yield notice
+            if not await self._scheduler.wait_async(ticket):
+                return
 
+            reply = _ReplyBuffer(self.stream_edits)
+            cancelled = asyncio.ensure_future(self._scheduler.wait_cancelled(ticket))
+            try:
+                stream = await self._async_client.chat(
+                    model=MODEL, messages=messages, stream=True, keep_alive=self.keep_alive
+                )
+                chunks = _until_cancelled(stream, ticket, cancelled)
+                try:
+                    async for chunk in chunks:
+                        for line in reply.feed(chunk.message.content):
+                            yield line
+                finally:
+                    await chunks.aclose()
+            except httpx.ConnectError:
+                yield UNAVAILABLE
+                return
+            finally:
+                cancelled.cancel()
+            if not ticket.cancelled.is_set():
+                for line in reply.rest():
+                    yield line
+
+            answer = await asyncio.to_thread(self._save_exchange, sender, prompt, reply.text)
+            if self.summarize:
+                # After the reply has gone out, so the next prompt finds the summary ready.
+                await self._update_summary(sender, summary, history + [answer])
+        finally:
+            self._leave(sender, ticket)
+
+    def _command(self, command: str, sender: str) -> Iterator[str]:
         if command == "help":
-            yield "Commands: help, clear"
+            yield "Commands: help, clear, stop, stats"
             yield "Anything else is sent to Gemma3 as a message."
-            return
-
-        if command == "clear":
-            f = self._history_file(sender)
-            if f.exists():
-                f.unlink()
+        elif command == "stop":
+            with self._lock:
+                stopped = sender in self._stopped
+                self._stopped.discard(sender)
+            yield "Stopped." if stopped else "Nothing to stop."
+        elif command == "stats":
+            yield self._stats()
+        elif command == "clear":
+            self._history.clear(sender)
+            summary_file = self._summary_file(sender)
+            if summary_file.exists():
+                summary_file.unlink()
             yield "Conversation history cleared."
-            return
 
-        history = self._load_history(sender)
-        history.append({"role": "user", "content": args})
+    def _prepare(self, args: str, sender: str) -> tuple[dict, list[dict], dict | None, list[dict]]:
+        history = self._history.tail(sender)
+        prompt = {"role": "user", "content": args}
+        history.append(prompt)
+        summary = self._load_summary(sender)
+        return prompt, history, summary, self._context(history, summary)
+
+    def _enqueue(self, sender: str) -> Ticket:
+        ticket = self._scheduler.submit(sender)
+        with self._lock:
+            self._active[sender] = ticket
+        return ticket
 
-        full_response = ""
-        current_line = ""
+    def _queue_notice(self, ticket: Ticket) -> str | None:
+        position = self._scheduler.position(ticket)
+        if not position:
+            return None
+        return f"You are #{position} in line." + ("\n\n" if self.stream_edits else "")
 
+    def _leave(self, sender: str, ticket: Ticket) -> None:
+        with self._lock:
+            if self._active.get(sender) is ticket:
+                del self._active[sender]
+        self._scheduler.release(ticket)
+
+    def _save_exchange(self, sender: str, prompt: dict, text: str) -> dict:
+        answer = {"role": "assistant", "content": text}
+        self._history.append(sender, [prompt, answer])
+        return answer
+
+    def _stats(self) -> str:
+        scheduler = self._scheduler
+        lines = [f"Generating: {scheduler.running} of {scheduler.max_concurrent}, waiting: {scheduler.waiting}"]
+        if scheduler.completed:
+            lines.append(
+                f"{scheduler.completed} replies, queue wait avg {scheduler.wait_time / scheduler.completed:.1f}s "
+                f"(max {scheduler.max_wait:.1f}s), generation avg {scheduler.generation_time / scheduler.completed:.1f}s "
+                f"(max {scheduler.max_generation:.1f}s)"
+            )
+        return "\n".join(lines)
+
+    def _budget(self, summary: dict | None) -> int:
+        if summary is None:
+            return self.context_tokens
+        return self.context_tokens - approx_tokens({"content": summary["summary"]})
+
+    def _context(self, history: list[dict], summary: dict | None) -> list[dict]:
+        messages = history[context_window(history, self._budget(summary)):]
+        if summary is not None:
+            messages.insert(0, {"role": "system", "content": f"Summary of the conversation so far: {summary['summary']}"})
+        return messages
+
+    def _summary_file(self, sender: str) -> Path:
+        return self.data_dir / "gemma3" / f"{sender}.summary.json"
+
+    def _load_summary(self, sender: str) -> dict | None:
+        if not self.summarize:
+            return None
+        f = self._summary_file(sender)
+        if f.exists():
+            return json.loads(f.read_text())
+        return None
+
+    def _summary_request(self, summary: dict | None, history: list[dict]) -> tuple[list[dict], dict] | None:
+        """Return the messages asking Ollama to fold dropped history into the summary, and the last of them."""
+        dropped = history[:context_window(history, self._budget(summary))]
+        if summary is not None and summary["last"] in dropped:
+            # Older messages up to this one are already in the summary.
+            dropped = dropped[len(dropped) - dropped[::-1].index(summary["last"]):]
+        if not dropped:
+            return None
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in dropped)
+        previous = summary["summary"] if summary is not None else "(none yet)"
+        return [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": f"Summary so far:\n{previous}\n\nNew messages:\n{transcript}"},
+        ], dropped[-1]
+
+    async def _update_summary(self, sender: str, summary: dict | None, history: list[dict]) -> None:
+        request = self._summary_request(summary, history)
+        if request is None:
+            return
+        messages, last = request
         try:
-            for chunk in self._client.chat(model=MODEL, messages=list(history), stream=True):
-                text = chunk.message.content
-                full_response += text
-                current_line += text
-
-                while "\n" in current_line:
-                    line, current_line = current_line.split("\n", 1)
-                    if line.strip():
-                        yield line
-        except httpx.ConnectError:
-            yield "Gemma3 is unavailable. Is ollama running?"
+            response = await self._async_client.chat(model=MODEL, keep_alive=self.keep_alive, messages=messages)
+        except (httpx.HTTPError, ollama.ResponseError, ConnectionError) as e:
+            logger.warning("Could not update Gemma3 summary for %s: %s", sender, e)
             return
+        await asyncio.to_thread(self._save_summary, sender, response.message.content, last)
 
-        if current_line.strip():
-            yield current_line
-
-        history.append({"role": "assistant", "content": full_response})
-        self._save_history(sender, history)
+    def _save_summary(self, sender: str, text: str, last: dict) -> None:
+        f = self._summary_file(sender)
+        tmp = f.with_name(f".{f.name}.tmp")
+        tmp.write_text(json.dumps({"summary": text.strip(), "last": last}))
+        os.replace(tmp, f)
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class Ticket:
+    """One sender's place in a ``GenerationScheduler``, from joining the queue until its slot is released."""
+
+    def __init__(self, sender: str) -> None:
+        self.sender = sender
+        self.queued_at = time.monotonic()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        # Set when the request is cancelled, whether it is still waiting or already generating.
+        self.cancelled = threading.Event()
+        self._ready = threading.Event()
+        # Called once the ticket starts or is cancelled, to wake up wait_async() on its event loop.
+        self._wakers: list = []
+        # Called once the ticket is cancelled, to wake up wait_cancelled() on its event loop.
+        self._cancel_wakers: list = []
+
+    @property
+    def running(self) -> bool:
+        return self.started_at is not None and self.finished_at is None
+
+    def _set_ready(self) -> None:
+        self._ready.set()
+        for wake in self._wakers:
+            wake()
+        self._wakers.clear()
+
+    def _set_cancelled(self) -> None:
+        self.cancelled.set()
+        for wake in self._cancel_wakers:
+            wake()
+        self._cancel_wakers.clear()
+
+
+def _waker(future: asyncio.Future):
+    # Resolves the future from any thread, on the event loop it belongs to.
+    loop = future.get_loop()
+    return lambda: loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+
+class GenerationScheduler:
+    """Limits how many generations run at once and queues the rest fairly.
+
+    Waiting requests are served round-robin by sender, so someone who sends
+    several messages in a row cannot hold up everyone else. The time each
+    request spends waiting for a slot and the time it holds one are measured
+    separately.
+    """
+
+    def __init__(self, max_concurrent: int = 1) -> None:
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        self.max_concurrent = max_concurrent
+        self._lock = threading.Lock()
+        self._running = 0
+        self._queues: dict[str, deque[Ticket]] = {}
+        # Senders with waiting requests, in the order they get their next turn.
+        self._turns: deque[str] = deque()
+        self.completed = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.generation_time = 0.0
+        self.max_generation = 0.0
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def submit(self, sender: str) -> Ticket:
+        """Join the queue; the ticket starts straight away when a slot is free and nobody is waiting."""
+        ticket = Ticket(sender)
+        with self._lock:
+            if self._running < self.max_concurrent and not self._turns:
+                self._start(ticket)
+                return ticket
+            queue = self._queues.get(sender)
+            if queue is None:
+                queue = self._queues[sender] = deque()
+                self._turns.append(sender)
+            queue.append(ticket)
+        return ticket
+
+    def position(self, ticket: Ticket) -> int:
+        """Return the ticket's 1-based place in line, or 0 once it is running or has left the queue."""
+        with self._lock:
+            queue = self._queues.get(ticket.sender)
+            if queue is None or ticket not in queue:
+                return 0
+            rounds = queue.index(ticket)
+            turn = self._turns.index(ticket.sender)
+            ahead = 0
+            for i, sender in enumerate(self._turns):
+                waiting = len(self._queues[sender])
+                # Each sender gets one turn per round; earlier senders also go first in this ticket's round.
+                ahead += min(waiting, rounds + 1 if i < turn else rounds)
+            return ahead + 1
+
+    def wait(self, ticket: Ticket, timeout: float | None = None) -> bool:
+        """Block until the ticket is running; False if it was cancelled (or ``timeout`` ran out) first."""
+        ticket._ready.wait(timeout)
+        return ticket.started_at is not None and not ticket.cancelled.is_set()
+
+    async def wait_async(self, ticket: Ticket) -> bool:
+        """Like ``wait()``, but awaits the ticket's turn without holding a thread."""
+        ready = asyncio.get_running_loop().create_future()
+        wake = _waker(ready)
+        with self._lock:
+            if not ticket._ready.is_set():
+                ticket._wakers.append(wake)
+            else:
+                ready.set_result(None)
+        try:
+            await ready
+        finally:
+            with self._lock:
+                if wake in ticket._wakers:
+                    ticket._wakers.remove(wake)
+        return ticket.started_at is not None and not ticket.cancelled.is_set()
+
+    async def wait_cancelled(self, ticket: Ticket) -> None:
+        """Return once the ticket is cancelled, without holding a thread."""
+        cancelled = asyncio.get_running_loop().create_future()
+        wake = _waker(cancelled)
+        with self._lock:
+            if ticket.cancelled.is_set():
+                return
+            ticket._cancel_wakers.append(wake)
+        try:
+            await cancelled
+        finally:
+            with self._lock:
+                if wake in ticket._cancel_wakers:
+                    ticket._cancel_wakers.remove(wake)
+
+    def cancel(self, ticket: Ticket) -> None:
+        """Cancel a request; a waiting one leaves the queue, a running one keeps its slot until released."""
+        with self._lock:
+            ticket._set_cancelled()
+            if ticket.started_at is None:
+                self._dequeue(ticket)
+                ticket._set_ready()
+
+    def release(self, ticket: Ticket) -> None:
+        """Give up the ticket's slot, or its place in line if it never started, and start the next request."""
+        with self._lock:
+            if ticket.finished_at is not None:
+                return
+            if ticket.started_at is None:
+                self._dequeue(ticket)
+                ticket._set_ready()
+                return
+            ticket.finished_at = time.monotonic()
+            waited = ticket.started_at - ticket.queued_at
+            generated = ticket.finished_at - ticket.started_at
+            self._running -= 1
+            self.completed += 1
+            self.wait_time += waited
+            self.max_wait = max(self.max_wait, waited)
+            self.generation_time += generated
+            self.max_generation = max(self.max_generation, generated)
+            self._start_next()
+        logger.info("Generation for %s waited %.2fs and ran for %.2fs", ticket.sender, waited, generated)
+
+    def _start(self, ticket: Ticket) -> None:
+        ticket.started_at = time.monotonic()
+        self._running += 1
+        ticket._set_ready()
+
+    def _start_next(self) -> None:
+        while self._running < self.max_concurrent and self._turns:
+            sender = self._turns.popleft()
+            queue = self._queues[sender]
+            self._start(queue.popleft())
+            if queue:
+                self._turns.append(sender)
+            else:
+                del self._queues[sender]
+
+    def _dequeue(self, ticket: Ticket) -> None:
+        queue = self._queues.get(ticket.sender)
+        if queue is None or ticket not in queue:
+            return
+        queue.remove(ticket)
+        if not queue:
+            del self._queues[ticket.sender]
+            self._turns.remove(ticket.sender)
@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedLocation:
+    latitude: float | None
+    longitude: float | None
+    timezone: str | None
+    cached_at: float
+
+    @property
+    def found(self) -> bool:
+        return self.timezone is not None
+
+
+def normalise_location(location: str) -> str:
+    """'  new york,US ' and 'New York, us' share a cache key."""
+    return ",".join(" ".join(part.split()) for part in location.casefold().split(","))
+
+
+class GeocodeCache:
+    """LRU cache of geocoded locations, persisted as JSON when given a path.
+
+    Found locations are kept until evicted; misses expire after
+    ``negative_ttl`` seconds so a typo isn't retried on every message but a
+    new place eventually gets looked up again.
+    """
+
+    def __init__(self, path: Path | str | None = None, max_entries: int = 1000, negative_ttl: float = 86400) -> None:
+        self._path = Path(path) if path is not None else None
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        # DateApp runs on several executor threads; entries and the file are only touched under this.
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, CachedLocation] = self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, location: str) -> CachedLocation | None:
+        key = normalise_location(location)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if not entry.found and time.time() - entry.cached_at > self.negative_ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, location: str, latitude: float, longitude: float, timezone: str | None) -> None:
+        self._store(location, CachedLocation(latitude, longitude, timezone, time.time()))
+
+    def put_miss(self, location: str) -> None:
+        self._store(location, CachedLocation(None, None, None, time.time()))
+
+    def _store(self, location: str, entry: CachedLocation) -> None:
+        key = normalise_location(location)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def _load(self) -> OrderedDict[str, CachedLocation]:
+        if self._path is None or not self._path.exists():
+            return OrderedDict()
+        try:
+            with open(self._path) as f:
+                raw = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("Ignoring unreadable geocode cache %s: %s", self._path, e)
+            return OrderedDict()
+        entries = OrderedDict((key, CachedLocation(**value)) for key, value in raw.items())
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        return entries
+
+    def _save(self) -> None:
+        if self._path is None:
+            return
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({key: vars(entry) for key, entry in self._entries.items()}, f)
+        os.replace(tmp, self._path)
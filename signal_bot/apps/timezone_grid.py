@@ -0,0 +1,138 @@
+import json
+import mmap
+import os
+import threading
+from collections.abc import Callable
+from pathlib import Path
+
+import h3
+from timezonefinder import TimezoneFinder
+
+try:
+    # Not part of timezonefinder's public API: the H3 resolution of its shortcut hexagons.
+    from timezonefinder.configs import SHORTCUT_H3_RES
+except ImportError:
+    SHORTCUT_H3_RES = None
+
+_UNKNOWN = 0
+_BORDER = 1
+_FIRST_ZONE = 2
+
+
+def grid_supported() -> bool:
+    """False when the installed timezonefinder doesn't say how big its shortcut hexagons are."""
+    return SHORTCUT_H3_RES is not None
+
+
+class TimezoneGrid:
+    """Quantised lat/lng grid of timezone names in front of ``TimezoneFinder``.
+
+    Each ``step``-degree cell holds either a zone id, "border", or "unknown".
+    A cell is classified the first time a coordinate falls in it: if every
+    TimezoneFinder shortcut hexagon that can overlap the cell has the same
+    single zone, the whole cell is that zone and later lookups are one array
+    read. Otherwise it is a border cell and lookups use the exact polygon
+    test. With a ``path`` the grid is a memory-mapped file (sparse until
+    filled) with zone names in a JSON file beside it, so classifications
+    persist across restarts.
+    """
+
+    def __init__(self, finder: Callable[[], TimezoneFinder], path: Path | str | None = None, step: float = 0.1) -> None:
+        # The shortcut hexagons around a cell's corners only cover the cell while its diagonal
+        # is shorter than a hexagon is wide.
+        if not 0 < step <= 0.2:
+            raise ValueError("step must be between 0 and 0.2 degrees")
+        self._finder = finder
+        self.step = step
+        self.rows = round(180 / step) + 1
+        self.cols = round(360 / step) + 1
+        self._lock = threading.Lock()
+        self._path = Path(path) if path is not None else None
+        self._zones: list[str] = self._load_zones()
+        self._zone_ids = {name: i for i, name in enumerate(self._zones)}
+        self._cells = self._open_cells()
+
+    def timezone_at(self, lat: float, lng: float) -> str | None:
+        index = self._index(lat, lng)
+        value = self._cells[index]
+        if value == _UNKNOWN:
+            value = self._classify(index)
+        if value >= _FIRST_ZONE:
+            return self._zones[value - _FIRST_ZONE]
+        return self._finder().timezone_at(lng=lng, lat=lat)
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._cells.release()
+            self._mmap.close()
+            self._file.close()
+
+    def _index(self, lat: float, lng: float) -> int:
+        row = int((min(max(lat, -90.0), 90.0) + 90) // self.step)
+        col = int((min(max(lng, -180.0), 180.0) + 180) // self.step)
+        return row * self.cols + col
+
+    def _classify(self, index: int) -> int:
+        row, col = divmod(index, self.cols)
+        south, west = row * self.step - 90, col * self.step - 180
+        hexagons = set()
+        for lat in (south, south + self.step):
+            for lng in (west, west + self.step):
+                corner = h3.latlng_to_cell(min(lat, 90.0), min(lng, 180.0), SHORTCUT_H3_RES)
+                hexagons.update(h3.grid_disk(corner, 1))
+        finder = self._finder()
+        zones = set()
+        for hexagon in hexagons:
+            lat, lng = h3.cell_to_latlng(hexagon)
+            zones.add(finder.unique_timezone_at(lng=lng, lat=lat))
+            if len(zones) > 1 or None in zones:
+                self._cells[index] = _BORDER
+                return _BORDER
+        value = self._zone_value(zones.pop())
+        self._cells[index] = value
+        return value
+
+    def _zone_value(self, name: str) -> int:
+        with self._lock:
+            zone_id = self._zone_ids.get(name)
+            if zone_id is None:
+                zone_id = self._zone_ids[name] = len(self._zones)
+                self._zones.append(name)
+                # Saved before any cell refers to the new id.
+                self._save_zones()
+        return zone_id + _FIRST_ZONE
+
+    def _zones_path(self) -> Path | None:
+        return self._path.with_suffix(".json") if self._path is not None else None
+
+    def _load_zones(self) -> list[str]:
+        path = self._zones_path()
+        if path is None or not path.exists():
+            return []
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_zones(self) -> None:
+        path = self._zones_path()
+        if path is None:
+            return
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self._zones, f)
+        os.replace(tmp, path)
+
+    def _open_cells(self) -> memoryview:
+        size = self.rows * self.cols * 2
+        if self._path is None:
+            self._mmap = None
+            return memoryview(bytearray(size)).cast("H")
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        if not self._path.exists() or self._path.stat().st_size != size or not self._zones_path().exists():
+            # New, from a different step, or orphaned from its zone names: start empty.
+            with open(self._path, "wb") as f:
+                f.truncate(size)
+            self._zones.clear()
+            self._save_zones()
+        self._file = open(self._path, "r+b")
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        return memoryview(self._mmap).cast("H")
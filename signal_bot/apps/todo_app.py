@@ -1,16 +1,31 @@
 import json
+import os
 import re
+import threading
+from collections import deque
 from collections.abc import Iterator
 from datetime import datetime, timezone
 from pathlib import Path
 
 from signal_bot.app_interface import CommandApp
+from signal_bot.apps.todo_store import open_store
+from signal_bot.apps.todo_txt import format_item, parse_lines
+
+
+# Longest range accepted by done/undo/remove, so "1-999999999" can't build a huge list.
+MAX_RANGE = 1000
+# Todos handed to the store at a time by /todo import.
+IMPORT_BATCH_SIZE = 1000
 
 
 class TodoApp(CommandApp):
-    def __init__(self, data_dir: str | None = None):
+    def __init__(self, data_dir: str | None = None, write_delay: float = 0.0, storage: str = "json"):
         self.data_dir = Path(data_dir)
-        self.todos: dict[str, list[dict]] = {}
+        self.store = open_store(storage, self.data_dir / "todo", write_delay=write_delay)
+        self._lock = threading.RLock()
+        # Todo ids in the order of each sender's last full listing, so numbers from that listing
+        # keep meaning the same todos while the sender works through it.
+        self._listed: dict[str, list[int]] = {}
 
     @property
     def name(self) -> str:
@@ -22,15 +37,18 @@ class TodoApp(CommandApp):
 
     HELP_TEXT = (
         "Available commands:\n"
-        "  add <task>     - Add a new todo\n"
+        "  add <task>     - Add a new todo (one per line to add several)\n"
         "  list           - List your todos\n"
-        "  done <number>  - Mark a todo as complete\n"
-        "  undo <number>  - Unmark a completed todo\n"
-        "  remove <number> - Remove a todo\n"
+        "  done <numbers> - Mark todos as complete, e.g. 3 or 1,3,5-8\n"
+        "  undo <numbers> - Unmark completed todos\n"
+        "  remove <numbers> - Remove todos\n"
         "  clear          - Remove all todos\n"
         "  projects       - List all projects\n"
         "  contexts       - List all contexts\n"
         "  report         - Show open/completed counts\n"
+        "  archive        - Show recently removed todos\n"
+        "  export         - Write your todos to a todo.txt file\n"
+        "  import [lines] - Add todo.txt lines, or the todo.txt file if none are given\n"
         "  help           - Show this help message"
     )
 
@@ -40,79 +58,62 @@ class TodoApp(CommandApp):
 
     def handle(self, args: str, sender: str = "") -> Iterator[str]:
         sender = self._sanitise_sender(sender)
-        self._load(sender)
+        with self._lock:
+            reply = self._command(args, sender)
+        yield reply
+
+    def _command(self, args: str, sender: str) -> str:
         parts = args.strip().split(maxsplit=1)
         command = parts[0].lower() if parts else ""
+        arg = parts[1] if len(parts) > 1 else ""
 
         if command == "add":
-            yield self._add(parts[1] if len(parts) > 1 else "", sender)
-        elif command == "list":
-            yield self._list(parts[1] if len(parts) > 1 else "", sender)
-        elif command == "done":
-            yield self._done(parts[1] if len(parts) > 1 else "", sender)
-        elif command == "undo":
-            yield self._undo(parts[1] if len(parts) > 1 else "", sender)
-        elif command == "remove":
-            yield self._remove(parts[1] if len(parts) > 1 else "", sender)
-        elif command == "clear":
-            yield self._clear(sender)
-        elif command == "projects":
-            yield self._projects(sender)
-        elif command == "contexts":
-            yield self._contexts(sender)
-        elif command == "report":
-            yield self._report(sender)
-        else:
-            yield self.HELP_TEXT
+            return self._add(arg, sender)
+        if command == "list":
+            return self._list(arg, sender)
+        if command == "done":
+            return self._done(arg, sender)
+        if command == "undo":
+            return self._undo(arg, sender)
+        if command == "remove":
+            return self._remove(arg, sender)
+        if command == "clear":
+            return self._clear(sender)
+        if command == "projects":
+            return self._projects(sender)
+        if command == "contexts":
+            return self._contexts(sender)
+        if command == "report":
+            return self._report(sender)
+        if command == "archive":
+            return self._recent_archive(sender)
+        if command == "export":
+            return self._export(sender)
+        if command == "import":
+            return self._import(arg, sender)
+        return self.HELP_TEXT
 
-    @staticmethod
-    def _parse_priority(task: str) -> tuple[str | None, str]:
-        match = re.match(r"^\(([A-Za-z])\)\s*", task)
-        if match:
-            return match.group(1).upper(), task[match.end():]
-        return None, task
-
-    @staticmethod
-    def _parse_projects(task: str) -> list[str]:
-        return re.findall(r"(?:^|\s)\+(\S+)", task)
-
-    @staticmethod
-    def _parse_contexts(task: str) -> list[str]:
-        return re.findall(r"(?:^|\s)@(\S+)", task)
-
-    def _add(self, task: str, sender: str) -> str:
-        task = task.strip()
-        if not task:
+    def _add(self, text: str, sender: str) -> str:
+        items = list(parse_lines(text.splitlines()))
+        if not items:
             return "Please provide a task. Usage: add <task>"
-        priority, task = self._parse_priority(task)
-        projects = self._parse_projects(task)
-        contexts = self._parse_contexts(task)
-        if sender not in self.todos:
-            self.todos[sender] = []
         now = datetime.now(timezone.utc).isoformat()
-        self.todos[sender].append({"task": task, "done": False, "priority": priority, "projects": projects, "contexts": contexts, "created_at": now})
-        self._save(sender)
-        return f"Added: {task}"
-
-    def _sorted_items(self, sender: str) -> list[dict]:
-        items = self.todos.get(sender, [])
-        return sorted(items, key=lambda x: (x.get("priority") is None, x.get("priority") or ""))
+        for item in items:
+            if item["created_at"] is None:
+                item["created_at"] = now
+        self.store.add(sender, items)
+        self._listed.pop(sender, None)
+        return "\n".join(f"Added: {item['task']}" for item in items)
 
     def _list(self, arg: str, sender: str) -> str:
-        all_items = self._sorted_items(sender)
         filter_arg = arg.strip() if arg else ""
-        filtered = []
-        for i, item in enumerate(all_items, 1):
-            if filter_arg:
-                if filter_arg.startswith("@"):
-                    context_filter = filter_arg.lstrip("@")
-                    if context_filter not in item.get("contexts", []):
-                        continue
-                else:
-                    project_filter = filter_arg.lstrip("+")
-                    if project_filter not in item.get("projects", []):
-                        continue
-            filtered.append((i, item))
+        self._listed[sender] = self.store.ids(sender)
+        if not filter_arg:
+            filtered = self.store.numbered(sender)
+        elif filter_arg.startswith("@"):
+            filtered = self.store.numbered(sender, context=filter_arg.lstrip("@"))
+        else:
+            filtered = self.store.numbered(sender, project=filter_arg.lstrip("+"))
         if not filtered:
             return "No todos yet. Use 'add <task>' to create one."
         lines = []
@@ -123,11 +124,7 @@ class TodoApp(CommandApp):
         return "\n".join(lines)
 
     def _projects(self, sender: str) -> str:
-        items = self.todos.get(sender, [])
-        counts: dict[str, int] = {}
-        for item in items:
-            for project in item.get("projects", []):
-                counts[project] = counts.get(project, 0) + 1
+        counts = self.store.project_counts(sender)
         if not counts:
             return "No projects found."
         lines = []
@@ -136,11 +133,7 @@ class TodoApp(CommandApp):
         return "Projects:\n" + "\n".join(lines)
 
     def _contexts(self, sender: str) -> str:
-        items = self.todos.get(sender, [])
-        counts: dict[str, int] = {}
-        for item in items:
-            for context in item.get("contexts", []):
-                counts[context] = counts.get(context, 0) + 1
+        counts = self.store.context_counts(sender)
         if not counts:
             return "No contexts found."
         lines = []
@@ -149,93 +142,195 @@ class TodoApp(CommandApp):
         return "Contexts:\n" + "\n".join(lines)
 
     def _report(self, sender: str) -> str:
-        items = self.todos.get(sender, [])
-        completed = sum(1 for item in items if item.get("done"))
-        open_count = len(items) - completed
+        open_count, completed = self.store.counts(sender)
         return f"{open_count} open, {completed} completed"
 
-    def _done(self, arg: str, sender: str) -> str:
-        try:
-            num = int(arg)
-        except ValueError:
-            return "Invalid todo number."
-        items = self._sorted_items(sender)
-        if num < 1 or num > len(items):
+    @staticmethod
+    def _parse_numbers(arg: str) -> list[int] | None:
+        """Parse ``3``, ``1,3,5-8`` or ``1 3 5-8`` into numbers in the order given."""
+        numbers: list[int] = []
+        for part in re.split(r"[,\s]+", arg.strip()):
+            if not part:
+                continue
+            match = re.fullmatch(r"(\d+)(?:-(\d+))?", part)
+            if match is None:
+                return None
+            start = int(match.group(1))
+            end = int(match.group(2) or start)
+            if end < start or end - start >= MAX_RANGE:
+                return None
+            numbers.extend(range(start, end + 1))
+        return list(dict.fromkeys(numbers)) or None
+
+    def _item(self, num: int, sender: str) -> dict | None:
+        listed = self._listed.get(sender)
+        if listed is None:
+            return self.store.item_at(sender, num)
+        if num < 1 or num > len(listed):
+            return None
+        return self.store.get(sender, listed[num - 1])
+
+    def _items(self, arg: str, sender: str) -> tuple[list[dict], list[int]]:
+        """Resolve every number before anything changes, returning the items and the invalid numbers."""
+        numbers = self._parse_numbers(arg)
+        if numbers is None:
+            return [], [0]
+        items, invalid = [], []
+        for num in numbers:
+            item = self._item(num, sender)
+            if item is None:
+                invalid.append(num)
+            else:
+                items.append(item)
+        return items, invalid
+
+    @staticmethod
+    def _summary(lines: list[str], invalid: list[int]) -> str:
+        if invalid and not lines and len(invalid) == 1:
             return "Invalid todo number."
-        item = items[num - 1]
-        item["done"] = True
-        item["completed_at"] = datetime.now(timezone.utc).isoformat()
-        self._save(sender)
-        return f"Completed: {item['task']}"
+        if len(invalid) == 1:
+            lines.append(f"Invalid todo number: {invalid[0]}")
+        elif invalid:
+            lines.append("Invalid todo numbers: " + ", ".join(map(str, invalid)))
+        return "\n".join(lines)
+
+    def _done(self, arg: str, sender: str) -> str:
+        items, invalid = self._items(arg, sender)
+        now = datetime.now(timezone.utc).isoformat()
+        for item in items:
+            item["done"] = True
+            item["completed_at"] = now
+        if items:
+            self.store.update(sender, items)
+        return self._summary([f"Completed: {item['task']}" for item in items], invalid)
 
     def _undo(self, arg: str, sender: str) -> str:
-        try:
-            num = int(arg)
-        except ValueError:
-            return "Invalid todo number."
-        items = self._sorted_items(sender)
-        if num < 1 or num > len(items):
-            return "Invalid todo number."
-        item = items[num - 1]
-        if not item["done"]:
+        items, invalid = self._items(arg, sender)
+        lines, undone = [], []
+        for item in items:
+            if not item["done"]:
+                lines.append(f"Not marked as done: {item['task']}")
+                continue
+            item["done"] = False
+            item.pop("completed_at", None)
+            undone.append(item)
+            lines.append(f"Undone: {item['task']}")
+        if undone:
+            self.store.update(sender, undone)
+        if len(items) == 1 and not undone and not invalid:
             return "Not marked as done."
-        item["done"] = False
-        item.pop("completed_at", None)
-        self._save(sender)
-        return f"Undone: {item['task']}"
+        return self._summary(lines, invalid)
 
     def _remove(self, arg: str, sender: str) -> str:
-        try:
-            num = int(arg)
-        except ValueError:
-            return "Invalid todo number."
-        items = self._sorted_items(sender)
-        if num < 1 or num > len(items):
-            return "Invalid todo number."
-        item = items[num - 1]
-        self.todos[sender].remove(item)
-        self._archive(sender, [item])
-        self._save(sender)
-        return f"Removed: {item['task']}"
+        items, invalid = self._items(arg, sender)
+        if items:
+            self.store.remove(sender, items)
+            self._archive(sender, items)
+        return self._summary([f"Removed: {item['task']}" for item in items], invalid)
 
     def _clear(self, sender: str) -> str:
-        items = self.todos.get(sender, [])
-        self._archive(sender, items)
-        self.todos[sender] = []
-        self._save(sender)
+        self._listed.pop(sender, None)
+        self._archive(sender, self.store.clear(sender))
         return "All todos cleared."
 
-    def _sender_path(self, sender: str) -> Path | None:
-        if not self.data_dir:
-            return None
-        return self.data_dir / "todo" / f"{sender}.json"
+    def _todo_txt_path(self, sender: str) -> Path:
+        return self.data_dir / "todo" / f"{sender}.txt"
+
+    def _export(self, sender: str) -> str:
+        path = self._todo_txt_path(sender)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        count = 0
+        with open(tmp, "w") as f:
+            for item in self.store.items(sender):
+                f.write(format_item(item) + "\n")
+                count += 1
+        os.replace(tmp, path)
+        return f"Exported {count} todos to {path.name}."
+
+    def _import(self, text: str, sender: str) -> str:
+        if text.strip():
+            count = self._import_lines(text.splitlines(), sender)
+        else:
+            path = self._todo_txt_path(sender)
+            if not path.exists():
+                return f"Nothing to import: send todo.txt lines after 'import' or put a {path.name} file in the todo directory."
+            with open(path) as f:
+                count = self._import_lines(f, sender)
+        self._listed.pop(sender, None)
+        return f"Imported {count} todos."
+
+    def _import_lines(self, lines, sender: str) -> int:
+        count = 0
+        batch: list[dict] = []
+        for item in parse_lines(lines):
+            batch.append(item)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                self.store.add(sender, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.store.add(sender, batch)
+            count += len(batch)
+        return count
 
     def _archive_path(self, sender: str) -> Path | None:
         if not self.data_dir:
             return None
-        return self.data_dir / "todo" / f"{sender}-archive.json"
+        return self.data_dir / "todo" / f"{sender}-archive.jsonl"
 
     def _archive(self, sender: str, items: list[dict]) -> None:
         path = self._archive_path(sender)
         if not path or not items:
             return
+        self._migrate_archive(sender)
         now = datetime.now(timezone.utc).isoformat()
         for item in items:
             item["archived_at"] = now
-        existing = []
-        if path.exists():
-            existing = json.loads(path.read_text())
-        existing.extend(items)
         path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(json.dumps(existing))
-
-    def _load(self, sender: str) -> None:
-        path = self._sender_path(sender)
-        if path and path.exists():
-            self.todos[sender] = json.loads(path.read_text())
-
-    def _save(self, sender: str) -> None:
-        path = self._sender_path(sender)
-        if path:
-            path.parent.mkdir(parents=True, exist_ok=True)
-            path.write_text(json.dumps(self.todos.get(sender, [])))
+        with open(path, "a") as f:
+            f.write("".join(json.dumps(item) + "\n" for item in items))
+
+    def _migrate_archive(self, sender: str) -> None:
+        # Archives used to be one JSON array, rewritten in full on every remove.
+        path = self._archive_path(sender)
+        legacy = path.with_suffix(".json")
+        if not legacy.exists():
+            return
+        items = json.loads(legacy.read_text())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        with open(tmp, "w") as f:
+            if path.exists():
+                f.write(path.read_text())
+            f.writelines(json.dumps(item) + "\n" for item in items)
+        os.replace(tmp, path)
+        legacy.unlink()
+
+    def _iter_archive(self, sender: str) -> Iterator[dict]:
+        path = self._archive_path(sender)
+        if not path:
+            return
+        self._migrate_archive(sender)
+        if not path.exists():
+            return
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def _recent_archive(self, sender: str, count: int = 10) -> str:
+        recent = deque(self._iter_archive(sender), maxlen=count)
+        if not recent:
+            return "Archive is empty."
+        lines = []
+        for item in reversed(recent):
+            status = "✓" if item.get("done") else " "
+            lines.append(f"[{status}] {item['task']}")
+        return "Recently archived:\n" + "\n".join(lines)
+
+    def flush(self) -> None:
+        self.store.flush()
+
+    def close(self) -> None:
+        self.store.close()
@@ -0,0 +1,415 @@
+import bisect
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+STORAGE_ENGINES = ("json", "sqlite")
+
+
+def _sort_key(item: dict) -> tuple[bool, str]:
+    return item.get("priority") is None, item.get("priority") or ""
+
+
+def _order_key(item: dict) -> tuple[bool, str, int]:
+    # Priority first, then creation order; ids only ever grow.
+    return item.get("priority") is None, item.get("priority") or "", item["id"]
+
+
+class JsonTodoStore:
+    """Each sender's todos as a JSON array in ``<directory>/<sender>.json``.
+
+    Lists are kept in memory and only re-read when the file's mtime or size
+    changes underneath us. With a ``write_delay`` changes are written out that
+    many seconds later, so a burst of commands rewrites each file once.
+
+    Every todo has a stable per-sender ``id``. Alongside the items by id, each
+    sender has a list of order keys kept sorted with ``bisect`` as items come
+    and go, so list order never needs a full sort and a number is one index.
+
+    Callers get copies of the stored items and hand changes back through
+    ``update()``, so the write-behind timer never serialises an item that is
+    being changed.
+    """
+
+    def __init__(self, directory: Path | str | None, write_delay: float = 0.0) -> None:
+        self.directory = Path(directory) if directory is not None else None
+        self.write_delay = write_delay
+        # Insertion-ordered, which is also the order written to disk.
+        self.todos: dict[str, dict[int, dict]] = {}
+        self._order: dict[str, list[tuple[bool, str, int]]] = {}
+        self._next_id: dict[str, int] = {}
+        self._lock = threading.RLock()
+        # (mtime_ns, size) of each sender's file as last read or written by us.
+        self._stamps: dict[str, tuple[int, int]] = {}
+        self._dirty: set[str] = set()
+        self._timer: threading.Timer | None = None
+
+    def items(self, sender: str) -> list[dict]:
+        with self._lock:
+            items = self._items(sender)
+            return [dict(items[key[2]]) for key in self._order[sender]]
+
+    def ids(self, sender: str) -> list[int]:
+        with self._lock:
+            self._items(sender)
+            return [key[2] for key in self._order[sender]]
+
+    def get(self, sender: str, todo_id: int) -> dict | None:
+        with self._lock:
+            item = self._items(sender).get(todo_id)
+            return dict(item) if item is not None else None
+
+    def item_at(self, sender: str, number: int) -> dict | None:
+        with self._lock:
+            items = self._items(sender)
+            order = self._order[sender]
+            if number < 1 or number > len(order):
+                return None
+            return dict(items[order[number - 1][2]])
+
+    def numbered(self, sender: str, project: str | None = None, context: str | None = None) -> list[tuple[int, dict]]:
+        return [
+            (i, item) for i, item in enumerate(self.items(sender), 1)
+            if (project is None or project in item.get("projects", []))
+            and (context is None or context in item.get("contexts", []))
+        ]
+
+    def add(self, sender: str, items: list[dict]) -> None:
+        with self._lock:
+            todos = self._items(sender)
+            order = self._order[sender]
+            for item in items:
+                item["id"] = self._next_id[sender]
+                self._next_id[sender] += 1
+                todos[item["id"]] = dict(item)
+                bisect.insort(order, _order_key(item))
+            self._save(sender)
+
+    def update(self, sender: str, items: list[dict]) -> None:
+        with self._lock:
+            todos = self._items(sender)
+            for item in items:
+                # Only done state and completion time change, so each item keeps its place in the order.
+                if item["id"] in todos:
+                    todos[item["id"]] = dict(item)
+            self._save(sender)
+
+    def remove(self, sender: str, items: list[dict]) -> None:
+        with self._lock:
+            todos = self._items(sender)
+            order = self._order[sender]
+            for item in items:
+                if todos.pop(item["id"], None) is not None:
+                    del order[bisect.bisect_left(order, _order_key(item))]
+            self._save(sender)
+
+    def clear(self, sender: str) -> list[dict]:
+        with self._lock:
+            items = self.items(sender)
+            self.todos[sender] = {}
+            self._order[sender] = []
+            self._next_id[sender] = 1
+            self._save(sender)
+            return items
+
+    def project_counts(self, sender: str) -> dict[str, int]:
+        return self._tag_counts(sender, "projects")
+
+    def context_counts(self, sender: str) -> dict[str, int]:
+        return self._tag_counts(sender, "contexts")
+
+    def counts(self, sender: str) -> tuple[int, int]:
+        items = self._items(sender)
+        completed = sum(1 for item in items.values() if item.get("done"))
+        return len(items) - completed, completed
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            for sender in sorted(self._dirty):
+                self._write(sender)
+            self._dirty.clear()
+
+    def close(self) -> None:
+        self.flush()
+
+    def _tag_counts(self, sender: str, key: str) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for item in self._items(sender).values():
+            for tag in item.get(key, []):
+                counts[tag] = counts.get(tag, 0) + 1
+        return counts
+
+    def _path(self, sender: str) -> Path | None:
+        if self.directory is None:
+            return None
+        return self.directory / f"{sender}.json"
+
+    def _items(self, sender: str) -> dict[int, dict]:
+        with self._lock:
+            self._load(sender)
+            if sender not in self.todos:
+                self._index(sender, [])
+            return self.todos[sender]
+
+    def _index(self, sender: str, items: list[dict]) -> None:
+        next_id = max((item["id"] for item in items if "id" in item), default=0) + 1
+        for item in items:
+            if "id" not in item:
+                # Lists written before ids existed get them in file order, the same way on every load.
+                item["id"] = next_id
+                next_id += 1
+        self._next_id[sender] = next_id
+        self.todos[sender] = {item["id"]: item for item in items}
+        self._order[sender] = sorted(_order_key(item) for item in items)
+
+    def _load(self, sender: str) -> None:
+        path = self._path(sender)
+        if not path or sender in self._dirty:
+            # Unwritten changes are newer than anything on disk.
+            return
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if sender in self.todos and self._stamps.get(sender) == stamp:
+            return
+        self._index(sender, json.loads(path.read_text()))
+        self._stamps[sender] = stamp
+
+    def _save(self, sender: str) -> None:
+        if not self._path(sender):
+            return
+        if self.write_delay <= 0:
+            self._write(sender)
+            return
+        self._dirty.add(sender)
+        if self._timer is None:
+            self._timer = threading.Timer(self.write_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _write(self, sender: str) -> None:
+        path = self._path(sender)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(json.dumps(list(self.todos.get(sender, {}).values())))
+        os.replace(tmp, path)
+        stat = path.stat()
+        self._stamps[sender] = (stat.st_mtime_ns, stat.st_size)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS todos (
+    id INTEGER PRIMARY KEY,
+    sender TEXT NOT NULL,
+    task TEXT NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    priority TEXT,
+    created_at TEXT,
+    completed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS todos_sender_order ON todos (sender, priority IS NULL, priority, id);
+CREATE INDEX IF NOT EXISTS todos_sender_done ON todos (sender, done);
+CREATE TABLE IF NOT EXISTS todo_projects (
+    todo_id INTEGER NOT NULL REFERENCES todos (id) ON DELETE CASCADE,
+    sender TEXT NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS todo_projects_sender_name ON todo_projects (sender, name);
+CREATE INDEX IF NOT EXISTS todo_projects_todo ON todo_projects (todo_id);
+CREATE TABLE IF NOT EXISTS todo_contexts (
+    todo_id INTEGER NOT NULL REFERENCES todos (id) ON DELETE CASCADE,
+    sender TEXT NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS todo_contexts_sender_name ON todo_contexts (sender, name);
+CREATE INDEX IF NOT EXISTS todo_contexts_todo ON todo_contexts (todo_id);
+"""
+
+_ORDER = "priority IS NULL, priority, id"
+
+
+class SqliteTodoStore:
+    """All senders' todos in one SQLite database in WAL mode.
+
+    Ordering, filtering by project or context, and the counts behind
+    ``projects``, ``contexts`` and ``report`` are answered from indexes.
+    A sender's existing ``<sender>.json`` list is imported the first time
+    the sender is seen and renamed to ``<sender>.json.migrated``.
+    """
+
+    def __init__(self, directory: Path | str) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        # Calls come from the bot's worker threads; the lock serialises them.
+        self._db = sqlite3.connect(self.directory / "todos.sqlite3", check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(_SCHEMA)
+        self._checked: set[str] = set()
+
+    def items(self, sender: str) -> list[dict]:
+        return self._select(sender, f"SELECT * FROM todos WHERE sender = ? ORDER BY {_ORDER}", (sender,))
+
+    def ids(self, sender: str) -> list[int]:
+        with self._lock:
+            self._migrate(sender)
+            rows = self._db.execute(f"SELECT id FROM todos WHERE sender = ? ORDER BY {_ORDER}", (sender,))
+            return [todo_id for todo_id, in rows]
+
+    def get(self, sender: str, todo_id: int) -> dict | None:
+        items = self._select(sender, "SELECT * FROM todos WHERE sender = ? AND id = ?", (sender, todo_id))
+        return items[0] if items else None
+
+    def item_at(self, sender: str, number: int) -> dict | None:
+        if number < 1:
+            return None
+        items = self._select(
+            sender, f"SELECT * FROM todos WHERE sender = ? ORDER BY {_ORDER} LIMIT 1 OFFSET ?", (sender, number - 1)
+        )
+        return items[0] if items else None
+
+    def numbered(self, sender: str, project: str | None = None, context: str | None = None) -> list[tuple[int, dict]]:
+        query = f"SELECT * FROM (SELECT *, ROW_NUMBER() OVER (ORDER BY {_ORDER}) AS number FROM todos WHERE sender = ?)"
+        params: list = [sender]
+        filters = []
+        if project is not None:
+            filters.append("id IN (SELECT todo_id FROM todo_projects WHERE sender = ? AND name = ?)")
+            params += [sender, project]
+        if context is not None:
+            filters.append("id IN (SELECT todo_id FROM todo_contexts WHERE sender = ? AND name = ?)")
+            params += [sender, context]
+        if filters:
+            query += " WHERE " + " AND ".join(filters)
+        query += " ORDER BY number"
+        return [(item.pop("number"), item) for item in self._select(sender, query, tuple(params))]
+
+    def add(self, sender: str, items: list[dict]) -> None:
+        with self._lock:
+            self._migrate(sender)
+            with self._db:
+                for item in items:
+                    self._insert(sender, item)
+
+    def update(self, sender: str, items: list[dict]) -> None:
+        with self._lock, self._db:
+            self._db.executemany(
+                "UPDATE todos SET done = ?, completed_at = ? WHERE id = ? AND sender = ?",
+                [(int(item["done"]), item.get("completed_at"), item["id"], sender) for item in items],
+            )
+
+    def remove(self, sender: str, items: list[dict]) -> None:
+        with self._lock, self._db:
+            self._db.executemany(
+                "DELETE FROM todos WHERE id = ? AND sender = ?", [(item["id"], sender) for item in items]
+            )
+
+    def clear(self, sender: str) -> list[dict]:
+        with self._lock, self._db:
+            items = self.items(sender)
+            self._db.execute("DELETE FROM todos WHERE sender = ?", (sender,))
+            return items
+
+    def project_counts(self, sender: str) -> dict[str, int]:
+        return self._tag_counts(sender, "todo_projects")
+
+    def context_counts(self, sender: str) -> dict[str, int]:
+        return self._tag_counts(sender, "todo_contexts")
+
+    def counts(self, sender: str) -> tuple[int, int]:
+        with self._lock:
+            self._migrate(sender)
+            rows = self._db.execute("SELECT done, COUNT(*) FROM todos WHERE sender = ? GROUP BY done", (sender,))
+            counts = dict(rows.fetchall())
+        return counts.get(0, 0), counts.get(1, 0)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _tag_counts(self, sender: str, table: str) -> dict[str, int]:
+        with self._lock:
+            self._migrate(sender)
+            rows = self._db.execute(f"SELECT name, COUNT(*) FROM {table} WHERE sender = ? GROUP BY name", (sender,))
+            return dict(rows.fetchall())
+
+    def _select(self, sender: str, query: str, params: tuple) -> list[dict]:
+        with self._lock:
+            self._migrate(sender)
+            rows = self._db.execute(query, params).fetchall()
+            if not rows:
+                return []
+            # One item is looked up by id; a whole list by sender.
+            where, arg = ("todo_id = ?", rows[0]["id"]) if len(rows) == 1 else ("sender = ?", sender)
+            projects = self._tags("todo_projects", where, arg)
+            contexts = self._tags("todo_contexts", where, arg)
+        items = []
+        for row in rows:
+            item = dict(row)
+            del item["sender"]
+            item["done"] = bool(item["done"])
+            if item["completed_at"] is None:
+                del item["completed_at"]
+            item["projects"] = projects.get(row["id"], [])
+            item["contexts"] = contexts.get(row["id"], [])
+            items.append(item)
+        return items
+
+    def _tags(self, table: str, where: str, arg) -> dict[int, list[str]]:
+        tags: dict[int, list[str]] = {}
+        for todo_id, name in self._db.execute(f"SELECT todo_id, name FROM {table} WHERE {where} ORDER BY rowid", (arg,)):
+            tags.setdefault(todo_id, []).append(name)
+        return tags
+
+    def _insert(self, sender: str, item: dict) -> None:
+        cursor = self._db.execute(
+            "INSERT INTO todos (sender, task, done, priority, created_at, completed_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (sender, item["task"], int(item.get("done", False)), item.get("priority"),
+             item.get("created_at"), item.get("completed_at")),
+        )
+        item["id"] = cursor.lastrowid
+        self._db.executemany(
+            "INSERT INTO todo_projects (todo_id, sender, name) VALUES (?, ?, ?)",
+            [(item["id"], sender, name) for name in item.get("projects", [])],
+        )
+        self._db.executemany(
+            "INSERT INTO todo_contexts (todo_id, sender, name) VALUES (?, ?, ?)",
+            [(item["id"], sender, name) for name in item.get("contexts", [])],
+        )
+
+    def _migrate(self, sender: str) -> None:
+        if sender in self._checked:
+            return
+        self._checked.add(sender)
+        path = self.directory / f"{sender}.json"
+        if not path.exists():
+            return
+        items = sorted(json.loads(path.read_text()), key=_sort_key)
+        with self._db:
+            for item in items:
+                self._insert(sender, item)
+        path.rename(path.with_name(f"{path.name}.migrated"))
+        logger.info("Imported %d todos for %s into SQLite", len(items), sender)
+
+
+def open_store(engine: str, directory: Path | str | None, write_delay: float = 0.0) -> JsonTodoStore | SqliteTodoStore:
+    if engine == "sqlite":
+        return SqliteTodoStore(directory)
+    if engine == "json":
+        return JsonTodoStore(directory, write_delay=write_delay)
+    raise ValueError(f"Unknown todo storage engine: {engine!r} (expected one of {', '.join(STORAGE_ENGINES)})")
@@ -0,0 +1,83 @@
+import re
+from collections.abc import Iterable, Iterator
+
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+# Lowercase is accepted too, as /todo add always has, and stored uppercase.
+_PRIORITY = re.compile(r"\(([A-Za-z])\)")
+# Completed tasks keep their priority as a pri:X tag, per the todo.txt convention.
+_PRI_TAG = re.compile(r"pri:([A-Z])")
+
+
+def parse_line(line: str) -> dict | None:
+    """Parse one todo.txt line into a todo item, or None for a blank line.
+
+    Both ``/todo add`` and ``/todo import`` go through here, so a line means
+    the same thing to either.
+
+    The line is split into tokens once: the leading tokens are the completion
+    marker, dates and priority, and ``+project`` / ``@context`` tokens are
+    picked out of the rest in the same pass.
+    """
+    tokens = line.split()
+    if not tokens:
+        return None
+    i = 0
+    done = tokens[0] == "x"
+    completed_at = priority = created_at = None
+    if done:
+        i = 1
+        if i < len(tokens) and _DATE.fullmatch(tokens[i]):
+            completed_at = tokens[i]
+            i += 1
+    elif match := _PRIORITY.fullmatch(tokens[0]):
+        priority = match.group(1).upper()
+        i = 1
+    if i < len(tokens) and _DATE.fullmatch(tokens[i]):
+        created_at = tokens[i]
+        i += 1
+    words, projects, contexts = [], [], []
+    for token in tokens[i:]:
+        if len(token) > 1 and token[0] == "+":
+            projects.append(token[1:])
+        elif len(token) > 1 and token[0] == "@":
+            contexts.append(token[1:])
+        elif done and priority is None and (match := _PRI_TAG.fullmatch(token)):
+            priority = match.group(1)
+            continue
+        words.append(token)
+    item = {
+        "task": " ".join(words),
+        "done": done,
+        "priority": priority,
+        "projects": projects,
+        "contexts": contexts,
+        "created_at": created_at,
+    }
+    if completed_at is not None:
+        item["completed_at"] = completed_at
+    return item
+
+
+def format_item(item: dict) -> str:
+    """Format a todo item as one todo.txt line, without the newline."""
+    parts = []
+    priority = item.get("priority")
+    if item.get("done"):
+        parts.append("x")
+        if item.get("completed_at"):
+            parts.append(item["completed_at"][:10])
+    elif priority:
+        parts.append(f"({priority})")
+    if item.get("created_at"):
+        parts.append(item["created_at"][:10])
+    parts.append(item["task"])
+    if item.get("done") and priority:
+        parts.append(f"pri:{priority}")
+    return " ".join(parts)
+
+
+def parse_lines(lines: Iterable[str]) -> Iterator[dict]:
+    for line in lines:
+        item = parse_line(line)
+        if item is not None:
+            yield item
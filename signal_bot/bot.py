@@ -1,26 +1,38 @@
+import asyncio
 import logging
+import time
+from collections.abc import AsyncIterator
 from pathlib import Path
 from datetime import datetime, timezone
-from signal_bot.app_interface import CommandApp
-from signal_bot.logging import log_message
+from signal_bot.app_interface import AsyncCommandApp
+from signal_bot.dispatcher import Dispatcher
+from signal_bot.logging import BackgroundLogWriter, MessageLogWriter
 from signal_bot.message import Message, Direction
 from signal_bot.registry import AppRegistry
-from signal_bot.router import route_command
+from signal_bot.router import resolve_command
 from signal_bot.signal_cli import SignalCli
 
 logger = logging.getLogger(__name__)
 
+# Signal clients stop applying edits to a message after this many.
+MAX_EDITS = 10
+
 
 class Bot:
-    def __init__(self, account: str, cli_path: str = "signal-cli", log_dir: Path | str = "logs", allowed_senders: list[str] | None = None, backend=None) -> None:
+    def __init__(self, account: str, cli_path: str = "signal-cli", log_dir: Path | str = "logs", allowed_senders: list[str] | None = None, backend=None, workers: int = 4, log_writer: MessageLogWriter | BackgroundLogWriter | None = None, edit_interval: float = 1.0, typing_interval: float = 10.0) -> None:
         self.account = account
         self.signal_cli = backend if backend is not None else SignalCli(account=account, cli_path=cli_path)
         self.registry = AppRegistry()
         self.log_dir = Path(log_dir)
+        self.log_writer = log_writer if log_writer is not None else MessageLogWriter()
         self.allowed_senders = allowed_senders
+        self.workers = workers
+        self.edit_interval = edit_interval
+        # Signal clients hide a typing indicator after about 15 seconds unless it is sent again.
+        self.typing_interval = typing_interval
         self._modes: dict[str, str] = {}
 
-    def register_app(self, app: CommandApp) -> None:
+    def register_app(self, app: AsyncCommandApp) -> None:
         self.registry.register(app)
 
     def _is_authorized(self, sender: str) -> bool:
@@ -43,8 +55,50 @@ class Bot:
             return f"Exited {parsed.command} mode."
         return None
 
-    def _send_response(self, recipient: str, body: str) -> None:
-        self.signal_cli.send(recipient, body)
+    def _resolve_app(self, msg: Message) -> tuple[AsyncCommandApp, str] | None:
+        resolved = resolve_command(msg.body, self.registry, sender=msg.sender)
+        if resolved is None and msg.sender in self._modes:
+            app = self.registry.get(self._modes[msg.sender])
+            if app is not None:
+                logger.debug("Dispatching to mode app=%s for sender=%s", app.name, msg.sender)
+                resolved = (app, msg.body)
+        return resolved
+
+    async def _backend_call(self, method: str, *args, **kwargs):
+        # Backends with native async methods are awaited directly; blocking ones run on a worker thread.
+        async_method = getattr(self.signal_cli, f"{method}_async", None)
+        if async_method is not None:
+            return await async_method(*args, **kwargs)
+        return await asyncio.to_thread(getattr(self.signal_cli, method), *args, **kwargs)
+
+    async def _send(self, recipient: str, body: str, edit_timestamp: int | None = None) -> int | None:
+        if edit_timestamp is None:
+            return await self._backend_call("send", recipient, body)
+        return await self._backend_call("send", recipient, body, edit_timestamp=edit_timestamp)
+
+    async def _keep_typing(self, recipient: str) -> None:
+        # Sending a message clears the indicator, but it is only re-sent on this timer:
+        # one sendTyping per interval at most, however many lines or edits go out meanwhile.
+        while True:
+            try:
+                await self._backend_call("send_typing", recipient)
+            except Exception as e:
+                logger.debug("Could not send typing indicator to %s: %s", recipient, e)
+            await asyncio.sleep(self.typing_interval)
+
+    async def _stop_typing(self, recipient: str, task: asyncio.Task) -> None:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        try:
+            await self._backend_call("send_typing", recipient, stop=True)
+        except Exception as e:
+            logger.debug("Could not clear typing indicator for %s: %s", recipient, e)
+
+    async def _send_response(self, recipient: str, body: str) -> None:
+        await self._send(recipient, body)
+        self._log_outgoing(recipient, body)
+
+    def _log_outgoing(self, recipient: str, body: str) -> None:
         outgoing = Message(
             sender=self.account,
             recipient=recipient,
@@ -52,30 +106,141 @@ class Bot:
             direction=Direction.OUTGOING,
             timestamp=datetime.now(timezone.utc),
         )
-        log_message(outgoing, self.log_dir)
-
-    def process_messages(self) -> None:
-        messages = self.signal_cli.receive()
-        for msg in messages:
-            if not self._is_authorized(msg.sender):
-                logger.debug("Unauthorized sender %s — dropping message", msg.sender)
-                unauthorized_dir = self.log_dir / "unauthorized"
-                unauthorized_dir.mkdir(parents=True, exist_ok=True)
-                log_message(msg, unauthorized_dir)
+        self.log_writer.write(outgoing, self.log_dir)
+
+    async def handle_message(self, msg: Message) -> None:
+        if not self._is_authorized(msg.sender):
+            logger.debug("Unauthorized sender %s — dropping message", msg.sender)
+            self.log_writer.write(msg, self.log_dir / "unauthorized")
+            return
+        self.log_writer.write(msg, self.log_dir)
+        mode_response = self._handle_mode_command(msg)
+        if mode_response is not None:
+            await self._send_response(msg.sender, mode_response)
+            return
+        resolved = self._resolve_app(msg)
+        if resolved is None:
+            logger.debug("No response for message from %s", msg.sender)
+            return
+        app, args = resolved
+        typing = None
+        if app.typing_indicator and hasattr(self.signal_cli, "send_typing"):
+            typing = asyncio.create_task(self._keep_typing(msg.sender))
+        try:
+            await self._respond(app, args, msg.sender)
+        finally:
+            if typing is not None:
+                await self._stop_typing(msg.sender, typing)
+
+    async def _respond(self, app: AsyncCommandApp, args: str, sender: str) -> None:
+        responses = app.handle_async(args, sender=sender)
+        if not app.stream_edits:
+            async for r in responses:
+                await self._send_response(sender, r)
+        elif getattr(self.signal_cli, "supports_edits", False) is True:
+            await self._stream_edits(sender, responses)
+        else:
+            await self._stream_lines(sender, responses)
+
+    async def _stream_edits(self, recipient: str, fragments: AsyncIterator[str]) -> None:
+        """Send a streamed reply as one message, edited at most every ``edit_interval`` seconds as it grows."""
+        parts: list[str] = []
+        sent = ""
+        timestamp = None
+        edits = 0
+        last_sent_at = 0.0
+        async for fragment in fragments:
+            parts.append(fragment)
+            if timestamp is not None and (time.monotonic() - last_sent_at < self.edit_interval or edits >= MAX_EDITS - 1):
+                # The last edit allowed is kept for the finished reply.
                 continue
-            log_message(msg, self.log_dir)
-            mode_response = self._handle_mode_command(msg)
-            if mode_response is not None:
-                self._send_response(msg.sender, mode_response)
+            text = "".join(parts).strip()
+            if not text or text == sent or (sent and timestamp is None):
                 continue
-            responses = route_command(msg.body, self.registry, sender=msg.sender)
-            if responses is None and msg.sender in self._modes:
-                app = self.registry.get(self._modes[msg.sender])
-                if app is not None:
-                    logger.debug("Dispatching to mode app=%s for sender=%s", app.name, msg.sender)
-                    responses = app.handle(msg.body, sender=msg.sender)
-            if responses is not None:
-                for r in responses:
-                    self._send_response(msg.sender, r)
+            if timestamp is None:
+                timestamp = await self._send(recipient, text)
+            else:
+                await self._send(recipient, text, edit_timestamp=timestamp)
+                edits += 1
+            sent = text
+            last_sent_at = time.monotonic()
+        text = "".join(parts).strip()
+        if text != sent:
+            if timestamp is not None:
+                await self._send(recipient, text, edit_timestamp=timestamp)
+            elif sent:
+                # The backend didn't say which message it sent, so the rest goes out as a new one.
+                await self._send(recipient, text[len(sent):].strip())
             else:
-                logger.debug("No response for message from %s", msg.sender)
+                await self._send(recipient, text)
+        if text:
+            self._log_outgoing(recipient, text)
+
+    async def _stream_lines(self, recipient: str, fragments: AsyncIterator[str]) -> None:
+        """Send a streamed reply a line at a time, for backends that cannot edit messages."""
+        pending = ""
+        async for fragment in fragments:
+            pending += fragment
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                if line.strip():
+                    await self._send_response(recipient, line)
+        if pending.strip():
+            await self._send_response(recipient, pending)
+
+    def notify_received(self, msg: Message) -> None:
+        """Tell apps about a message as soon as it arrives, ahead of the sender's queued messages.
+
+        Apps that define ``interrupt(sender, args)`` get the args if the
+        message is for them and None otherwise, so a long-running handler
+        can be told to stop before the next message is its turn.
+        """
+        if not self._is_authorized(msg.sender):
+            return
+        resolved = self._resolve_app(msg)
+        for app in self.registry.all_apps():
+            interrupt = getattr(app, "interrupt", None)
+            if interrupt is not None:
+                interrupt(msg.sender, resolved[1] if resolved is not None and resolved[0] is app else None)
+
+    def dispatcher(self) -> Dispatcher:
+        return Dispatcher(self.handle_message, workers=self.workers, on_submit=self.notify_received)
+
+    async def receive(self, timeout: float | None = None) -> list[Message]:
+        if timeout is None:
+            return await self._backend_call("receive")
+        return await self._backend_call("receive", timeout=timeout)
+
+    async def process_messages_async(self, timeout: float | None = None) -> None:
+        messages = await self.receive(timeout=timeout)
+        async with self.dispatcher() as dispatcher:
+            for msg in messages:
+                dispatcher.submit(msg)
+
+    def process_messages(self, timeout: float | None = None) -> None:
+        asyncio.run(self._process_messages_once(timeout))
+        self.log_writer.flush()
+
+    async def _process_messages_once(self, timeout: float | None) -> None:
+        try:
+            await self.process_messages_async(timeout=timeout)
+        finally:
+            # The event loop ends with this call, so apps let go of what is bound to it.
+            await self.close_async()
+
+    async def close_async(self) -> None:
+        # Apps close what belongs to the running event loop (async HTTP clients) here, before it stops.
+        for app in self.registry.all_apps():
+            close_app = getattr(app, "close_async", None)
+            if close_app is not None:
+                await close_app()
+
+    def close(self) -> None:
+        for app in self.registry.all_apps():
+            close_app = getattr(app, "close", None)
+            if close_app is not None:
+                close_app()
+        self.log_writer.close()
+        close_backend = getattr(self.signal_cli, "close", None)
+        if close_backend is not None:
+            close_backend()
@@ -14,7 +14,31 @@ class Config:
     signal_cli_mode: str = "subprocess"
     signal_cli_host: str = "localhost"
     signal_cli_port: int = 7583
+    signal_cli_receive_mode: str = "push"
     ollama_host: str = "http://localhost:11434"
+    dispatch_workers: int = 4
+    log_flush_interval: float = 1.0
+    log_fsync: str = "never"
+    log_queue_size: int = 10000
+    log_queue_overflow: str = "block"
+    geocode_cache_size: int = 1000
+    geocode_negative_ttl: float = 86400
+    gazetteer_path: str | None = None
+    todo_write_delay: float = 0.5
+    todo_storage: str = "json"
+    gemma3_history_messages: int = 100
+    gemma3_context_tokens: int = 3072
+    gemma3_summary: bool = False
+    gemma3_cancel_on_new_message: bool = False
+    gemma3_stream_edits: bool = False
+    gemma3_keep_alive: str | None = None
+    gemma3_warm_up: bool = False
+    gemma3_keep_warm_interval: float = 0.0
+    gemma3_active_hours: str | None = None
+    gemma3_max_concurrent: int = 1
+    gemma3_typing_indicator: bool = True
+    stream_edit_interval: float = 1.0
+    typing_interval: float = 10.0
 
 
 def load_config(use_dotenv: bool = True, debug: bool | None = None) -> Config:
@@ -35,7 +59,31 @@ def load_config(use_dotenv: bool = True, debug: bool | None = None) -> Config:
         signal_cli_mode=os.environ.get("SIGNAL_CLI_MODE", "subprocess"),
         signal_cli_host=os.environ.get("SIGNAL_CLI_HOST", "localhost"),
         signal_cli_port=int(os.environ.get("SIGNAL_CLI_PORT", "7583")),
+        signal_cli_receive_mode=os.environ.get("SIGNAL_CLI_RECEIVE_MODE", "push"),
         ollama_host=os.environ.get("OLLAMA_HOST", "http://localhost:11434"),
+        dispatch_workers=int(os.environ.get("DISPATCH_WORKERS", "4")),
+        log_flush_interval=float(os.environ.get("LOG_FLUSH_INTERVAL", "1.0")),
+        log_fsync=os.environ.get("LOG_FSYNC", "never"),
+        log_queue_size=int(os.environ.get("LOG_QUEUE_SIZE", "10000")),
+        log_queue_overflow=os.environ.get("LOG_QUEUE_OVERFLOW", "block"),
+        geocode_cache_size=int(os.environ.get("GEOCODE_CACHE_SIZE", "1000")),
+        geocode_negative_ttl=float(os.environ.get("GEOCODE_NEGATIVE_TTL", "86400")),
+        gazetteer_path=os.environ.get("GAZETTEER_PATH") or None,
+        todo_write_delay=float(os.environ.get("TODO_WRITE_DELAY", "0.5")),
+        todo_storage=os.environ.get("TODO_STORAGE", "json"),
+        gemma3_history_messages=int(os.environ.get("GEMMA3_HISTORY_MESSAGES", "100")),
+        gemma3_context_tokens=int(os.environ.get("GEMMA3_CONTEXT_TOKENS", "3072")),
+        gemma3_summary=os.environ.get("GEMMA3_SUMMARY", "").lower() in ("1", "true"),
+        gemma3_cancel_on_new_message=os.environ.get("GEMMA3_CANCEL_ON_NEW_MESSAGE", "").lower() in ("1", "true"),
+        gemma3_stream_edits=os.environ.get("GEMMA3_STREAM_EDITS", "").lower() in ("1", "true"),
+        gemma3_keep_alive=os.environ.get("GEMMA3_KEEP_ALIVE") or None,
+        gemma3_warm_up=os.environ.get("GEMMA3_WARM_UP", "").lower() in ("1", "true"),
+        gemma3_keep_warm_interval=float(os.environ.get("GEMMA3_KEEP_WARM_INTERVAL", "0")),
+        gemma3_active_hours=os.environ.get("GEMMA3_ACTIVE_HOURS") or None,
+        gemma3_max_concurrent=int(os.environ.get("GEMMA3_MAX_CONCURRENT", "1")),
+        gemma3_typing_indicator=os.environ.get("GEMMA3_TYPING_INDICATOR", "true").lower() in ("1", "true"),
+        stream_edit_interval=float(os.environ.get("STREAM_EDIT_INTERVAL", "1.0")),
+        typing_interval=float(os.environ.get("TYPING_INTERVAL", "10.0")),
     )
 
 
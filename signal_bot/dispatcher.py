@@ -0,0 +1,86 @@
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable
+from signal_bot.message import Message
+
+logger = logging.getLogger(__name__)
+
+
+class Dispatcher:
+    """Hands messages to a fixed pool of worker tasks.
+
+    Messages from one sender are handled strictly one at a time in arrival
+    order; different senders are handled concurrently, at most ``workers``
+    at once. A sender with a backlog goes to the back of the line after each
+    message so it cannot starve the others.
+
+    ``on_submit`` is called with each message as it is submitted, before it
+    waits for any earlier messages from its sender.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Message], Awaitable[None]],
+        workers: int = 4,
+        on_submit: Callable[[Message], None] | None = None,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("Dispatcher needs at least one worker")
+        self._handler = handler
+        self._on_submit = on_submit
+        self._workers = workers
+        self._pending: dict[str, deque[Message]] = {}
+        self._ready: asyncio.Queue[str] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+
+    async def __aenter__(self) -> "Dispatcher":
+        self._tasks = [asyncio.create_task(self._work(), name=f"dispatch-worker-{i}") for i in range(self._workers)]
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        try:
+            await self.join()
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+
+    @property
+    def pending(self) -> int:
+        return sum(len(q) for q in self._pending.values())
+
+    def submit(self, msg: Message) -> None:
+        if self._on_submit is not None:
+            try:
+                self._on_submit(msg)
+            except Exception:
+                logger.exception("on_submit failed for message from %s", msg.sender)
+        queue = self._pending.get(msg.sender)
+        if queue is not None:
+            # The sender is already queued or being handled; its worker will pick this up next.
+            queue.append(msg)
+            return
+        self._pending[msg.sender] = deque([msg])
+        self._ready.put_nowait(msg.sender)
+
+    async def join(self) -> None:
+        await self._ready.join()
+
+    async def _work(self) -> None:
+        while True:
+            sender = await self._ready.get()
+            try:
+                queue = self._pending[sender]
+                msg = queue.popleft()
+                try:
+                    await self._handler(msg)
+                except Exception:
+                    logger.exception("Error handling message from %s", sender)
+                if queue:
+                    self._ready.put_nowait(sender)
+                else:
+                    del self._pending[sender]
+            finally:
+                self._ready.task_done()
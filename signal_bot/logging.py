@@ -1,11 +1,202 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
 from pathlib import Path
+from typing import TextIO
 from signal_bot.message import Message
 
+logger = logging.getLogger(__name__)
 
-def log_message(message: Message, log_dir: Path) -> None:
-    filename = message.timestamp.strftime("%Y_%m_%d") + ".txt"
-    log_file = Path(log_dir) / filename
+FSYNC_POLICIES = ("never", "flush", "always")
+OVERFLOW_POLICIES = ("block", "drop-oldest", "count-and-drop")
+
+
+def _log_filename(message: Message) -> str:
+    return message.timestamp.strftime("%Y_%m_%d") + ".txt"
+
+
+def _format_line(message: Message) -> str:
     timestamp = message.timestamp.isoformat()
-    line = f"{timestamp} [{message.direction.value}] {message.sender} -> {message.recipient}: {message.body}\n"
+    return f"{timestamp} [{message.direction.value}] {message.sender} -> {message.recipient}: {message.body}\n"
+
+
+def log_message(message: Message, log_dir: Path) -> None:
+    log_file = Path(log_dir) / _log_filename(message)
     with open(log_file, "a") as f:
-        f.write(line)
+        f.write(_format_line(message))
+
+
+class MessageLogWriter:
+    """Appends messages to the same daily files as ``log_message``, keeping them open.
+
+    Lines are buffered and written out once ``flush_interval`` seconds have
+    passed since the last flush (``0`` writes every message straight through).
+    ``fsync`` is one of ``"never"``, ``"flush"`` (after every flush) or
+    ``"always"`` (flush and fsync every message). Handles for a day are closed
+    once messages for a later day arrive.
+    """
+
+    def __init__(self, flush_interval: float = 0.0, fsync: str = "never") -> None:
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {', '.join(FSYNC_POLICIES)}, got '{fsync}'")
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._buffers: dict[Path, list[str]] = {}
+        self._files: dict[Path, TextIO] = {}
+        self._day = ""
+        self._last_flush = time.monotonic()
+
+    def write(self, message: Message, log_dir: Path | str) -> None:
+        path = Path(log_dir) / _log_filename(message)
+        line = _format_line(message)
+        with self._lock:
+            self._buffers.setdefault(path, []).append(line)
+            if self.fsync == "always" or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+
+    def flush(self, blocking: bool = True) -> bool:
+        """Write out buffered lines. Returns False if ``blocking`` is off and a write is in progress."""
+        if not self._lock.acquire(blocking=blocking):
+            return False
+        try:
+            self._flush_locked()
+        finally:
+            self._lock.release()
+        return True
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            for f in self._files.values():
+                f.close()
+            self._files.clear()
+
+    def _flush_locked(self) -> None:
+        buffers, self._buffers = self._buffers, {}
+        for path, lines in buffers.items():
+            f = self._open(path)
+            f.write("".join(lines))
+            f.flush()
+            if self.fsync != "never":
+                os.fsync(f.fileno())
+            if path.name < self._day:
+                # A late message for an earlier day; don't keep that file open.
+                f.close()
+                del self._files[path]
+        self._last_flush = time.monotonic()
+
+    def _open(self, path: Path) -> TextIO:
+        f = self._files.get(path)
+        if f is not None:
+            return f
+        if path.name > self._day:
+            # Midnight rollover: the previous day's files are finished.
+            for old in self._files.values():
+                old.close()
+            self._files.clear()
+            self._day = path.name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        f = self._files[path] = open(path, "a")
+        return f
+
+
+class BackgroundLogWriter:
+    """Moves ``MessageLogWriter`` disk I/O onto a background thread.
+
+    ``write`` only appends to a bounded in-memory queue. When ``max_pending``
+    records are already waiting, ``overflow`` decides what happens: ``"block"``
+    waits for room, ``"drop-oldest"`` discards the oldest queued record and
+    ``"count-and-drop"`` discards the new one. Discarded records are counted
+    in ``dropped``.
+    """
+
+    def __init__(self, writer: MessageLogWriter, max_pending: int = 10000, overflow: str = "block") -> None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {', '.join(OVERFLOW_POLICIES)}, got '{overflow}'")
+        if max_pending < 1:
+            raise ValueError("max_pending must be at least 1")
+        self._writer = writer
+        self.max_pending = max_pending
+        self.overflow = overflow
+        self.dropped = 0
+        self._queue: deque[tuple[Message, Path | str]] = deque()
+        self._cond = threading.Condition(threading.Lock())
+        self._flush_requested = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="message-log-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def flush_interval(self) -> float:
+        return self._writer.flush_interval
+
+    @property
+    def pending(self) -> int:
+        """Records queued but not yet handed to the file writer."""
+        with self._cond:
+            return len(self._queue)
+
+    def write(self, message: Message, log_dir: Path | str) -> None:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BackgroundLogWriter is closed")
+            if len(self._queue) >= self.max_pending:
+                if self.overflow == "block":
+                    self._cond.wait_for(lambda: len(self._queue) < self.max_pending or self._closed)
+                elif self.overflow == "drop-oldest":
+                    self._queue.popleft()
+                    self.dropped += 1
+                else:
+                    self.dropped += 1
+                    return
+            self._queue.append((message, log_dir))
+            self._cond.notify_all()
+
+    def flush(self, blocking: bool = True) -> bool:
+        """Ask the writer thread to write everything out; with ``blocking``, wait until it has."""
+        if not self._cond.acquire(blocking=blocking):
+            return False
+        try:
+            self._flush_requested = True
+            self._cond.notify_all()
+            if blocking:
+                self._cond.wait_for(lambda: not self._flush_requested or not self._thread.is_alive())
+        finally:
+            self._cond.release()
+        return True
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._writer.close()
+        if self.dropped:
+            logger.warning("Message log queue overflowed; %d records were dropped", self.dropped)
+
+    def _run(self) -> None:
+        timeout = self._writer.flush_interval if self._writer.flush_interval > 0 else None
+        while True:
+            with self._cond:
+                if not (self._queue or self._flush_requested or self._closed):
+                    self._cond.wait(timeout=timeout)
+                batch = list(self._queue)
+                self._queue.clear()
+                flush_requested = self._flush_requested
+                closed = self._closed
+                # Writers blocked on a full queue can continue while this batch hits the disk.
+                self._cond.notify_all()
+            for message, log_dir in batch:
+                self._writer.write(message, log_dir)
+            if flush_requested or closed or not batch:
+                # An empty batch means the wait timed out: write out lines buffered since the last message.
+                self._writer.flush()
+            with self._cond:
+                if flush_requested and not self._queue:
+                    self._flush_requested = False
+                    self._cond.notify_all()
+            if closed and not batch:
+                return
@@ -1,58 +1,108 @@
+import asyncio
 import logging
 import signal
 import sys
-import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from datetime import datetime, timezone
 from signal_bot.bot import Bot
 from signal_bot.config import Config, load_config
-from signal_bot.logging import log_message
+from signal_bot.logging import BackgroundLogWriter, MessageLogWriter, log_message
 from signal_bot.message import Message, Direction
-from signal_bot.router import route_command
 from signal_bot.apps.test_app import TestApp
 from signal_bot.apps.date_app import DateApp
+from signal_bot.apps.gazetteer import Gazetteer
 from signal_bot.apps.help_app import HelpApp
 from signal_bot.apps.todo_app import TodoApp
 from signal_bot.apps.gemma3_app import Gemma3App
 from signal_bot.signal_cli_jsonrpc import SignalCliJsonRpc
+from signal_bot.signal_cli_stdio import SignalCliStdio
 
 logger = logging.getLogger(__name__)
 
 POLL_INTERVAL = 5
 CLI_FAKE_SENDER = "+440000000000"
 _running = True
+_bot: Bot | None = None
 
 
-def create_bot(config: Config) -> Bot:
+def _create_backend(config: Config) -> SignalCliJsonRpc | None:
+    push = config.signal_cli_receive_mode == "push"
     if config.signal_cli_mode == "jsonrpc":
-        backend = SignalCliJsonRpc(
+        return SignalCliJsonRpc(
             account=config.phone_number,
             host=config.signal_cli_host,
             port=config.signal_cli_port,
+            push=push,
         )
-        bot = Bot(
-            account=config.phone_number,
-            log_dir=config.log_dir,
-            allowed_senders=config.allowed_senders,
-            backend=backend,
-        )
-    else:
-        bot = Bot(
-            account=config.phone_number,
-            cli_path=config.cli_path,
-            log_dir=config.log_dir,
-            allowed_senders=config.allowed_senders,
-        )
+    if config.signal_cli_mode == "stdio":
+        return SignalCliStdio(account=config.phone_number, cli_path=config.cli_path, push=push)
+    return None
+
+
+def _open_gazetteer(config: Config) -> Gazetteer | None:
+    if not config.gazetteer_path:
+        return None
+    try:
+        return Gazetteer.from_geonames(config.gazetteer_path, Path(config.data_dir) / "gazetteer.idx")
+    except OSError as e:
+        logger.warning("Offline gazetteer unavailable, using Nominatim only: %s", e)
+        return None
+
+
+def create_bot(config: Config) -> Bot:
+    bot = Bot(
+        account=config.phone_number,
+        cli_path=config.cli_path,
+        log_dir=config.log_dir,
+        allowed_senders=config.allowed_senders,
+        backend=_create_backend(config),
+        workers=config.dispatch_workers,
+        edit_interval=config.stream_edit_interval,
+        typing_interval=config.typing_interval,
+        log_writer=BackgroundLogWriter(
+            MessageLogWriter(flush_interval=config.log_flush_interval, fsync=config.log_fsync),
+            max_pending=config.log_queue_size,
+            overflow=config.log_queue_overflow,
+        ),
+    )
     bot.register_app(TestApp())
-    bot.register_app(DateApp(data_dir=config.data_dir))
+    bot.register_app(DateApp(
+        data_dir=config.data_dir,
+        cache_size=config.geocode_cache_size,
+        negative_ttl=config.geocode_negative_ttl,
+        gazetteer=_open_gazetteer(config),
+    ))
     bot.register_app(HelpApp(bot.registry))
-    bot.register_app(TodoApp(data_dir=config.data_dir))
-    bot.register_app(Gemma3App(data_dir=config.data_dir, ollama_host=config.ollama_host))
+    bot.register_app(TodoApp(
+        data_dir=config.data_dir,
+        write_delay=config.todo_write_delay,
+        storage=config.todo_storage,
+    ))
+    bot.register_app(Gemma3App(
+        data_dir=config.data_dir,
+        ollama_host=config.ollama_host,
+        history_messages=config.gemma3_history_messages,
+        context_tokens=config.gemma3_context_tokens,
+        summarize=config.gemma3_summary,
+        cancel_on_new_message=config.gemma3_cancel_on_new_message,
+        stream_edits=config.gemma3_stream_edits,
+        keep_alive=config.gemma3_keep_alive,
+        warm_up=config.gemma3_warm_up,
+        keep_warm_interval=config.gemma3_keep_warm_interval,
+        active_hours=config.gemma3_active_hours,
+        max_concurrent=config.gemma3_max_concurrent,
+        typing_indicator=config.gemma3_typing_indicator,
+    ))
     return bot
 
 
 def _shutdown(signum, frame):
     global _running
     _running = False
+    if _bot is not None:
+        # Don't wait on a write this thread may be in the middle of; bot.close() flushes the rest.
+        _bot.log_writer.flush(blocking=False)
 
 
 def _cli_send(bot: Bot, recipient: str, body: str) -> None:
@@ -67,6 +117,23 @@ def _cli_send(bot: Bot, recipient: str, body: str) -> None:
     log_message(outgoing, bot.log_dir)
 
 
+async def _cli_stream(bot: Bot, recipient: str, fragments) -> None:
+    print("[bot] ", end="", flush=True)
+    parts = []
+    async for fragment in fragments:
+        parts.append(fragment)
+        print(fragment, end="", flush=True)
+    print()
+    outgoing = Message(
+        sender=bot.account,
+        recipient=recipient,
+        body="".join(parts).strip(),
+        direction=Direction.OUTGOING,
+        timestamp=datetime.now(timezone.utc),
+    )
+    log_message(outgoing, bot.log_dir)
+
+
 def run_cli(config: Config) -> None:
     logging.basicConfig(
         level=logging.DEBUG if config.debug else logging.WARNING,
@@ -80,53 +147,65 @@ def run_cli(config: Config) -> None:
     print("Type a message and press Enter. Ctrl+D or empty input to quit.")
     print()
 
-    while True:
-        try:
-            raw = input("> ")
-        except EOFError:
-            print()
-            break
-
-        if not raw.strip():
-            break
-
-        msg = Message(
-            sender=sender,
-            recipient=bot.account,
-            body=raw,
-            direction=Direction.INCOMING,
-            timestamp=datetime.now(timezone.utc),
-        )
+    try:
+        asyncio.run(_cli_session(bot, sender))
+    finally:
+        bot.close()
+    print("Bye.")
 
-        if not bot._is_authorized(sender):
-            unauthorized_dir = bot.log_dir / "unauthorized"
-            unauthorized_dir.mkdir(parents=True, exist_ok=True)
-            log_message(msg, unauthorized_dir)
-            print("[unauthorized sender — message dropped]")
-            continue
 
-        log_message(msg, bot.log_dir)
+async def _cli_session(bot: Bot, sender: str) -> None:
+    # One event loop for the whole session, so apps' async clients keep their connections.
+    # Nothing else runs on it, so waiting for input may block it.
+    try:
+        while True:
+            try:
+                raw = input("> ")
+            except EOFError:
+                print()
+                break
 
-        mode_response = bot._handle_mode_command(msg)
-        if mode_response is not None:
-            _cli_send(bot, sender, mode_response)
-            continue
+            if not raw.strip():
+                break
 
-        responses = route_command(msg.body, bot.registry, sender=sender)
-        if responses is None and sender in bot._modes:
-            app = bot.registry.get(bot._modes[sender])
-            if app is not None:
-                responses = app.handle(msg.body, sender=sender)
+            msg = Message(
+                sender=sender,
+                recipient=bot.account,
+                body=raw,
+                direction=Direction.INCOMING,
+                timestamp=datetime.now(timezone.utc),
+            )
 
-        if responses is not None:
-            for r in responses:
-                _cli_send(bot, sender, r)
+            if not bot._is_authorized(sender):
+                unauthorized_dir = bot.log_dir / "unauthorized"
+                unauthorized_dir.mkdir(parents=True, exist_ok=True)
+                log_message(msg, unauthorized_dir)
+                print("[unauthorized sender — message dropped]")
+                continue
 
-    print("Bye.")
+            log_message(msg, bot.log_dir)
+
+            mode_response = bot._handle_mode_command(msg)
+            if mode_response is not None:
+                _cli_send(bot, sender, mode_response)
+                continue
+
+            resolved = bot._resolve_app(msg)
+            if resolved is None:
+                continue
+            app, args = resolved
+            responses = app.handle_async(args, sender=sender)
+            if app.stream_edits:
+                await _cli_stream(bot, sender, responses)
+            else:
+                async for r in responses:
+                    _cli_send(bot, sender, r)
+    finally:
+        await bot.close_async()
 
 
 def run(debug: bool | None = None):
-    global _running
+    global _running, _bot
     _running = True
 
     config = load_config(debug=debug)
@@ -134,19 +213,45 @@ def run(debug: bool | None = None):
         level=logging.DEBUG if config.debug else logging.WARNING,
         format="%(asctime)s %(levelname)s %(name)s: %(message)s",
     )
-    bot = create_bot(config)
+    bot = _bot = create_bot(config)
 
     signal.signal(signal.SIGINT, _shutdown)
     signal.signal(signal.SIGTERM, _shutdown)
 
+    push = getattr(bot.signal_cli, "push", False)
     logger.info("Signal bot started for %s", config.phone_number)
-    logger.info("Polling every %ss. Press Ctrl+C to stop.", POLL_INTERVAL)
+    if push:
+        logger.info("Waiting for pushed messages. Press Ctrl+C to stop.")
+    else:
+        logger.info("Polling every %ss. Press Ctrl+C to stop.", POLL_INTERVAL)
 
-    while _running:
-        try:
-            bot.process_messages()
-        except Exception as e:
-            logger.error("Error processing messages: %s", e)
-        time.sleep(POLL_INTERVAL)
+    try:
+        asyncio.run(_serve(bot, push))
+    finally:
+        bot.close()
+        _bot = None
 
     logger.info("Signal bot stopped.")
+
+
+async def _serve(bot: Bot, push: bool) -> None:
+    # Sync apps and blocking backend calls share this pool; one thread per worker plus one for receive.
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=bot.workers + 1, thread_name_prefix="signal-bot")
+    )
+    try:
+        async with bot.dispatcher() as dispatcher:
+            while _running:
+                try:
+                    if push:
+                        # Blocks until the daemon pushes messages, waking up regularly to check _running.
+                        for msg in await bot.receive(timeout=POLL_INTERVAL):
+                            dispatcher.submit(msg)
+                        continue
+                    for msg in await bot.receive():
+                        dispatcher.submit(msg)
+                except Exception as e:
+                    logger.error("Error receiving messages: %s", e)
+                await asyncio.sleep(POLL_INTERVAL)
+    finally:
+        await bot.close_async()
@@ -1,17 +1,17 @@
-from signal_bot.app_interface import CommandApp
+from signal_bot.app_interface import AsyncCommandApp
 
 
 class AppRegistry:
     def __init__(self) -> None:
-        self._apps: dict[str, CommandApp] = {}
+        self._apps: dict[str, AsyncCommandApp] = {}
 
-    def register(self, app: CommandApp) -> None:
+    def register(self, app: AsyncCommandApp) -> None:
         if app.name in self._apps:
             raise ValueError(f"Command '{app.name}' is already registered")
         self._apps[app.name] = app
 
-    def get(self, command_name: str) -> CommandApp | None:
+    def get(self, command_name: str) -> AsyncCommandApp | None:
         return self._apps.get(command_name)
 
-    def all_apps(self) -> list[CommandApp]:
+    def all_apps(self) -> list[AsyncCommandApp]:
         return list(self._apps.values())
@@ -1,12 +1,13 @@
 import logging
-from collections.abc import Iterator
+from collections.abc import AsyncIterator
+from signal_bot.app_interface import AsyncCommandApp
 from signal_bot.parser import parse_command
 from signal_bot.registry import AppRegistry
 
 logger = logging.getLogger(__name__)
 
 
-def route_command(body: str, registry: AppRegistry, sender: str = "") -> Iterator[str] | None:
+def resolve_command(body: str, registry: AppRegistry, sender: str = "") -> tuple[AsyncCommandApp, str] | None:
     parsed = parse_command(body)
     if parsed is None:
         return None
@@ -15,4 +16,12 @@ def route_command(body: str, registry: AppRegistry, sender: str = "") -> Iterato
     if app is None:
         logger.debug("No app registered for command=%s", parsed.command)
         return None
-    return app.handle(parsed.args, sender=sender)
+    return app, parsed.args
+
+
+def route_command_async(body: str, registry: AppRegistry, sender: str = "") -> AsyncIterator[str] | None:
+    resolved = resolve_command(body, registry, sender=sender)
+    if resolved is None:
+        return None
+    app, args = resolved
+    return app.handle_async(args, sender=sender)
@@ -8,6 +8,8 @@ logger = logging.getLogger(__name__)
 
 
 class SignalCli:
+    supports_edits = True
+
     def __init__(self, account: str, cli_path: str = "signal-cli") -> None:
         self.account = account
         self._cli_parts = cli_path.split()
@@ -15,9 +17,22 @@ class SignalCli:
     def _base_cmd(self) -> list[str]:
         return [*self._cli_parts, "-a", self.account]
 
-    def send(self, recipient: str, body: str) -> None:
+    def send(self, recipient: str, body: str, edit_timestamp: int | None = None) -> int | None:
         logger.debug("Sending message to %s", recipient)
-        cmd = [*self._base_cmd(), "send", "-m", body, recipient]
+        cmd = [*self._base_cmd(), "send", "-m", body]
+        if edit_timestamp is not None:
+            cmd += ["--edit-timestamp", str(edit_timestamp)]
+        cmd.append(recipient)
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        # signal-cli prints the sent message's timestamp.
+        output = result.stdout.strip()
+        return int(output) if output.isdigit() else None
+
+    def send_typing(self, recipient: str, stop: bool = False) -> None:
+        cmd = [*self._base_cmd(), "sendTyping"]
+        if stop:
+            cmd.append("--stop")
+        cmd.append(recipient)
         subprocess.run(cmd, capture_output=True, text=True, check=True)
 
     def receive(self) -> list[Message]:
@@ -1,78 +1,308 @@
+import asyncio
+import itertools
 import json
 import logging
+import queue
 import socket
+import threading
+from concurrent.futures import Future, InvalidStateError
 from datetime import datetime, timezone
 from signal_bot.message import Message, Direction
 
 logger = logging.getLogger(__name__)
 
-_request_id = 0
+_request_ids = itertools.count(1)
 
 
 def _next_id() -> int:
-    global _request_id
-    _request_id += 1
-    return _request_id
+    return next(_request_ids)
+
+
+def _encode_request(method: str, params: dict) -> tuple[int, bytes]:
+    request_id = _next_id()
+    payload = json.dumps({
+        "jsonrpc": "2.0",
+        "method": method,
+        "params": params,
+        "id": request_id,
+    }) + "\n"
+    return request_id, payload.encode()
+
+
+def _sent_timestamp(result) -> int | None:
+    # The timestamp identifies the sent message, e.g. to edit it later.
+    if isinstance(result, dict):
+        return result.get("timestamp")
+    return None
+
+
+class _Connection:
+    """One long-lived socket to the daemon, multiplexing requests by JSON-RPC id.
+
+    ``sock`` only needs the socket methods used here (``recv``, ``sendall``,
+    ``shutdown``, ``close``), so other byte-stream transports can stand in for it.
+    """
+
+    def __init__(self, sock, on_notification) -> None:
+        self._sock = sock
+        self._on_notification = on_notification
+        # Guards _pending and closed; the reader thread takes it to resolve responses.
+        self._lock = threading.Lock()
+        # Serialises writes, so a sendall blocked on a full buffer never holds up the reader.
+        self._write_lock = threading.Lock()
+        self._pending: dict[int, Future] = {}
+        self.closed = False
+        self._reader = threading.Thread(target=self._read_loop, name="signal-cli-jsonrpc-reader", daemon=True)
+        self._reader.start()
+
+    def request(self, request_id: int, payload: bytes) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self.closed:
+                raise ConnectionError("signal-cli connection is closed")
+            self._pending[request_id] = future
+        # A caller that times out or is cancelled cancels the future; stop waiting for its response.
+        future.add_done_callback(lambda f: self._forget(request_id) if f.cancelled() else None)
+        try:
+            with self._write_lock:
+                self._sock.sendall(payload)
+        except OSError:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            self.close()
+            raise
+        return future
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_locked()
+        self._fail_pending()
+
+    def _forget(self, request_id: int) -> None:
+        with self._lock:
+            self._pending.pop(request_id, None)
+
+    def _close_locked(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+
+    def _fail_pending(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            _resolve(future, exception=ConnectionError("signal-cli connection closed"))
+
+    def _read_loop(self) -> None:
+        buf = b""
+        try:
+            while True:
+                chunk = self._sock.recv(65536)
+                if not chunk:
+                    break
+                buf += chunk
+                while b"\n" in buf:
+                    line, buf = buf.split(b"\n", 1)
+                    if line.strip():
+                        self._dispatch(line)
+            logger.debug("JSON-RPC connection closed by daemon")
+        except OSError as e:
+            logger.debug("JSON-RPC connection error: %s", e)
+        except Exception:
+            # Anything else would leave a connection nobody reads from that still looks open.
+            logger.exception("JSON-RPC reader failed")
+        finally:
+            self.close()
+
+    def _dispatch(self, line: bytes) -> None:
+        try:
+            response = json.loads(line)
+        except json.JSONDecodeError:
+            logger.warning("Ignoring malformed JSON-RPC line: %r", line[:200])
+            return
+        request_id = response.get("id")
+        if request_id is None:
+            self._on_notification(response)
+            return
+        with self._lock:
+            future = self._pending.pop(request_id, None)
+        if future is None:
+            logger.debug("Ignoring JSON-RPC response for unknown id=%s", request_id)
+            return
+        _resolve(future, result=response)
+
+
+def _resolve(future: Future, result=None, exception: BaseException | None = None) -> None:
+    # The caller may have given up on the future (and cancelled it) just before its response arrived.
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        logger.debug("Dropping JSON-RPC response nobody is waiting for")
 
 
 class SignalCliJsonRpc:
-    def __init__(self, account: str, host: str = "localhost", port: int = 7583) -> None:
+    supports_edits = True
+
+    def __init__(self, account: str, host: str = "localhost", port: int = 7583, timeout: float = 60.0, push: bool = False) -> None:
         self.account = account
         self.host = host
         self.port = port
+        self.timeout = timeout
+        self.push = push
+        self._lock = threading.Lock()
+        self._conn: _Connection | None = None
+        self._inbox: queue.Queue[Message] = queue.Queue()
+
+    def _connection(self) -> _Connection:
+        with self._lock:
+            if self._conn is not None and not self._conn.closed:
+                return self._conn
+            conn = self._conn = _Connection(self._open_transport(), self._handle_notification)
+        if self.push:
+            self._subscribe(conn)
+        return conn
+
+    def _open_transport(self):
+        logger.debug("Opening JSON-RPC connection to %s:%s", self.host, self.port)
+        return socket.create_connection((self.host, self.port))
+
+    def _subscribe(self, conn: _Connection) -> None:
+        request_id, payload = _encode_request("subscribeReceive", {"account": self.account})
+        future = conn.request(request_id, payload)
+        try:
+            response = future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+        if "error" in response:
+            # A daemon not started with --receive-mode=manual pushes envelopes without a subscription.
+            logger.debug("subscribeReceive rejected, relying on daemon push: %s", response["error"])
+        else:
+            logger.debug("Subscribed to incoming messages for %s", self.account)
+
+    def _handle_notification(self, notification: dict) -> None:
+        if notification.get("method") != "receive":
+            logger.debug("Ignoring JSON-RPC notification method=%s", notification.get("method"))
+            return
+        params = notification.get("params") or {}
+        message = self._parse_envelope(params.get("result", params))
+        if message is not None:
+            self._inbox.put(message)
+
+    def _submit(self, method: str, params: dict) -> Future:
+        request_id, payload = _encode_request(method, params)
+        logger.debug("JSON-RPC %s (id=%s)", method, request_id)
+        try:
+            return self._connection().request(request_id, payload)
+        except OSError:
+            # The daemon may have restarted since the last request; retry once on a fresh connection.
+            logger.debug("JSON-RPC connection lost, reconnecting")
+            return self._connection().request(request_id, payload)
 
     def _call(self, method: str, params: dict) -> object:
-        request = json.dumps({
-            "jsonrpc": "2.0",
-            "method": method,
-            "params": params,
-            "id": _next_id(),
-        }) + "\n"
-        logger.debug("JSON-RPC %s -> %s:%s", method, self.host, self.port)
-        with socket.create_connection((self.host, self.port)) as sock:
-            sock.sendall(request.encode())
-            buf = b""
-            while b"\n" not in buf:
-                chunk = sock.recv(4096)
-                if not chunk:
-                    break
-                buf += chunk
-        response = json.loads(buf.split(b"\n")[0])
+        future = self._submit(method, params)
+        try:
+            response = future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+        if "error" in response:
+            raise RuntimeError(f"JSON-RPC error: {response['error']}")
+        return response.get("result")
+
+    async def _call_async(self, method: str, params: dict) -> object:
+        if self._conn is None or self._conn.closed:
+            # Connecting (and re-subscribing) blocks, so keep it off the event loop.
+            await asyncio.to_thread(self._connection)
+        future = self._submit(method, params)
+        response = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
         if "error" in response:
             raise RuntimeError(f"JSON-RPC error: {response['error']}")
         return response.get("result")
 
-    def send(self, recipient: str, body: str) -> None:
+    def close(self) -> None:
+        with self._lock:
+            conn, self._conn = self._conn, None
+        if conn is not None:
+            conn.close()
+
+    def send(self, recipient: str, body: str, edit_timestamp: int | None = None) -> int | None:
+        logger.debug("Sending message to %s", recipient)
+        return _sent_timestamp(self._call("send", self._send_params(recipient, body, edit_timestamp)))
+
+    async def send_async(self, recipient: str, body: str, edit_timestamp: int | None = None) -> int | None:
         logger.debug("Sending message to %s", recipient)
-        self._call("send", {
+        return _sent_timestamp(await self._call_async("send", self._send_params(recipient, body, edit_timestamp)))
+
+    def send_typing(self, recipient: str, stop: bool = False) -> None:
+        self._call("sendTyping", {"account": self.account, "recipient": [recipient], "stop": stop})
+
+    async def send_typing_async(self, recipient: str, stop: bool = False) -> None:
+        await self._call_async("sendTyping", {"account": self.account, "recipient": [recipient], "stop": stop})
+
+    def _send_params(self, recipient: str, body: str, edit_timestamp: int | None) -> dict:
+        params = {
             "account": self.account,
             "recipient": [recipient],
             "message": body,
-        })
-
-    def receive(self) -> list[Message]:
-        logger.debug("Polling for messages via JSON-RPC")
-        result = self._call("receive", {"account": self.account})
-        messages = []
-        for item in result or []:
-            envelope = item.get("envelope", {})
-            data_message = envelope.get("dataMessage")
-            if data_message is None:
-                logger.debug("Skipping envelope with no dataMessage (source=%s)", envelope.get("source", "unknown"))
-                continue
-            body = data_message.get("message")
-            if body is None:
-                logger.debug("Skipping dataMessage with no message body (source=%s)", envelope.get("source", "unknown"))
-                continue
-            timestamp_ms = envelope.get("timestamp", 0)
-            timestamp = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
-            sender = envelope.get("source", "")
-            logger.debug("Parsed incoming message from %s", sender)
-            messages.append(Message(
-                sender=sender,
-                recipient=self.account,
-                body=body,
-                direction=Direction.INCOMING,
-                timestamp=timestamp,
-            ))
-        return messages
+        }
+        if edit_timestamp is not None:
+            params["editTimestamp"] = edit_timestamp
+        return params
+
+    def receive(self, timeout: float = 0) -> list[Message]:
+        if not self.push:
+            logger.debug("Polling for messages via JSON-RPC")
+            return self._parse_receive_result(self._call("receive", {"account": self.account}))
+        # Make sure a (re)subscribed connection exists, then hand over whatever the daemon pushed.
+        self._connection()
+        try:
+            messages = [self._inbox.get(timeout=timeout) if timeout > 0 else self._inbox.get_nowait()]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                messages.append(self._inbox.get_nowait())
+            except queue.Empty:
+                return messages
+
+    async def receive_async(self, timeout: float = 0) -> list[Message]:
+        if not self.push:
+            logger.debug("Polling for messages via JSON-RPC")
+            return self._parse_receive_result(await self._call_async("receive", {"account": self.account}))
+        # Pushed envelopes arrive on the reader thread's queue; wait for them on a worker thread.
+        return await asyncio.to_thread(self.receive, timeout)
+
+    def _parse_receive_result(self, result) -> list[Message]:
+        messages = [self._parse_envelope(item) for item in result or []]
+        return [m for m in messages if m is not None]
+
+    def _parse_envelope(self, item: dict) -> Message | None:
+        envelope = item.get("envelope", {})
+        data_message = envelope.get("dataMessage")
+        if data_message is None:
+            logger.debug("Skipping envelope with no dataMessage (source=%s)", envelope.get("source", "unknown"))
+            return None
+        body = data_message.get("message")
+        if body is None:
+            logger.debug("Skipping dataMessage with no message body (source=%s)", envelope.get("source", "unknown"))
+            return None
+        timestamp_ms = envelope.get("timestamp", 0)
+        timestamp = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
+        sender = envelope.get("source", "")
+        logger.debug("Parsed incoming message from %s", sender)
+        return Message(
+            sender=sender,
+            recipient=self.account,
+            body=body,
+            direction=Direction.INCOMING,
+            timestamp=timestamp,
+        )
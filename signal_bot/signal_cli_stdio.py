@@ -0,0 +1,54 @@
+import logging
+import subprocess
+from signal_bot.signal_cli_jsonrpc import SignalCliJsonRpc
+
+logger = logging.getLogger(__name__)
+
+
+class _ProcessTransport:
+    """Socket-like wrapper around the stdin/stdout pipes of a ``signal-cli jsonRpc`` child."""
+
+    def __init__(self, proc: subprocess.Popen) -> None:
+        self._proc = proc
+
+    def recv(self, size: int) -> bytes:
+        return self._proc.stdout.read1(size)
+
+    def sendall(self, data: bytes) -> None:
+        self._proc.stdin.write(data)
+        self._proc.stdin.flush()
+
+    def shutdown(self, how: int) -> None:
+        if self._proc.poll() is None:
+            self._proc.terminate()
+
+    def close(self) -> None:
+        try:
+            self._proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+            self._proc.wait()
+        for stream in (self._proc.stdin, self._proc.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+class SignalCliStdio(SignalCliJsonRpc):
+    """Talks JSON-RPC to one long-lived ``signal-cli jsonRpc`` process, restarting it if it exits."""
+
+    def __init__(self, account: str, cli_path: str = "signal-cli", timeout: float = 60.0, push: bool = False) -> None:
+        super().__init__(account=account, timeout=timeout, push=push)
+        self._cli_parts = cli_path.split()
+
+    def _command(self) -> list[str]:
+        # signal-cli never receives on its own: push mode subscribes once connected, poll mode calls receive,
+        # so each envelope arrives exactly once either way.
+        return [*self._cli_parts, "-a", self.account, "jsonRpc", "--receive-mode=manual"]
+
+    def _open_transport(self) -> _ProcessTransport:
+        cmd = self._command()
+        logger.debug("Starting %s", " ".join(cmd))
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        return _ProcessTransport(proc)
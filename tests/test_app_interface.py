@@ -1,5 +1,7 @@
+import asyncio
+import threading
 import pytest
-from signal_bot.app_interface import CommandApp
+from signal_bot.app_interface import AsyncCommandApp, CommandApp
 
 
 class ReverseApp(CommandApp):
@@ -42,3 +44,94 @@ def test_app_handle_empty_args():
 def test_incomplete_app_cannot_be_instantiated():
     with pytest.raises(TypeError):
         IncompleteApp()
+
+
+class AsyncOnlyApp(AsyncCommandApp):
+    @property
+    def name(self) -> str:
+        return "async"
+
+    @property
+    def description(self) -> str:
+        return "Replies through handle_async() only"
+
+    async def handle_async(self, args: str, sender: str = ""):
+        yield args
+
+
+class NoHandlerApp(AsyncCommandApp):
+    @property
+    def name(self) -> str:
+        return "none"
+
+    @property
+    def description(self) -> str:
+        return "Implements no handler"
+
+
+def test_async_app_needs_no_sync_handle():
+    app = AsyncOnlyApp()
+    assert asyncio.run(collect(app.handle_async("hi"))) == ["hi"]
+    assert not hasattr(app, "handle")
+
+
+def test_app_without_a_handler_cannot_be_instantiated():
+    with pytest.raises(TypeError):
+        NoHandlerApp()
+
+
+def test_sync_app_without_handle_cannot_be_instantiated():
+    class AsyncAdapterOnly(CommandApp):
+        name = "adapter"
+        description = "Inherits handle_async() but has no handle()"
+
+    with pytest.raises(TypeError):
+        AsyncAdapterOnly()
+
+
+class ThreadRecordingApp(ReverseApp):
+    def __init__(self):
+        self.threads = []
+
+    def handle(self, args: str, sender: str = ""):
+        self.threads.append(threading.current_thread())
+        yield args[::-1]
+        self.threads.append(threading.current_thread())
+        yield args
+
+
+async def collect(responses):
+    return [r async for r in responses]
+
+
+def test_handle_async_adapts_sync_generator():
+    app = ReverseApp()
+    assert asyncio.run(collect(app.handle_async("hello"))) == ["olleh"]
+
+
+def test_handle_async_runs_sync_handle_off_event_loop():
+    app = ThreadRecordingApp()
+    assert asyncio.run(collect(app.handle_async("abc"))) == ["cba", "abc"]
+    assert app.threads
+    assert all(t is not threading.main_thread() for t in app.threads)
+
+
+def test_handle_async_closes_sync_generator_when_abandoned():
+    closed = []
+
+    class ClosingApp(ReverseApp):
+        def handle(self, args: str, sender: str = ""):
+            try:
+                yield "first"
+                yield "second"
+            finally:
+                closed.append(True)
+
+    async def first_only():
+        responses = ClosingApp().handle_async("")
+        async for r in responses:
+            await responses.aclose()
+            return r
+
+    assert asyncio.run(first_only()) == "first"
+    assert closed == [True]
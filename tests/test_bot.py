@@ -1,7 +1,12 @@
+import asyncio
+import json
+import queue
+import threading
 from datetime import datetime, timezone
 from unittest.mock import patch, MagicMock, call
 from signal_bot.bot import Bot
-from signal_bot.app_interface import CommandApp
+from signal_bot.signal_cli_jsonrpc import SignalCliJsonRpc
+from signal_bot.app_interface import AsyncCommandApp, CommandApp
 from signal_bot.message import Message, Direction
 
 
@@ -109,3 +114,373 @@ def test_unregistered_command_no_response(tmp_path):
          patch.object(bot.signal_cli, "send") as mock_send:
         bot.process_messages()
         mock_send.assert_not_called()
+
+
+class AsyncEchoApp(AsyncCommandApp):
+    @property
+    def name(self) -> str:
+        return "aecho"
+
+    @property
+    def description(self) -> str:
+        return "Echoes text from a native async handler"
+
+    async def handle_async(self, args: str, sender: str = ""):
+        await asyncio.sleep(0)
+        yield args.upper()
+
+    async def close_async(self):
+        self.closed_on = asyncio.get_running_loop()
+
+
+class GateApp(CommandApp):
+    """Blocks until released, so tests can check other senders are not held up."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    @property
+    def name(self) -> str:
+        return "slow"
+
+    @property
+    def description(self) -> str:
+        return "Waits for the test to release it"
+
+    def handle(self, args: str, sender: str = ""):
+        self.release.wait(timeout=5)
+        yield "done"
+
+
+class FailingApp(CommandApp):
+    @property
+    def name(self) -> str:
+        return "fail"
+
+    @property
+    def description(self) -> str:
+        return "Always raises"
+
+    def handle(self, args: str, sender: str = ""):
+        raise RuntimeError("boom")
+        yield
+
+
+def test_native_async_app_is_awaited(tmp_path):
+    bot = make_bot(tmp_path)
+    bot.register_app(AsyncEchoApp())
+    with patch.object(bot.signal_cli, "receive", return_value=[make_message("/aecho hi")]), \
+         patch.object(bot.signal_cli, "send") as mock_send:
+        bot.process_messages()
+        mock_send.assert_called_once_with("+440001111111", "HI")
+
+
+def test_close_async_closes_apps_on_the_running_loop(tmp_path):
+    bot = make_bot(tmp_path)
+    app = AsyncEchoApp()
+    bot.register_app(app)
+
+    async def main():
+        await bot.close_async()
+        return asyncio.get_running_loop()
+
+    loop = asyncio.run(main())
+    assert app.closed_on is loop
+
+
+def test_slow_sender_does_not_block_other_senders(tmp_path):
+    bot = make_bot(tmp_path)
+    gate = GateApp()
+    bot.register_app(gate)
+    sent = []
+
+    def send(recipient, body):
+        sent.append(body)
+        if body == "cba":
+            # The fast sender was answered while the slow one is still waiting.
+            gate.release.set()
+
+    msgs = [make_message("/slow"), make_message("/test abc", sender="+440002222222")]
+    with patch.object(bot.signal_cli, "receive", return_value=msgs), \
+         patch.object(bot.signal_cli, "send", side_effect=send):
+        bot.process_messages()
+    assert sent == ["cba", "done"]
+
+
+def test_same_sender_messages_stay_in_order(tmp_path):
+    bot = make_bot(tmp_path)
+    msgs = [make_message(f"/test {i}") for i in range(5)]
+    with patch.object(bot.signal_cli, "receive", return_value=msgs), \
+         patch.object(bot.signal_cli, "send") as mock_send:
+        bot.process_messages()
+    assert [c.args[1] for c in mock_send.call_args_list] == ["0", "1", "2", "3", "4"]
+
+
+def test_failing_app_does_not_stop_other_messages(tmp_path):
+    bot = make_bot(tmp_path)
+    bot.register_app(FailingApp())
+    msgs = [make_message("/fail"), make_message("/test ok")]
+    with patch.object(bot.signal_cli, "receive", return_value=msgs), \
+         patch.object(bot.signal_cli, "send") as mock_send:
+        bot.process_messages()
+        mock_send.assert_called_once_with("+440001111111", "ko")
+
+
+class InterruptibleApp(GateApp):
+    def __init__(self):
+        super().__init__()
+        self.interrupts = []
+
+    def interrupt(self, sender, args):
+        self.interrupts.append((sender, args))
+        if args == "stop":
+            self.release.set()
+
+
+def test_apps_are_interrupted_before_queued_message_is_handled(tmp_path):
+    bot = make_bot(tmp_path)
+    app = InterruptibleApp()
+    bot.register_app(app)
+    msgs = [make_message("/slow"), make_message("/slow stop"), make_message("/test abc")]
+    with patch.object(bot.signal_cli, "receive", return_value=msgs), \
+         patch.object(bot.signal_cli, "send") as mock_send:
+        bot.process_messages()
+    assert app.interrupts == [("+440001111111", ""), ("+440001111111", "stop"), ("+440001111111", None)]
+    assert [c.args[1] for c in mock_send.call_args_list] == ["done", "done", "cba"]
+
+
+def test_unauthorized_messages_do_not_interrupt(tmp_path):
+    bot = Bot(account="+447786000000", log_dir=tmp_path, allowed_senders=["+440009999999"])
+    app = InterruptibleApp()
+    bot.register_app(app)
+    bot.notify_received(make_message("/slow stop"))
+    assert app.interrupts == []
+
+
+class FragmentApp(CommandApp):
+    stream_edits = True
+
+    @property
+    def name(self) -> str:
+        return "frag"
+
+    @property
+    def description(self) -> str:
+        return "Streams its args back a word at a time"
+
+    def handle(self, args: str, sender: str = ""):
+        for word in args.split(" "):
+            yield word + " "
+
+
+class EditingBackend:
+    supports_edits = True
+
+    def __init__(self, timestamp=1700000000000):
+        self.calls = []
+        self.timestamp = timestamp
+
+    def send(self, recipient, body, edit_timestamp=None):
+        self.calls.append((body, edit_timestamp))
+        return self.timestamp
+
+    def receive(self):
+        return []
+
+
+def _stream(bot, body):
+    asyncio.run(bot.handle_message(make_message(body)))
+
+
+def test_stream_edits_sends_one_message_and_edits_it(tmp_path):
+    backend = EditingBackend()
+    bot = Bot(account="+447786000000", log_dir=tmp_path, backend=backend, edit_interval=0)
+    bot.register_app(FragmentApp())
+    _stream(bot, "/frag one two three")
+    assert backend.calls == [
+        ("one", None),
+        ("one two", 1700000000000),
+        ("one two three", 1700000000000),
+    ]
+    bot.log_writer.flush()
+    lines = "".join(f.read_text() for f in tmp_path.glob("*.txt")).splitlines()
+    outgoing = [line for line in lines if "one" in line and "/frag" not in line]
+    assert len(outgoing) == 1
+    assert outgoing[0].endswith("one two three")
+
+
+def test_stream_edits_are_throttled(tmp_path):
+    backend = EditingBackend()
+    bot = Bot(account="+447786000000", log_dir=tmp_path, backend=backend, edit_interval=60)
+    bot.register_app(FragmentApp())
+    _stream(bot, "/frag " + " ".join(str(i) for i in range(50)))
+    assert len(backend.calls) == 2
+    assert backend.calls[-1] == (" ".join(str(i) for i in range(50)), 1700000000000)
+
+
+def test_stream_edits_capped_for_signal(tmp_path):
+    backend = EditingBackend()
+    bot = Bot(account="+447786000000", log_dir=tmp_path, backend=backend, edit_interval=0)
+    bot.register_app(FragmentApp())
+    _stream(bot, "/frag " + " ".join(str(i) for i in range(50)))
+    edits = [call for call in backend.calls if call[1] is not None]
+    assert len(edits) == 10
+    assert edits[-1][0].endswith(" 49")
+
+
+def test_stream_without_timestamp_sends_rest_as_new_message(tmp_path):
+    backend = EditingBackend(timestamp=None)
+    bot = Bot(account="+447786000000", log_dir=tmp_path, backend=backend, edit_interval=0)
+    bot.register_app(FragmentApp())
+    _stream(bot, "/frag one two three")
+    assert backend.calls == [("one", None), ("two three", None)]
+
+
+def test_stream_falls_back_to_lines_without_edit_support(tmp_path):
+    bot = make_bot(tmp_path)
+    bot.register_app(FragmentApp())
+    with patch.object(bot.signal_cli, "supports_edits", False), \
+         patch.object(bot.signal_cli, "send") as mock_send:
+        _stream(bot, "/frag one\ntwo three")
+    assert [c.args[1] for c in mock_send.call_args_list] == ["one", "two three "]
+
+
+class TypingApp(CommandApp):
+    typing_indicator = True
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+
+    @property
+    def name(self) -> str:
+        return "think"
+
+    @property
+    def description(self) -> str:
+        return "Thinks before each line"
+
+    async def handle_async(self, args: str, sender: str = ""):
+        for word in args.split():
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise RuntimeError("boom")
+            yield word
+
+    def handle(self, args: str, sender: str = ""):
+        yield from args.split()
+
+
+class TypingBackend:
+    def __init__(self):
+        self.calls = []
+
+    def send(self, recipient, body):
+        self.calls.append(("send", body))
+
+    def send_typing(self, recipient, stop=False):
+        self.calls.append(("stop",) if stop else ("typing",))
+
+    def receive(self):
+        return []
+
+
+def test_typing_indicator_shown_until_last_reply(tmp_path):
+    backend = TypingBackend()
+    bot = Bot(account="+447786000000", log_dir=tmp_path, backend=backend)
+    bot.register_app(TypingApp())
+    asyncio.run(bot.handle_message(make_message("/think one two")))
+    assert backend.calls[0] == ("typing",)
+    assert backend.calls[-1] == ("stop",)
+    assert [c for c in backend.calls if c[0] == "send"] == [("send", "one"), ("send", "two")]
+
+
+def test_typing_indicator_not_resent_after_every_reply(tmp_path):
+    backend = TypingBackend()
+    bot = Bot(account="+447786000000", log_dir=tmp_path, backend=backend, typing_interval=60)
+    bot.register_app(TypingApp())
+    asyncio.run(bot.handle_message(make_message("/think " + " ".join(["word"] * 30))))
+    assert backend.calls.count(("typing",)) == 1
+    assert backend.calls.count(("send", "word")) == 30
+
+
+def test_typing_indicator_refreshed_while_generating(tmp_path):
+    backend = TypingBackend()
+    bot = Bot(account="+447786000000", log_dir=tmp_path, backend=backend, typing_interval=0.01)
+    bot.register_app(TypingApp(delay=0.2))
+    asyncio.run(bot.handle_message(make_message("/think one")))
+    before_reply = backend.calls[:backend.calls.index(("send", "one"))]
+    assert len(before_reply) >= 3
+    assert set(before_reply) == {("typing",)}
+
+
+def test_typing_indicator_cleared_when_app_fails(tmp_path):
+    backend = TypingBackend()
+    bot = Bot(account="+447786000000", log_dir=tmp_path, backend=backend)
+    bot.register_app(TypingApp(fail=True))
+    try:
+        asyncio.run(bot.handle_message(make_message("/think one")))
+    except RuntimeError:
+        pass
+    assert backend.calls[-1] == ("stop",)
+
+
+def test_no_typing_indicator_for_apps_that_do_not_opt_in(tmp_path):
+    backend = TypingBackend()
+    bot = Bot(account="+447786000000", log_dir=tmp_path, backend=backend)
+    bot.register_app(ReverseApp())
+    asyncio.run(bot.handle_message(make_message("/test abc")))
+    assert backend.calls == [("send", "cba")]
+
+
+class SlowTypingSocket:
+    """A daemon connection that answers a typing indicator only after it has been told to stop it."""
+
+    def __init__(self):
+        self._incoming = queue.Queue()
+        self._typing = []
+        self.messages = []
+
+    def sendall(self, data):
+        for line in data.decode().splitlines():
+            request = json.loads(line)
+            if request["method"] == "sendTyping" and not request["params"]["stop"]:
+                self._typing.append(request["id"])
+                continue
+            if request["method"] == "sendTyping":
+                for request_id in self._typing:
+                    self._reply(request_id)
+                self._typing = []
+            else:
+                self.messages.append(request["params"]["message"])
+            self._reply(request["id"])
+
+    def _reply(self, request_id):
+        self._incoming.put((json.dumps({"jsonrpc": "2.0", "id": request_id, "result": {}}) + "\n").encode())
+
+    def recv(self, size):
+        return self._incoming.get()
+
+    def shutdown(self, how):
+        self._incoming.put(b"")
+
+    def close(self):
+        self._incoming.put(b"")
+
+
+def test_stopping_typing_mid_request_keeps_jsonrpc_backend_working(tmp_path):
+    sock = SlowTypingSocket()
+    backend = SignalCliJsonRpc(account="+447786000000", timeout=5)
+    bot = Bot(account="+447786000000", log_dir=tmp_path, backend=backend)
+    bot.register_app(TypingApp())
+
+    async def main():
+        # The app finishes while its first sendTyping is still waiting for the daemon.
+        await bot.handle_message(make_message("/think one"))
+        await bot.handle_message(make_message("/think two"))
+
+    with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
+        asyncio.run(asyncio.wait_for(main(), timeout=2))
+    assert sock.messages == ["one", "two"]
+    assert backend._conn._reader.is_alive()
+    backend.close()
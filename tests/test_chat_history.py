@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from signal_bot.apps.chat_history import ChatHistory, _read_tail, approx_tokens, context_window
+
+
+def _message(i):
+    return {"role": "user", "content": f"message {i}"}
+
+
+def test_empty_history(tmp_path):
+    assert ChatHistory(tmp_path).tail("+44") == []
+
+
+def test_append_and_tail(tmp_path):
+    history = ChatHistory(tmp_path, max_messages=3)
+    history.append("+44", [_message(1), _message(2)])
+    history.append("+44", [_message(3), _message(4)])
+    assert history.tail("+44") == [_message(2), _message(3), _message(4)]
+
+
+def test_append_only(tmp_path):
+    history = ChatHistory(tmp_path, max_messages=10)
+    history.append("+44", [_message(1)])
+    path = tmp_path / "+44.jsonl"
+    inode = path.stat().st_ino
+    history.append("+44", [_message(2)])
+    assert path.stat().st_ino == inode
+    assert path.read_text().count("\n") == 2
+
+
+def test_compaction_bounds_file(tmp_path):
+    history = ChatHistory(tmp_path, max_messages=4)
+    for i in range(0, 20, 2):
+        history.append("+44", [_message(i), _message(i + 1)])
+    lines = (tmp_path / "+44.jsonl").read_text().splitlines()
+    assert len(lines) < 8
+    assert history.tail("+44") == [_message(i) for i in range(16, 20)]
+
+
+def test_compaction_counts_existing_lines(tmp_path):
+    ChatHistory(tmp_path, max_messages=4).append("+44", [_message(i) for i in range(6)])
+    restarted = ChatHistory(tmp_path, max_messages=4)
+    restarted.append("+44", [_message(6), _message(7)])
+    assert len((tmp_path / "+44.jsonl").read_text().splitlines()) == 4
+
+
+def test_legacy_json_migrated(tmp_path):
+    (tmp_path / "+44.json").write_text(json.dumps([_message(1), _message(2)]))
+    history = ChatHistory(tmp_path)
+    assert history.tail("+44") == [_message(1), _message(2)]
+    assert not (tmp_path / "+44.json").exists()
+
+
+def test_clear(tmp_path):
+    history = ChatHistory(tmp_path)
+    history.append("+44", [_message(1)])
+    history.clear("+44")
+    assert history.tail("+44") == []
+
+
+def test_read_tail_across_blocks(tmp_path):
+    path = tmp_path / "lines"
+    path.write_bytes(b"".join(b"%05d" % i + b"x" * 1000 + b"\n" for i in range(100)))
+    with open(path, "rb") as f:
+        lines = _read_tail(f, 20)
+    assert [int(line[:5]) for line in lines] == list(range(80, 100))
+
+
+def test_rejects_empty_window(tmp_path):
+    with pytest.raises(ValueError):
+        ChatHistory(tmp_path, max_messages=0)
+
+
+def test_approx_tokens():
+    assert approx_tokens({"role": "user", "content": "x" * 40}) == 14
+
+
+def test_context_window_keeps_recent_messages_within_budget():
+    messages = [
+        {"role": "user", "content": "a" * 40},
+        {"role": "assistant", "content": "b" * 40},
+        {"role": "user", "content": "c" * 40},
+        {"role": "assistant", "content": "d" * 40},
+        {"role": "user", "content": "e" * 40},
+    ]
+    assert context_window(messages, 1000) == 0
+    assert context_window(messages, 42) == 2
+    # Three fit, but the window would start with a reply.
+    assert context_window(messages, 30) == 4
+
+
+def test_context_window_always_keeps_last_message():
+    assert context_window([{"role": "user", "content": "x" * 4000}], 10) == 0
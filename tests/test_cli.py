@@ -1,3 +1,6 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
 from signal_bot.main import run_cli, CLI_FAKE_SENDER
 from signal_bot.config import Config
 
@@ -9,6 +12,7 @@ def make_config(tmp_path):
         log_dir=str(tmp_path),
         allowed_senders=None,
         data_dir=str(tmp_path),
+        gemma3_warm_up=False,
     )
 
 
@@ -21,6 +25,23 @@ def test_cli_routes_command(tmp_path, monkeypatch):
     assert any("olleh" in line for line in output)
 
 
+async def _reply(*texts):
+    for text in texts:
+        yield SimpleNamespace(message=SimpleNamespace(content=text))
+
+
+def test_cli_streams_async_app_and_closes_it(tmp_path, monkeypatch):
+    inputs = iter(["/gemma3 hi", ""])
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+    output = []
+    monkeypatch.setattr("builtins.print", lambda *a, **kw: output.append(" ".join(str(x) for x in a)))
+    with patch("ollama.AsyncClient.chat", AsyncMock(return_value=_reply("Hel", "lo\n"))), \
+         patch("ollama.AsyncClient.close", AsyncMock()) as mock_close:
+        run_cli(make_config(tmp_path))
+    assert "[bot] Hello" in output
+    mock_close.assert_awaited_once()
+
+
 def test_cli_prints_banner(tmp_path, monkeypatch):
     monkeypatch.setattr("builtins.input", lambda _: (_ for _ in ()).throw(EOFError))
     output = []
@@ -83,6 +104,7 @@ def test_cli_unauthorized_sender_dropped(tmp_path, monkeypatch):
         log_dir=str(tmp_path),
         allowed_senders=["+449999999999"],
         data_dir=str(tmp_path),
+        gemma3_warm_up=False,
     )
     inputs = iter(["/test hello", ""])
     monkeypatch.setattr("builtins.input", lambda _: next(inputs))
@@ -76,3 +76,188 @@ def test_data_dir_defaults_to_data(monkeypatch):
     monkeypatch.delenv("DATA_DIR", raising=False)
     config = load_config(use_dotenv=False)
     assert config.data_dir == "data"
+
+
+def test_receive_mode_defaults_to_push(monkeypatch):
+    monkeypatch.setenv("SIGNAL_PHONE_NUMBER", "+440001111111")
+    monkeypatch.delenv("SIGNAL_CLI_RECEIVE_MODE", raising=False)
+    config = load_config(use_dotenv=False)
+    assert config.signal_cli_receive_mode == "push"
+
+
+def test_loads_receive_mode_from_env(monkeypatch):
+    monkeypatch.setenv("SIGNAL_PHONE_NUMBER", "+440001111111")
+    monkeypatch.setenv("SIGNAL_CLI_RECEIVE_MODE", "poll")
+    config = load_config(use_dotenv=False)
+    assert config.signal_cli_receive_mode == "poll"
+
+
+def test_dispatch_workers_defaults_to_4(monkeypatch):
+    monkeypatch.setenv("SIGNAL_PHONE_NUMBER", "+440001111111")
+    monkeypatch.delenv("DISPATCH_WORKERS", raising=False)
+    config = load_config(use_dotenv=False)
+    assert config.dispatch_workers == 4
+
+
+def test_loads_dispatch_workers_from_env(monkeypatch):
+    monkeypatch.setenv("SIGNAL_PHONE_NUMBER", "+440001111111")
+    monkeypatch.setenv("DISPATCH_WORKERS", "8")
+    config = load_config(use_dotenv=False)
+    assert config.dispatch_workers == 8
+
+
+def test_log_flush_defaults(monkeypatch):
+    monkeypatch.setenv("SIGNAL_PHONE_NUMBER", "+440001111111")
+    monkeypatch.delenv("LOG_FLUSH_INTERVAL", raising=False)
+    monkeypatch.delenv("LOG_FSYNC", raising=False)
+    config = load_config(use_dotenv=False)
+    assert config.log_flush_interval == 1.0
+    assert config.log_fsync == "never"
+
+
+def test_loads_log_flush_settings_from_env(monkeypatch):
+    monkeypatch.setenv("SIGNAL_PHONE_NUMBER", "+440001111111")
+    monkeypatch.setenv("LOG_FLUSH_INTERVAL", "0.5")
+    monkeypatch.setenv("LOG_FSYNC", "flush")
+    config = load_config(use_dotenv=False)
+    assert config.log_flush_interval == 0.5
+    assert config.log_fsync == "flush"
+
+
+def test_log_queue_defaults(monkeypatch):
+    monkeypatch.setenv("SIGNAL_PHONE_NUMBER", "+440001111111")
+    monkeypatch.delenv("LOG_QUEUE_SIZE", raising=False)
+    monkeypatch.delenv("LOG_QUEUE_OVERFLOW", raising=False)
+    config = load_config(use_dotenv=False)
+    assert config.log_queue_size == 10000
+    assert config.log_queue_overflow == "block"
+
+
+def test_loads_log_queue_settings_from_env(monkeypatch):
+    monkeypatch.setenv("SIGNAL_PHONE_NUMBER", "+440001111111")
+    monkeypatch.setenv("LOG_QUEUE_SIZE", "500")
+    monkeypatch.setenv("LOG_QUEUE_OVERFLOW", "drop-oldest")
+    config = load_config(use_dotenv=False)
+    assert config.log_queue_size == 500
+    assert config.log_queue_overflow == "drop-oldest"
+
+
+def test_geocode_cache_defaults(monkeypatch):
+    monkeypatch.setenv("SIGNAL_PHONE_NUMBER", "+440001111111")
+    monkeypatch.delenv("GEOCODE_CACHE_SIZE", raising=False)
+    monkeypatch.delenv("GEOCODE_NEGATIVE_TTL", raising=False)
+    config = load_config(use_dotenv=False)
+    assert config.geocode_cache_size == 1000
+    assert config.geocode_negative_ttl == 86400
+
+
+def test_gazetteer_path_optional(monkeypatch):
+    monkeypatch.setenv("SIGNAL_PHONE_NUMBER", "+440001111111")
+    monkeypatch.delenv("GAZETTEER_PATH", raising=False)
+    assert load_config(use_dotenv=False).gazetteer_path is None
+    monkeypatch.setenv("GAZETTEER_PATH", "/srv/geonames/cities15000.txt")
+    assert load_config(use_dotenv=False).gazetteer_path == "/srv/geonames/cities15000.txt"
+
+
+def test_todo_write_delay(monkeypatch):
+    monkeypatch.setenv("SIGNAL_PHONE_NUMBER", "+440000000000")
+    monkeypatch.delenv("TODO_WRITE_DELAY", raising=False)
+    assert load_config(use_dotenv=False).todo_write_delay == 0.5
+    monkeypatch.setenv("TODO_WRITE_DELAY", "0")
+    assert load_config(use_dotenv=False).todo_write_delay == 0.0
+
+
+def test_todo_storage(monkeypatch):
+    monkeypatch.setenv("SIGNAL_PHONE_NUMBER", "+440000000000")
+    monkeypatch.delenv("TODO_STORAGE", raising=False)
+    assert load_config(use_dotenv=False).todo_storage == "json"
+    monkeypatch.setenv("TODO_STORAGE", "sqlite")
+    assert load_config(use_dotenv=False).todo_storage == "sqlite"
+
+
+def test_gemma3_history_messages(monkeypatch):
+    monkeypatch.setenv("SIGNAL_PHONE_NUMBER", "+440000000000")
+    monkeypatch.delenv("GEMMA3_HISTORY_MESSAGES", raising=False)
+    assert load_config(use_dotenv=False).gemma3_history_messages == 100
+    monkeypatch.setenv("GEMMA3_HISTORY_MESSAGES", "40")
+    assert load_config(use_dotenv=False).gemma3_history_messages == 40
+
+
+def test_gemma3_context_options(monkeypatch):
+    monkeypatch.setenv("SIGNAL_PHONE_NUMBER", "+440000000000")
+    monkeypatch.delenv("GEMMA3_CONTEXT_TOKENS", raising=False)
+    monkeypatch.delenv("GEMMA3_SUMMARY", raising=False)
+    config = load_config(use_dotenv=False)
+    assert config.gemma3_context_tokens == 3072
+    assert config.gemma3_summary is False
+    monkeypatch.setenv("GEMMA3_CONTEXT_TOKENS", "1024")
+    monkeypatch.setenv("GEMMA3_SUMMARY", "true")
+    config = load_config(use_dotenv=False)
+    assert config.gemma3_context_tokens == 1024
+    assert config.gemma3_summary is True
+
+
+def test_gemma3_cancel_on_new_message(monkeypatch):
+    monkeypatch.setenv("SIGNAL_PHONE_NUMBER", "+440000000000")
+    monkeypatch.delenv("GEMMA3_CANCEL_ON_NEW_MESSAGE", raising=False)
+    assert load_config(use_dotenv=False).gemma3_cancel_on_new_message is False
+    monkeypatch.setenv("GEMMA3_CANCEL_ON_NEW_MESSAGE", "1")
+    assert load_config(use_dotenv=False).gemma3_cancel_on_new_message is True
+
+
+def test_stream_edit_options(monkeypatch):
+    monkeypatch.setenv("SIGNAL_PHONE_NUMBER", "+440000000000")
+    monkeypatch.delenv("GEMMA3_STREAM_EDITS", raising=False)
+    monkeypatch.delenv("STREAM_EDIT_INTERVAL", raising=False)
+    config = load_config(use_dotenv=False)
+    assert config.gemma3_stream_edits is False
+    assert config.stream_edit_interval == 1.0
+    monkeypatch.setenv("GEMMA3_STREAM_EDITS", "true")
+    monkeypatch.setenv("STREAM_EDIT_INTERVAL", "2.5")
+    config = load_config(use_dotenv=False)
+    assert config.gemma3_stream_edits is True
+    assert config.stream_edit_interval == 2.5
+
+
+def test_typing_interval(monkeypatch):
+    monkeypatch.setenv("SIGNAL_PHONE_NUMBER", "+440000000000")
+    monkeypatch.delenv("TYPING_INTERVAL", raising=False)
+    assert load_config(use_dotenv=False).typing_interval == 10.0
+    monkeypatch.setenv("TYPING_INTERVAL", "5")
+    assert load_config(use_dotenv=False).typing_interval == 5.0
+
+
+def test_gemma3_typing_indicator(monkeypatch):
+    monkeypatch.setenv("SIGNAL_PHONE_NUMBER", "+440000000000")
+    monkeypatch.delenv("GEMMA3_TYPING_INDICATOR", raising=False)
+    assert load_config(use_dotenv=False).gemma3_typing_indicator is True
+    monkeypatch.setenv("GEMMA3_TYPING_INDICATOR", "false")
+    assert load_config(use_dotenv=False).gemma3_typing_indicator is False
+
+
+def test_gemma3_warm_up_options(monkeypatch):
+    monkeypatch.setenv("SIGNAL_PHONE_NUMBER", "+440000000000")
+    for name in ("GEMMA3_KEEP_ALIVE", "GEMMA3_WARM_UP", "GEMMA3_KEEP_WARM_INTERVAL", "GEMMA3_ACTIVE_HOURS"):
+        monkeypatch.delenv(name, raising=False)
+    config = load_config(use_dotenv=False)
+    assert config.gemma3_keep_alive is None
+    assert config.gemma3_warm_up is False
+    assert config.gemma3_keep_warm_interval == 0.0
+    assert config.gemma3_active_hours is None
+    monkeypatch.setenv("GEMMA3_KEEP_ALIVE", "30m")
+    monkeypatch.setenv("GEMMA3_WARM_UP", "true")
+    monkeypatch.setenv("GEMMA3_KEEP_WARM_INTERVAL", "240")
+    monkeypatch.setenv("GEMMA3_ACTIVE_HOURS", "07:00-23:00")
+    config = load_config(use_dotenv=False)
+    assert config.gemma3_keep_alive == "30m"
+    assert config.gemma3_warm_up is True
+    assert config.gemma3_keep_warm_interval == 240.0
+    assert config.gemma3_active_hours == "07:00-23:00"
+
+
+def test_gemma3_max_concurrent(monkeypatch):
+    monkeypatch.setenv("SIGNAL_PHONE_NUMBER", "+440000000000")
+    monkeypatch.delenv("GEMMA3_MAX_CONCURRENT", raising=False)
+    assert load_config(use_dotenv=False).gemma3_max_concurrent == 1
+    monkeypatch.setenv("GEMMA3_MAX_CONCURRENT", "3")
+    assert load_config(use_dotenv=False).gemma3_max_concurrent == 3
@@ -1,4 +1,5 @@
 import json
+import threading
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 from signal_bot.app_interface import CommandApp
@@ -85,7 +86,7 @@ def test_set_default_persists_to_file(mock_tz, tmp_path):
     app = make_app(tmp_path)
     next(app.handle("set London, GB", sender="+440001111111"))
     data = json.loads((tmp_path / "date_defaults.json").read_text())
-    assert data["+440001111111"] == "London, GB"
+    assert data["+440001111111"] == {"location": "London, GB", "name": "London", "tz": "Europe/London"}
 
 
 @patch.object(DateApp, "_lookup_timezone", return_value="Asia/Tokyo")
@@ -102,3 +103,147 @@ def test_no_data_dir_still_works(mock_tz):
     next(app.handle("set London, GB", sender="+440001111111"))
     response = next(app.handle("", sender="+440001111111"))
     assert "London" in response
+
+
+def test_lookup_geocodes_once_per_location(tmp_path):
+    app = make_app(tmp_path)
+    location = MagicMock(latitude=51.5, longitude=-0.12)
+    with patch.object(app._geolocator, "geocode", return_value=location) as mock_geocode:
+        assert app._lookup_timezone("London") == "Europe/London"
+        assert app._lookup_timezone("london ") == "Europe/London"
+    assert mock_geocode.call_count == 1
+
+
+def test_lookup_cache_survives_restart(tmp_path):
+    location = MagicMock(latitude=35.68, longitude=139.69)
+    app = make_app(tmp_path)
+    with patch.object(app._geolocator, "geocode", return_value=location):
+        app._lookup_timezone("Tokyo, JP")
+    restarted = make_app(tmp_path)
+    with patch.object(restarted._geolocator, "geocode") as mock_geocode:
+        assert restarted._lookup_timezone("Tokyo, JP") == "Asia/Tokyo"
+    mock_geocode.assert_not_called()
+
+
+def test_lookup_caches_unknown_location(tmp_path):
+    app = make_app(tmp_path)
+    with patch.object(app._geolocator, "geocode", return_value=None) as mock_geocode:
+        assert app._lookup_timezone("Xyzzyville") is None
+        assert app._lookup_timezone("Xyzzyville") is None
+    assert mock_geocode.call_count == 1
+
+
+def test_lookup_does_not_cache_network_errors(tmp_path):
+    app = make_app(tmp_path)
+    with patch.object(app._geolocator, "geocode", side_effect=TimeoutError) as mock_geocode:
+        assert app._lookup_timezone("London") is None
+        assert app._lookup_timezone("London") is None
+    assert mock_geocode.call_count == 2
+
+
+def test_default_uses_stored_timezone_without_lookup(tmp_path):
+    defaults = {"+440001111111": {"location": "Tokyo, JP", "name": "Tokyo", "tz": "Asia/Tokyo"}}
+    (tmp_path / "date_defaults.json").write_text(json.dumps(defaults))
+    app = make_app(tmp_path)
+    with patch.object(DateApp, "_lookup_timezone") as mock_lookup:
+        response = next(app.handle("", sender="+440001111111"))
+    mock_lookup.assert_not_called()
+    assert response.startswith("Tokyo: ")
+    assert "JST" in response
+
+
+@patch.object(DateApp, "_lookup_timezone", return_value="Asia/Tokyo")
+def test_legacy_default_migrated_on_first_use(mock_tz, tmp_path):
+    (tmp_path / "date_defaults.json").write_text(json.dumps({"+440001111111": "Tokyo, JP"}))
+    app = make_app(tmp_path)
+    next(app.handle("", sender="+440001111111"))
+    next(app.handle("", sender="+440001111111"))
+    assert mock_tz.call_count == 1
+    data = json.loads((tmp_path / "date_defaults.json").read_text())
+    assert data["+440001111111"] == {"location": "Tokyo, JP", "name": "Tokyo", "tz": "Asia/Tokyo"}
+
+
+@patch.object(DateApp, "_lookup_timezone", return_value=None)
+def test_legacy_default_unresolvable(mock_tz, tmp_path):
+    (tmp_path / "date_defaults.json").write_text(json.dumps({"+440001111111": "Xyzzyville"}))
+    app = make_app(tmp_path)
+    response = next(app.handle("", sender="+440001111111"))
+    assert "could not find" in response.lower()
+
+
+def test_gazetteer_answers_before_geocoder(tmp_path):
+    gazetteer = MagicMock()
+    gazetteer.lookup.return_value = MagicMock(timezone="Asia/Tokyo")
+    app = DateApp(data_dir=tmp_path, gazetteer=gazetteer)
+    with patch.object(app._geolocator, "geocode") as mock_geocode:
+        assert app._lookup_timezone("Tokyo") == "Asia/Tokyo"
+    mock_geocode.assert_not_called()
+
+
+def test_geocoder_used_on_gazetteer_miss(tmp_path):
+    gazetteer = MagicMock()
+    gazetteer.lookup.return_value = None
+    app = DateApp(data_dir=tmp_path, gazetteer=gazetteer)
+    location = MagicMock(latitude=51.5, longitude=-0.12)
+    with patch.object(app._geolocator, "geocode", return_value=location) as mock_geocode:
+        assert app._lookup_timezone("London, England") == "Europe/London"
+    mock_geocode.assert_called_once()
+
+
+def test_timezone_finder_created_on_first_lookup(tmp_path):
+    with patch("signal_bot.apps.date_app.TimezoneFinder") as mock_finder:
+        app = DateApp(data_dir=tmp_path)
+        mock_finder.assert_not_called()
+        mock_finder.return_value.unique_timezone_at.return_value = "Europe/London"
+        location = MagicMock(latitude=51.5074, longitude=-0.1278)
+        with patch.object(app._geolocator, "geocode", return_value=location):
+            assert app._lookup_timezone("London, UK") == "Europe/London"
+    mock_finder.assert_called_once_with(in_memory=False)
+
+
+def test_timezone_grid_created_on_first_lookup(tmp_path):
+    app = DateApp(data_dir=tmp_path)
+    assert app._tz_grid is None
+    assert not (tmp_path / "tz_grid.bin").exists()
+    with patch("signal_bot.apps.date_app.TimezoneFinder") as mock_finder:
+        mock_finder.return_value.unique_timezone_at.return_value = "Europe/London"
+        location = MagicMock(latitude=51.5074, longitude=-0.1278)
+        with patch.object(app._geolocator, "geocode", return_value=location):
+            assert app._lookup_timezone("London, UK") == "Europe/London"
+    assert (tmp_path / "tz_grid.bin").exists()
+    app.close()
+    assert app._tz_grid is None
+
+
+def test_exact_lookup_without_grid_support(tmp_path):
+    app = DateApp(data_dir=tmp_path)
+    with patch("signal_bot.apps.date_app.grid_supported", return_value=False), \
+         patch("signal_bot.apps.date_app.TimezoneFinder") as mock_finder:
+        mock_finder.return_value.timezone_at.return_value = "Europe/London"
+        location = MagicMock(latitude=51.5074, longitude=-0.1278)
+        with patch.object(app._geolocator, "geocode", return_value=location):
+            assert app._lookup_timezone("London, UK") == "Europe/London"
+    assert app._tz_grid is None
+    mock_finder.return_value.timezone_at.assert_called_once_with(lng=-0.1278, lat=51.5074)
+
+
+@patch.object(DateApp, "_lookup_timezone", return_value="Europe/London")
+def test_concurrent_set_default(mock_tz, tmp_path):
+    app = make_app(tmp_path)
+    errors = []
+
+    def work(n):
+        try:
+            for i in range(50):
+                next(app.handle(f"set City{i}, GB", sender=f"+44000000000{n}"))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    data = json.loads((tmp_path / "date_defaults.json").read_text())
+    assert {value["name"] for value in data.values()} == {"City49"}
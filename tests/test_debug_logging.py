@@ -2,7 +2,7 @@ import logging
 import pytest
 from signal_bot.config import load_config
 from signal_bot.registry import AppRegistry
-from signal_bot.router import route_command
+from signal_bot.router import route_command_async
 from signal_bot.app_interface import CommandApp
 
 
@@ -55,19 +55,19 @@ def test_router_logs_debug_on_known_command(caplog):
     registry = AppRegistry()
     registry.register(EchoApp())
     with caplog.at_level(logging.DEBUG, logger="signal_bot.router"):
-        route_command("/echo hello", registry, sender="+441111111111")
+        route_command_async("/echo hello", registry, sender="+441111111111")
     assert any("echo" in r.message for r in caplog.records)
 
 
 def test_router_logs_debug_on_unknown_command(caplog):
     registry = AppRegistry()
     with caplog.at_level(logging.DEBUG, logger="signal_bot.router"):
-        route_command("/unknown stuff", registry)
+        route_command_async("/unknown stuff", registry)
     assert any("unknown" in r.message for r in caplog.records)
 
 
 def test_router_no_debug_log_for_non_command(caplog):
     registry = AppRegistry()
     with caplog.at_level(logging.DEBUG, logger="signal_bot.router"):
-        route_command("just a plain message", registry)
+        route_command_async("just a plain message", registry)
     assert not caplog.records
@@ -0,0 +1,129 @@
+import asyncio
+from datetime import datetime, timezone
+import pytest
+from signal_bot.dispatcher import Dispatcher
+from signal_bot.message import Message, Direction
+
+
+def make_message(body, sender="+440001111111"):
+    return Message(
+        sender=sender,
+        recipient="+447786000000",
+        body=body,
+        direction=Direction.INCOMING,
+        timestamp=datetime(2025, 3, 15, 10, 0, 0, tzinfo=timezone.utc),
+    )
+
+
+class Recorder:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.handled = []
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, msg):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.delay)
+        self.handled.append((msg.sender, msg.body))
+        self.active -= 1
+
+
+async def dispatch(handler, messages, workers=4):
+    async with Dispatcher(handler, workers=workers) as dispatcher:
+        for msg in messages:
+            dispatcher.submit(msg)
+
+
+def test_same_sender_handled_in_order():
+    recorder = Recorder(delay=0.001)
+    asyncio.run(dispatch(recorder, [make_message(str(i)) for i in range(10)]))
+    assert [body for _, body in recorder.handled] == [str(i) for i in range(10)]
+    assert recorder.max_active == 1
+
+
+def test_different_senders_handled_concurrently():
+    recorder = Recorder(delay=0.01)
+    messages = [make_message("hi", sender=f"+44000000000{i}") for i in range(3)]
+    asyncio.run(dispatch(recorder, messages))
+    assert len(recorder.handled) == 3
+    assert recorder.max_active == 3
+
+
+def test_concurrency_bounded_by_workers():
+    recorder = Recorder(delay=0.01)
+    messages = [make_message("hi", sender=f"+44000000000{i}") for i in range(8)]
+    asyncio.run(dispatch(recorder, messages, workers=2))
+    assert len(recorder.handled) == 8
+    assert recorder.max_active == 2
+
+
+def test_backlogged_sender_does_not_starve_others():
+    recorder = Recorder()
+    messages = [make_message(str(i), sender="+440001111111") for i in range(3)]
+    messages.append(make_message("other", sender="+440002222222"))
+    asyncio.run(dispatch(recorder, messages, workers=1))
+    assert recorder.handled.index(("+440002222222", "other")) < 3
+
+
+def test_messages_submitted_while_handling_are_kept_in_order():
+    handled = []
+
+    async def run():
+        async def handler(msg):
+            if msg.body == "first":
+                dispatcher.submit(make_message("second"))
+            await asyncio.sleep(0.001)
+            handled.append(msg.body)
+
+        async with Dispatcher(handler, workers=2) as dispatcher:
+            dispatcher.submit(make_message("first"))
+
+    asyncio.run(run())
+    assert handled == ["first", "second"]
+
+
+def test_handler_error_does_not_stop_dispatcher():
+    handled = []
+
+    async def handler(msg):
+        if msg.body == "bad":
+            raise RuntimeError("boom")
+        handled.append(msg.body)
+
+    asyncio.run(dispatch(handler, [make_message("bad"), make_message("good")]))
+    assert handled == ["good"]
+
+
+def test_zero_workers_rejected():
+    with pytest.raises(ValueError):
+        Dispatcher(Recorder(), workers=0)
+
+
+def test_on_submit_sees_messages_before_they_are_handled():
+    recorder = Recorder(delay=0.001)
+    seen = []
+
+    def on_submit(msg):
+        seen.append((msg.body, len(recorder.handled)))
+
+    async def run():
+        async with Dispatcher(recorder, on_submit=on_submit) as dispatcher:
+            for i in range(3):
+                dispatcher.submit(make_message(str(i)))
+    asyncio.run(run())
+    assert seen == [("0", 0), ("1", 0), ("2", 0)]
+
+
+def test_on_submit_error_does_not_drop_message():
+    recorder = Recorder()
+
+    def on_submit(msg):
+        raise RuntimeError("boom")
+
+    async def run():
+        async with Dispatcher(recorder, on_submit=on_submit) as dispatcher:
+            dispatcher.submit(make_message("a"))
+    asyncio.run(run())
+    assert recorder.handled == [("+440001111111", "a")]
@@ -0,0 +1,143 @@
+import os
+from unittest.mock import patch
+import pytest
+from signal_bot.apps.gazetteer import Gazetteer, build_index
+
+# geonameid, name, asciiname, alternatenames, lat, lng, feature class, feature code, country, cc2,
+# admin1, admin2, admin3, admin4, population, elevation, dem, timezone, modification date
+CITIES = [
+    ("2643743", "London", "London", "", "51.50853", "-0.12574", "P", "PPLC", "GB", "", "ENG", "", "", "", "8961989", "", "25", "Europe/London", "2023-01-01"),
+    ("6058560", "London", "London", "", "42.98339", "-81.23304", "P", "PPL", "CA", "", "08", "", "", "", "422324", "", "252", "America/Toronto", "2023-01-01"),
+    ("2643123", "Londonderry County Borough", "Londonderry County Borough", "", "54.99721", "-7.30917", "P", "PPLA2", "GB", "", "NIR", "", "", "", "83652", "", "80", "Europe/London", "2023-01-01"),
+    ("1850147", "Tokyo", "Tokyo", "", "35.6895", "139.69171", "P", "PPLC", "JP", "", "40", "", "", "", "8336599", "", "44", "Asia/Tokyo", "2023-01-01"),
+    ("2950159", "Berlin", "Berlin", "", "52.52437", "13.41053", "P", "PPLC", "DE", "", "16", "", "", "", "3426354", "", "74", "Europe/Berlin", "2023-01-01"),
+    ("3117735", "Madrid", "Madrid", "", "40.4165", "-3.70256", "P", "PPLC", "ES", "", "29", "", "", "", "3255944", "", "665", "Europe/Madrid", "2023-01-01"),
+    ("2867714", "München", "Muenchen", "", "48.13743", "11.57549", "P", "PPLA", "DE", "", "02", "", "", "", "1260391", "", "524", "Europe/Berlin", "2023-01-01"),
+]
+
+
+def write_source(path, rows=CITIES):
+    path.write_text("".join("\t".join(row) + "\n" for row in rows), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    source = write_source(tmp_path / "cities.txt")
+    g = Gazetteer.from_geonames(source, tmp_path / "gazetteer.idx")
+    yield g
+    g.close()
+
+
+def test_build_index_is_sorted(tmp_path):
+    source = write_source(tmp_path / "cities.txt")
+    count = build_index(source, tmp_path / "gazetteer.idx")
+    lines = (tmp_path / "gazetteer.idx").read_bytes().splitlines()
+    assert len(lines) == count
+    assert lines == sorted(lines)
+
+
+def test_exact_name(gazetteer):
+    entry = gazetteer.lookup("Tokyo")
+    assert entry.timezone == "Asia/Tokyo"
+    assert entry.latitude == pytest.approx(35.6895)
+
+
+def test_case_and_whitespace_insensitive(gazetteer):
+    assert gazetteer.lookup("  bErLiN ").timezone == "Europe/Berlin"
+
+
+def test_most_populous_match_wins(gazetteer):
+    assert gazetteer.lookup("London").country == "GB"
+
+
+def test_city_country(gazetteer):
+    entry = gazetteer.lookup("London, CA")
+    assert entry.country == "CA"
+    assert entry.timezone == "America/Toronto"
+
+
+def test_city_unknown_country_code(gazetteer):
+    assert gazetteer.lookup("Tokyo, US") is None
+
+
+def test_non_country_qualifier_left_to_geocoder(gazetteer):
+    assert gazetteer.lookup("London, Ontario") is None
+
+
+def test_country_names_and_aliases(gazetteer):
+    assert gazetteer.lookup("London, UK").country == "GB"
+    assert gazetteer.lookup("London, England").country == "GB"
+    assert gazetteer.lookup("Berlin, Germany").timezone == "Europe/Berlin"
+    assert gazetteer.lookup("Tokyo, Germany") is None
+
+
+def test_country_names_from_country_info(tmp_path):
+    source = write_source(tmp_path / "cities.txt")
+    (tmp_path / "countryInfo.txt").write_text(
+        "#ISO\tISO3\tISO-Numeric\tfips\tCountry\n"
+        "CA\tCAN\t124\tCA\tCanada\n"
+        "JP\tJPN\t392\tJA\tJapan\n"
+        "ES\tESP\t724\tSP\tKingdom of Spain\n",
+        encoding="utf-8",
+    )
+    g = Gazetteer.from_geonames(source, tmp_path / "gazetteer.idx")
+    try:
+        assert g.lookup("London, canada").country == "CA"
+        assert g.lookup("Madrid, Kingdom of Spain").name == "Madrid"
+    finally:
+        g.close()
+
+
+def test_prefix_match(gazetteer):
+    assert gazetteer.lookup("Madr").name == "Madrid"
+
+
+def test_short_prefix_not_matched(gazetteer):
+    assert gazetteer.lookup("Ma") is None
+
+
+def test_exact_match_preferred_over_prefix(gazetteer):
+    # "London" is also a prefix of "Londonderry ..."; the exact name must win even within GB.
+    assert gazetteer.lookup("London, GB").name == "London"
+
+
+def test_ascii_and_native_names(gazetteer):
+    assert gazetteer.lookup("München").timezone == "Europe/Berlin"
+    assert gazetteer.lookup("Muenchen").timezone == "Europe/Berlin"
+
+
+def test_unknown_city(gazetteer):
+    assert gazetteer.lookup("Xyzzyville") is None
+
+
+def test_first_and_last_entries(gazetteer):
+    assert gazetteer.lookup("Berlin") is not None
+    assert gazetteer.lookup("Tokyo") is not None
+
+
+def test_empty_source(tmp_path):
+    source = write_source(tmp_path / "cities.txt", rows=[])
+    g = Gazetteer.from_geonames(source, tmp_path / "gazetteer.idx")
+    assert g.lookup("London") is None
+    g.close()
+
+
+def test_index_rebuilt_when_source_changes(tmp_path):
+    source = write_source(tmp_path / "cities.txt", rows=CITIES[:1])
+    index = tmp_path / "gazetteer.idx"
+    Gazetteer.from_geonames(source, index).close()
+    write_source(source)
+    os.utime(index, (0, 0))
+    g = Gazetteer.from_geonames(source, index)
+    assert g.lookup("Tokyo") is not None
+    g.close()
+
+
+def test_index_reused_when_fresh(tmp_path):
+    source = write_source(tmp_path / "cities.txt")
+    index = tmp_path / "gazetteer.idx"
+    Gazetteer.from_geonames(source, index).close()
+    with patch("signal_bot.apps.gazetteer.build_index") as mock_build:
+        Gazetteer.from_geonames(source, index).close()
+    mock_build.assert_not_called()
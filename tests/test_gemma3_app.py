@@ -0,0 +1,348 @@
+import asyncio
+import http.server
+import json
+import threading
+from datetime import datetime, time, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+from signal_bot.apps.gemma3_app import Gemma3App
+from signal_bot.bot import Bot
+from signal_bot.message import Direction, Message
+
+
+def _chunks(*texts):
+    return [SimpleNamespace(message=SimpleNamespace(content=text)) for text in texts]
+
+
+async def _async_chunks(*texts, closed=None):
+    try:
+        for chunk in _chunks(*texts):
+            yield chunk
+    finally:
+        if closed is not None:
+            closed.append(True)
+
+
+def _collect(app, args, sender="+44"):
+    async def collect():
+        return [reply async for reply in app.handle_async(args, sender=sender)]
+    return asyncio.run(collect())
+
+
+def _chat(app, *replies):
+    return patch.object(app._async_client, "chat", AsyncMock(side_effect=replies))
+
+
+def test_streams_lines_and_appends_history(tmp_path):
+    app = Gemma3App(data_dir=tmp_path)
+    with _chat(app, _async_chunks("Hel", "lo\nWor", "ld")) as mock_chat:
+        assert _collect(app, "hi") == ["Hello", "World"]
+    assert mock_chat.call_args.kwargs["stream"] is True
+    assert mock_chat.call_args.kwargs["messages"] == [{"role": "user", "content": "hi"}]
+    with _chat(app, _async_chunks("ok")) as mock_chat:
+        _collect(app, "again")
+    assert mock_chat.call_args.kwargs["messages"] == [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "Hello\nWorld"},
+        {"role": "user", "content": "again"},
+    ]
+    assert len((tmp_path / "gemma3" / "+44.jsonl").read_text().splitlines()) == 4
+
+
+def test_commands(tmp_path):
+    app = Gemma3App(data_dir=tmp_path)
+    assert _collect(app, "stop") == ["Nothing to stop."]
+    with _chat(app, _async_chunks("ok")):
+        _collect(app, "hi")
+    assert _collect(app, "clear") == ["Conversation history cleared."]
+    assert not (tmp_path / "gemma3" / "+44.jsonl").exists()
+
+
+def test_unavailable_ollama(tmp_path):
+    app = Gemma3App(data_dir=tmp_path)
+    with _chat(app, httpx.ConnectError("refused")):
+        assert _collect(app, "hi") == ["Gemma3 is unavailable. Is ollama running?"]
+    assert not (tmp_path / "gemma3" / "+44.jsonl").exists()
+    assert app._scheduler.running == 0
+
+
+def test_file_io_runs_off_the_event_loop(tmp_path):
+    app = Gemma3App(data_dir=tmp_path, summarize=True)
+    threads = []
+    tail, append = app._history.tail, app._history.append
+
+    def record(method):
+        def wrapper(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return method(*args, **kwargs)
+        return wrapper
+
+    with patch.object(app._history, "tail", record(tail)), patch.object(app._history, "append", record(append)), \
+         _chat(app, _async_chunks("ok")):
+        _collect(app, "hi")
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+
+
+def _exchange(app, prompt, reply):
+    with _chat(app, _async_chunks(reply)) as mock_chat:
+        _collect(app, prompt)
+    return mock_chat
+
+
+def test_context_limited_to_token_budget(tmp_path):
+    app = Gemma3App(data_dir=tmp_path, context_tokens=100)
+    for i in range(10):
+        _exchange(app, f"question {i} " + "x" * 80, f"answer {i} " + "y" * 80)
+    mock_chat = _exchange(app, "last", "ok")
+    messages = mock_chat.call_args.kwargs["messages"]
+    assert messages[-1] == {"role": "user", "content": "last"}
+    assert messages[0]["role"] == "user"
+    assert len(messages) < 5
+
+
+def test_rolling_summary_of_dropped_messages(tmp_path):
+    app = Gemma3App(data_dir=tmp_path, context_tokens=100, summarize=True)
+    summary = SimpleNamespace(message=SimpleNamespace(content="They talked about x."))
+    for i in range(3):
+        with _chat(app, _async_chunks(f"answer {i} " + "y" * 80), summary):
+            _collect(app, f"question {i} " + "x" * 80)
+    assert "They talked about x." in (tmp_path / "gemma3" / "+44.summary.json").read_text()
+    mock_chat = _exchange(app, "last", "ok")
+    messages = mock_chat.call_args_list[0].kwargs["messages"]
+    assert messages[0] == {"role": "system", "content": "Summary of the conversation so far: They talked about x."}
+
+
+def test_summary_skips_already_summarised_messages(tmp_path):
+    app = Gemma3App(data_dir=tmp_path, context_tokens=100, summarize=True)
+    summary = SimpleNamespace(message=SimpleNamespace(content="S"))
+    transcripts = []
+    for i in range(3):
+        with _chat(app, _async_chunks(f"answer {i} " + "y" * 80), summary) as mock_chat:
+            _collect(app, f"question {i} " + "x" * 80)
+        if mock_chat.call_count == 2:
+            transcripts.append(mock_chat.call_args.kwargs["messages"][1]["content"])
+    assert len(transcripts) > 1
+    assert sum(t.count("question 0 ") for t in transcripts) == 1
+
+
+def _interrupted_stream(app, sender, args, closed):
+    async def stream():
+        try:
+            yield _chunks("first line\n")[0]
+            app.interrupt(sender, args)
+            yield _chunks("second ")[0]
+            yield _chunks("line\n")[0]
+        finally:
+            closed.append(True)
+    return stream()
+
+
+def test_stop_cancels_stream_and_keeps_partial_reply(tmp_path):
+    app = Gemma3App(data_dir=tmp_path)
+    closed = []
+    with _chat(app, _interrupted_stream(app, "+44", "stop", closed)):
+        assert _collect(app, "hi") == ["first line"]
+    assert closed == [True]
+    assert app._history.tail("+44")[-1] == {"role": "assistant", "content": "first line\n"}
+    assert _collect(app, "stop") == ["Stopped."]
+    assert _collect(app, "stop") == ["Nothing to stop."]
+
+
+def test_stop_before_the_first_token_closes_stream_at_once(tmp_path):
+    app = Gemma3App(data_dir=tmp_path)
+    closed = []
+
+    async def stream():
+        try:
+            # The model is still loading.
+            await asyncio.sleep(5)
+            yield _chunks("late\n")[0]
+        finally:
+            closed.append(True)
+
+    async def main():
+        threading.Timer(0.05, app.interrupt, ["+44", "stop"]).start()
+        started = asyncio.get_running_loop().time()
+        replies = [reply async for reply in app.handle_async("hi", sender="+44")]
+        return replies, asyncio.get_running_loop().time() - started
+
+    with _chat(app, stream()):
+        replies, elapsed = asyncio.run(main())
+    assert replies == []
+    assert elapsed < 1
+    assert closed == [True]
+    assert app._scheduler.running == 0
+    assert _collect(app, "stop") == ["Stopped."]
+
+
+def test_new_message_cancels_only_when_enabled(tmp_path):
+    app = Gemma3App(data_dir=tmp_path)
+    with _chat(app, _interrupted_stream(app, "+44", None, [])):
+        assert _collect(app, "hi") == ["first line", "second line"]
+    app = Gemma3App(data_dir=tmp_path, cancel_on_new_message=True)
+    with _chat(app, _interrupted_stream(app, "+44", None, [])):
+        assert _collect(app, "hi") == ["first line"]
+    assert _collect(app, "stop") == ["Nothing to stop."]
+
+
+def test_other_senders_are_not_cancelled(tmp_path):
+    app = Gemma3App(data_dir=tmp_path, cancel_on_new_message=True)
+    with _chat(app, _interrupted_stream(app, "+45", "stop", [])):
+        assert _collect(app, "hi") == ["first line", "second line"]
+
+
+def test_typing_indicator_can_be_turned_off(tmp_path):
+    assert Gemma3App(data_dir=tmp_path).typing_indicator is True
+    assert Gemma3App(data_dir=tmp_path, typing_indicator=False).typing_indicator is False
+
+
+def test_stream_edits_yields_raw_fragments(tmp_path):
+    app = Gemma3App(data_dir=tmp_path, stream_edits=True)
+    assert app.stream_edits
+    with _chat(app, _async_chunks("Hel", "lo\nWor", "ld")):
+        assert _collect(app, "hi") == ["Hel", "lo\nWor", "ld"]
+    assert app._history.tail("+44")[-1]["content"] == "Hello\nWorld"
+
+
+def test_keep_alive_passed_to_chat(tmp_path):
+    app = Gemma3App(data_dir=tmp_path, keep_alive="30m")
+    assert _exchange(app, "hi", "ok").call_args.kwargs["keep_alive"] == "30m"
+    assert Gemma3App(data_dir=tmp_path, keep_alive="-1").keep_alive == -1.0
+    assert Gemma3App(data_dir=tmp_path).keep_alive is None
+
+
+def test_warm_up_loads_model_in_background(tmp_path):
+    loaded = threading.Event()
+    with patch("signal_bot.apps.gemma3_app.ollama.Client.generate", side_effect=lambda **kwargs: loaded.set()) as mock_generate:
+        app = Gemma3App(data_dir=tmp_path, warm_up=True, keep_alive="1h")
+        assert loaded.wait(timeout=5)
+        app.close()
+    assert mock_generate.call_args.kwargs == {"model": "gemma3:12b-it-qat", "keep_alive": "1h"}
+
+
+def test_warm_up_failure_is_logged(tmp_path, caplog):
+    with patch("signal_bot.apps.gemma3_app.ollama.Client.generate", side_effect=ConnectionError("refused")):
+        app = Gemma3App(data_dir=tmp_path, warm_up=True)
+        app._warmer.join(timeout=5)
+    assert "Could not load" in caplog.text
+
+
+def test_keep_warm_pings_during_active_hours(tmp_path):
+    pings = threading.Semaphore(0)
+    with patch("signal_bot.apps.gemma3_app.ollama.Client.generate", side_effect=lambda **kwargs: pings.release()):
+        app = Gemma3App(data_dir=tmp_path, keep_warm_interval=0.01)
+        assert pings.acquire(timeout=5) and pings.acquire(timeout=5)
+        app.close()
+    assert not app._warmer.is_alive()
+
+
+def test_no_background_thread_by_default(tmp_path):
+    assert Gemma3App(data_dir=tmp_path)._warmer is None
+
+
+def test_active_hours(tmp_path):
+    day = Gemma3App(data_dir=tmp_path, active_hours="07:00-23:00")
+    assert day._in_active_hours(time(12, 0))
+    assert not day._in_active_hours(time(23, 30))
+    night = Gemma3App(data_dir=tmp_path, active_hours="22:00-02:00")
+    assert night._in_active_hours(time(23, 0)) and night._in_active_hours(time(1, 0))
+    assert not night._in_active_hours(time(12, 0))
+    with pytest.raises(ValueError):
+        Gemma3App(data_dir=tmp_path, active_hours="mornings")
+
+
+def test_queued_reply_tells_sender_their_place_in_line(tmp_path):
+    app = Gemma3App(data_dir=tmp_path)
+    running = app._scheduler.submit("+45")
+
+    async def main():
+        asyncio.get_running_loop().call_later(0.05, app._scheduler.release, running)
+        return [reply async for reply in app.handle_async("hi", sender="+44")]
+
+    with _chat(app, _async_chunks("ok")):
+        assert asyncio.run(main()) == ["You are #1 in line.", "ok"]
+    assert app._scheduler.completed == 2
+
+
+def test_stop_while_queued(tmp_path):
+    app = Gemma3App(data_dir=tmp_path)
+    running = app._scheduler.submit("+45")
+
+    async def main():
+        replies = app.handle_async("hi", sender="+44")
+        assert await anext(replies) == "You are #1 in line."
+        app.interrupt("+44", "stop")
+        return [reply async for reply in replies]
+
+    with _chat(app) as mock_chat:
+        assert asyncio.run(main()) == []
+    mock_chat.assert_not_called()
+    assert app._scheduler.waiting == 0
+    assert not (tmp_path / "gemma3" / "+44.jsonl").exists()
+    assert _collect(app, "stop") == ["Stopped."]
+    app._scheduler.release(running)
+
+
+def test_stats(tmp_path):
+    app = Gemma3App(data_dir=tmp_path, max_concurrent=2)
+    assert _collect(app, "stats") == ["Generating: 0 of 2, waiting: 0"]
+    _exchange(app, "hi", "ok")
+    assert "1 replies, queue wait avg 0.0s" in _collect(app, "stats")[0]
+
+
+def test_close_closes_ollama_clients(tmp_path):
+    app = Gemma3App(data_dir=tmp_path)
+    with patch.object(app._async_client, "close", AsyncMock()) as mock_aclose:
+        asyncio.run(app.close_async())
+    mock_aclose.assert_awaited_once()
+    with patch.object(app._client, "close") as mock_close:
+        app.close()
+    mock_close.assert_called_once()
+
+
+class _OllamaHandler(http.server.BaseHTTPRequestHandler):
+    # Keep-alive, so the client holds on to its connection between requests.
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = "".join(json.dumps(line) + "\n" for line in [
+            {"model": "gemma3", "message": {"role": "assistant", "content": "hi\n"}, "done": False},
+            {"model": "gemma3", "message": {"role": "assistant", "content": ""}, "done": True},
+        ]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def ollama_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _OllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_process_messages_replies_on_every_event_loop(tmp_path, ollama_server):
+    backend = MagicMock(spec=["send", "receive"])
+    bot = Bot(account="+447786000000", log_dir=tmp_path / "logs", backend=backend)
+    bot.register_app(Gemma3App(data_dir=tmp_path, ollama_host=ollama_server))
+    for _ in range(2):
+        backend.receive.return_value = [Message(
+            sender="+44", recipient="+447786000000", body="/gemma3 hello",
+            direction=Direction.INCOMING, timestamp=datetime.now(timezone.utc),
+        )]
+        bot.process_messages()
+    assert [c.args for c in backend.send.call_args_list] == [("+44", "hi"), ("+44", "hi")]
+    bot.close()
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+
+import pytest
+
+from signal_bot.apps.generation_scheduler import GenerationScheduler
+
+
+def test_starts_immediately_when_a_slot_is_free():
+    scheduler = GenerationScheduler(max_concurrent=2)
+    first, second = scheduler.submit("+44"), scheduler.submit("+45")
+    assert first.running and second.running
+    assert scheduler.position(first) == 0
+    assert scheduler.wait(first, timeout=0)
+
+
+def test_waits_for_a_slot():
+    scheduler = GenerationScheduler()
+    first = scheduler.submit("+44")
+    second = scheduler.submit("+45")
+    assert not second.running
+    assert scheduler.position(second) == 1
+    assert not scheduler.wait(second, timeout=0)
+    scheduler.release(first)
+    assert second.running
+    assert scheduler.wait(second, timeout=0)
+
+
+def test_senders_take_turns():
+    scheduler = GenerationScheduler()
+    running = scheduler.submit("+44")
+    a1, a2, a3 = (scheduler.submit("+45") for _ in range(3))
+    b1 = scheduler.submit("+46")
+    assert [scheduler.position(t) for t in (a1, b1, a2, a3)] == [1, 2, 3, 4]
+    order = []
+    for ticket in (running, a1, b1, a2, a3):
+        scheduler.release(ticket)
+        order.extend(t for t in (a1, a2, a3, b1) if t.running and t not in order)
+    assert order == [a1, b1, a2, a3]
+
+
+def test_cancel_leaves_the_queue():
+    scheduler = GenerationScheduler()
+    running = scheduler.submit("+44")
+    queued = scheduler.submit("+45")
+    behind = scheduler.submit("+46")
+    scheduler.cancel(queued)
+    assert not scheduler.wait(queued)
+    assert scheduler.position(behind) == 1
+    scheduler.release(queued)
+    scheduler.release(running)
+    assert behind.running
+
+
+def test_release_twice_frees_one_slot():
+    scheduler = GenerationScheduler()
+    first = scheduler.submit("+44")
+    scheduler.release(first)
+    scheduler.release(first)
+    assert scheduler.running == 0
+    assert scheduler.completed == 1
+
+
+def test_wait_and_generation_time_measured_separately():
+    scheduler = GenerationScheduler()
+    first = scheduler.submit("+44")
+    second = scheduler.submit("+45")
+    started = threading.Event()
+
+    def waiter():
+        scheduler.wait(second)
+        started.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    threading.Event().wait(0.05)
+    scheduler.release(first)
+    assert started.wait(timeout=5)
+    thread.join()
+    scheduler.release(second)
+    assert scheduler.completed == 2
+    assert scheduler.max_wait >= 0.05
+    assert scheduler.max_generation >= 0.05
+    assert second.started_at - second.queued_at == pytest.approx(scheduler.max_wait)
+
+
+def test_needs_a_slot():
+    with pytest.raises(ValueError):
+        GenerationScheduler(max_concurrent=0)
+
+
+def test_wait_async_wakes_when_released_from_another_thread():
+    scheduler = GenerationScheduler()
+    first = scheduler.submit("+44")
+    second = scheduler.submit("+45")
+
+    async def main():
+        threading.Timer(0.05, scheduler.release, [first]).start()
+        return await asyncio.wait_for(scheduler.wait_async(second), timeout=5)
+
+    assert asyncio.run(main())
+    assert second.running
+
+
+def test_wait_async_returns_false_when_cancelled():
+    scheduler = GenerationScheduler()
+    scheduler.submit("+44")
+    queued = scheduler.submit("+45")
+
+    async def main():
+        asyncio.get_running_loop().call_later(0.01, scheduler.cancel, queued)
+        return await scheduler.wait_async(queued)
+
+    assert asyncio.run(main()) is False
+    assert queued._wakers == []
+
+
+def test_wait_cancelled_wakes_when_a_running_ticket_is_cancelled():
+    scheduler = GenerationScheduler()
+    running = scheduler.submit("+44")
+
+    async def main():
+        threading.Timer(0.05, scheduler.cancel, [running]).start()
+        await asyncio.wait_for(scheduler.wait_cancelled(running), timeout=5)
+
+    asyncio.run(main())
+    assert running.cancelled.is_set()
+    assert running._cancel_wakers == []
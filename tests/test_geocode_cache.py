@@ -0,0 +1,108 @@
+import json
+import threading
+from unittest.mock import patch
+from signal_bot.apps.geocode_cache import GeocodeCache, normalise_location
+
+
+def test_normalise_location():
+    assert normalise_location("  New York,US ") == normalise_location("new york, us")
+    assert normalise_location("London") == "london"
+
+
+def test_miss_returns_none():
+    cache = GeocodeCache()
+    assert cache.get("London") is None
+
+
+def test_put_and_get():
+    cache = GeocodeCache()
+    cache.put("London, GB", 51.5, -0.12, "Europe/London")
+    entry = cache.get("london,gb")
+    assert entry.found
+    assert entry.timezone == "Europe/London"
+    assert entry.latitude == 51.5
+
+
+def test_negative_result_cached():
+    cache = GeocodeCache()
+    cache.put_miss("Xyzzyville")
+    entry = cache.get("Xyzzyville")
+    assert entry is not None
+    assert not entry.found
+
+
+def test_negative_result_expires():
+    cache = GeocodeCache(negative_ttl=60)
+    with patch("signal_bot.apps.geocode_cache.time.time", return_value=1000):
+        cache.put_miss("Xyzzyville")
+    with patch("signal_bot.apps.geocode_cache.time.time", return_value=1059):
+        assert cache.get("Xyzzyville") is not None
+    with patch("signal_bot.apps.geocode_cache.time.time", return_value=1061):
+        assert cache.get("Xyzzyville") is None
+
+
+def test_positive_result_does_not_expire():
+    cache = GeocodeCache(negative_ttl=60)
+    with patch("signal_bot.apps.geocode_cache.time.time", return_value=1000):
+        cache.put("Tokyo", 35.7, 139.7, "Asia/Tokyo")
+    with patch("signal_bot.apps.geocode_cache.time.time", return_value=10**9):
+        assert cache.get("Tokyo").timezone == "Asia/Tokyo"
+
+
+def test_lru_eviction():
+    cache = GeocodeCache(max_entries=2)
+    cache.put("London", 51.5, -0.12, "Europe/London")
+    cache.put("Paris", 48.9, 2.35, "Europe/Paris")
+    cache.get("London")
+    cache.put("Tokyo", 35.7, 139.7, "Asia/Tokyo")
+    assert len(cache) == 2
+    assert cache.get("Paris") is None
+    assert cache.get("London") is not None
+    assert cache.get("Tokyo") is not None
+
+
+def test_persists_to_disk(tmp_path):
+    path = tmp_path / "cache.json"
+    cache = GeocodeCache(path)
+    cache.put("London", 51.5, -0.12, "Europe/London")
+    reloaded = GeocodeCache(path)
+    assert reloaded.get("London").timezone == "Europe/London"
+
+
+def test_unreadable_file_starts_empty(tmp_path):
+    path = tmp_path / "cache.json"
+    path.write_text("{not json")
+    cache = GeocodeCache(path)
+    assert len(cache) == 0
+
+
+def test_load_respects_size_cap(tmp_path):
+    path = tmp_path / "cache.json"
+    entries = {f"city{i}": {"latitude": 0, "longitude": 0, "timezone": "UTC", "cached_at": 0} for i in range(5)}
+    path.write_text(json.dumps(entries))
+    cache = GeocodeCache(path, max_entries=3)
+    assert len(cache) == 3
+    assert cache.get("city0") is None
+    assert cache.get("city4") is not None
+
+
+def test_concurrent_puts_and_gets(tmp_path):
+    path = tmp_path / "cache.json"
+    cache = GeocodeCache(path, max_entries=50)
+    errors = []
+
+    def work(n):
+        try:
+            for i in range(100):
+                cache.put(f"city {n} {i}", 1.0, 2.0, "Europe/London")
+                cache.get(f"city {n} {i // 2}")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert len(json.loads(path.read_text())) == 50
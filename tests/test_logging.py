@@ -1,7 +1,11 @@
 import os
+import threading
+import time
+from unittest.mock import patch
+import pytest
 from datetime import datetime, timezone
 from signal_bot.message import Message, Direction
-from signal_bot.logging import log_message
+from signal_bot.logging import BackgroundLogWriter, MessageLogWriter, log_message
 
 
 def test_log_creates_file_with_date_name(tmp_path):
@@ -80,3 +84,209 @@ def test_different_day_creates_new_file(tmp_path):
     assert (tmp_path / "2025_03_16.txt").exists()
     assert "Day one" in (tmp_path / "2025_03_15.txt").read_text()
     assert "Day two" in (tmp_path / "2025_03_16.txt").read_text()
+
+
+def make_message(body, timestamp, direction=Direction.INCOMING):
+    return Message(
+        sender="+1234567890",
+        recipient="+0987654321",
+        body=body,
+        direction=direction,
+        timestamp=timestamp,
+    )
+
+
+def test_writer_matches_log_message_format(tmp_path):
+    ts = datetime(2025, 3, 15, 10, 30, 0, tzinfo=timezone.utc)
+    (tmp_path / "a").mkdir()
+    log_message(make_message("Hello!", ts), log_dir=tmp_path / "a")
+    writer = MessageLogWriter()
+    writer.write(make_message("Hello!", ts), tmp_path / "b")
+    writer.close()
+    assert (tmp_path / "a" / "2025_03_15.txt").read_text() == (tmp_path / "b" / "2025_03_15.txt").read_text()
+
+
+def test_writer_write_through_by_default(tmp_path):
+    writer = MessageLogWriter()
+    writer.write(make_message("Now", datetime(2025, 3, 15, 10, 0, 0, tzinfo=timezone.utc)), tmp_path)
+    assert "Now" in (tmp_path / "2025_03_15.txt").read_text()
+    writer.close()
+
+
+def test_writer_buffers_until_flush(tmp_path):
+    writer = MessageLogWriter(flush_interval=60)
+    ts = datetime(2025, 3, 15, 10, 0, 0, tzinfo=timezone.utc)
+    writer.write(make_message("First", ts), tmp_path)
+    writer.write(make_message("Second", ts), tmp_path)
+    assert not (tmp_path / "2025_03_15.txt").exists()
+    writer.flush()
+    lines = (tmp_path / "2025_03_15.txt").read_text().strip().split("\n")
+    assert len(lines) == 2
+    assert "First" in lines[0]
+    assert "Second" in lines[1]
+    writer.close()
+
+
+def test_writer_keeps_handle_open(tmp_path):
+    writer = MessageLogWriter()
+    ts = datetime(2025, 3, 15, 10, 0, 0, tzinfo=timezone.utc)
+    with patch("builtins.open", wraps=open) as mock_open:
+        for i in range(5):
+            writer.write(make_message(f"msg {i}", ts), tmp_path)
+    assert mock_open.call_count == 1
+    writer.close()
+
+
+def test_writer_creates_missing_directory(tmp_path):
+    writer = MessageLogWriter()
+    writer.write(make_message("Denied", datetime(2025, 3, 15, 10, 0, 0, tzinfo=timezone.utc)), tmp_path / "unauthorized")
+    writer.close()
+    assert "Denied" in (tmp_path / "unauthorized" / "2025_03_15.txt").read_text()
+
+
+def test_writer_rotates_at_midnight(tmp_path):
+    writer = MessageLogWriter()
+    writer.write(make_message("Day one", datetime(2025, 3, 15, 23, 59, 0, tzinfo=timezone.utc)), tmp_path)
+    day_one = writer._files[tmp_path / "2025_03_15.txt"]
+    writer.write(make_message("Day two", datetime(2025, 3, 16, 0, 1, 0, tzinfo=timezone.utc)), tmp_path)
+    assert day_one.closed
+    assert list(writer._files) == [tmp_path / "2025_03_16.txt"]
+    writer.close()
+    assert "Day one" in (tmp_path / "2025_03_15.txt").read_text()
+    assert "Day two" in (tmp_path / "2025_03_16.txt").read_text()
+
+
+def test_writer_fsync_policy(tmp_path):
+    ts = datetime(2025, 3, 15, 10, 0, 0, tzinfo=timezone.utc)
+    with patch("signal_bot.logging.os.fsync") as mock_fsync:
+        writer = MessageLogWriter(flush_interval=60, fsync="flush")
+        writer.write(make_message("a", ts), tmp_path)
+        writer.write(make_message("b", ts), tmp_path)
+        assert mock_fsync.call_count == 0
+        writer.flush()
+        assert mock_fsync.call_count == 1
+        writer.close()
+    with patch("signal_bot.logging.os.fsync") as mock_fsync:
+        writer = MessageLogWriter(flush_interval=60, fsync="always")
+        writer.write(make_message("a", ts), tmp_path)
+        writer.write(make_message("b", ts), tmp_path)
+        assert mock_fsync.call_count == 2
+        writer.close()
+
+
+def test_writer_rejects_unknown_fsync_policy():
+    with pytest.raises(ValueError, match="fsync"):
+        MessageLogWriter(fsync="sometimes")
+
+
+class SlowWriter(MessageLogWriter):
+    """Holds the background thread inside write() until released."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def write(self, message, log_dir):
+        self.release.wait(timeout=5)
+        super().write(message, log_dir)
+
+
+def test_background_writer_writes_on_flush(tmp_path):
+    writer = BackgroundLogWriter(MessageLogWriter(flush_interval=60))
+    ts = datetime(2025, 3, 15, 10, 0, 0, tzinfo=timezone.utc)
+    writer.write(make_message("Queued", ts), tmp_path)
+    writer.flush()
+    assert writer.pending == 0
+    assert "Queued" in (tmp_path / "2025_03_15.txt").read_text()
+    writer.close()
+
+
+def test_background_writer_close_drains_queue(tmp_path):
+    writer = BackgroundLogWriter(MessageLogWriter(flush_interval=60))
+    ts = datetime(2025, 3, 15, 10, 0, 0, tzinfo=timezone.utc)
+    for i in range(100):
+        writer.write(make_message(f"msg {i}", ts), tmp_path)
+    writer.close()
+    assert len((tmp_path / "2025_03_15.txt").read_text().strip().split("\n")) == 100
+
+
+def test_background_writer_flushes_after_idle_interval(tmp_path):
+    writer = BackgroundLogWriter(MessageLogWriter(flush_interval=0.05))
+    writer.write(make_message("Idle", datetime(2025, 3, 15, 10, 0, 0, tzinfo=timezone.utc)), tmp_path)
+    log_file = tmp_path / "2025_03_15.txt"
+    deadline = time.monotonic() + 2
+    # The file is created when first opened, before the buffered line is written out.
+    while not (log_file.exists() and log_file.read_text()) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert "Idle" in log_file.read_text()
+    writer.close()
+
+
+def fill_stalled_writer(tmp_path, overflow):
+    inner = SlowWriter()
+    writer = BackgroundLogWriter(inner, max_pending=2, overflow=overflow)
+    ts = datetime(2025, 3, 15, 10, 0, 0, tzinfo=timezone.utc)
+    writer.write(make_message("in flight", ts), tmp_path)
+    deadline = time.monotonic() + 2
+    while writer.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    for body in ("a", "b", "c"):
+        writer.write(make_message(body, ts), tmp_path)
+    return writer, inner
+
+
+def test_background_writer_drop_oldest(tmp_path):
+    writer, inner = fill_stalled_writer(tmp_path, "drop-oldest")
+    assert writer.pending == 2
+    assert writer.dropped == 1
+    inner.release.set()
+    writer.close()
+    content = (tmp_path / "2025_03_15.txt").read_text()
+    assert ": a\n" not in content
+    assert ": b\n" in content and ": c\n" in content
+
+
+def test_background_writer_count_and_drop(tmp_path):
+    writer, inner = fill_stalled_writer(tmp_path, "count-and-drop")
+    assert writer.pending == 2
+    assert writer.dropped == 1
+    inner.release.set()
+    writer.close()
+    content = (tmp_path / "2025_03_15.txt").read_text()
+    assert ": a\n" in content and ": b\n" in content
+    assert ": c\n" not in content
+
+
+def test_background_writer_block_waits_for_room(tmp_path):
+    inner = SlowWriter()
+    writer = BackgroundLogWriter(inner, max_pending=1, overflow="block")
+    ts = datetime(2025, 3, 15, 10, 0, 0, tzinfo=timezone.utc)
+    writer.write(make_message("in flight", ts), tmp_path)
+    deadline = time.monotonic() + 2
+    while writer.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.write(make_message("queued", ts), tmp_path)
+    blocked = threading.Thread(target=writer.write, args=(make_message("blocked", ts), tmp_path))
+    blocked.start()
+    blocked.join(timeout=0.1)
+    assert blocked.is_alive()
+    inner.release.set()
+    blocked.join(timeout=2)
+    assert not blocked.is_alive()
+    writer.close()
+    assert writer.dropped == 0
+    assert len((tmp_path / "2025_03_15.txt").read_text().strip().split("\n")) == 3
+
+
+def test_background_writer_non_blocking_flush_returns_immediately(tmp_path):
+    inner = SlowWriter()
+    writer = BackgroundLogWriter(inner)
+    writer.write(make_message("slow", datetime(2025, 3, 15, 10, 0, 0, tzinfo=timezone.utc)), tmp_path)
+    assert writer.flush(blocking=False) is True
+    inner.release.set()
+    writer.close()
+
+
+def test_background_writer_rejects_unknown_overflow_policy():
+    with pytest.raises(ValueError, match="overflow"):
+        BackgroundLogWriter(MessageLogWriter(), overflow="explode")
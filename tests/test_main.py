@@ -1,7 +1,9 @@
 import signal
+import time
 from unittest.mock import patch, MagicMock, call
 from signal_bot.main import create_bot
 from signal_bot.config import Config
+from signal_bot.signal_cli_stdio import SignalCliStdio
 
 
 def test_create_bot_uses_config():
@@ -11,6 +13,7 @@ def test_create_bot_uses_config():
         log_dir="/tmp/test-logs",
         allowed_senders=None,
         data_dir="/tmp/test-data",
+        gemma3_warm_up=False,
     )
     bot = create_bot(config)
     assert bot.account == "+440001111111"
@@ -25,6 +28,7 @@ def test_create_bot_registers_test_app():
         log_dir="/tmp/test-logs",
         allowed_senders=None,
         data_dir="/tmp/test-data",
+        gemma3_warm_up=False,
     )
     bot = create_bot(config)
     app = bot.registry.get("test")
@@ -39,6 +43,101 @@ def test_create_bot_with_custom_cli_path():
         log_dir="logs",
         allowed_senders=None,
         data_dir="/tmp/test-data",
+        gemma3_warm_up=False,
     )
     bot = create_bot(config)
     assert bot.signal_cli._cli_parts == ["flatpak", "run", "org.asamk.SignalCli"]
+
+
+def test_create_bot_jsonrpc_push_mode():
+    config = Config(
+        phone_number="+440001111111",
+        cli_path="signal-cli",
+        log_dir="logs",
+        allowed_senders=None,
+        data_dir="/tmp/test-data",
+        gemma3_warm_up=False,
+        signal_cli_mode="jsonrpc",
+    )
+    bot = create_bot(config)
+    assert bot.signal_cli.push is True
+
+
+def test_create_bot_jsonrpc_poll_mode():
+    config = Config(
+        phone_number="+440001111111",
+        cli_path="signal-cli",
+        log_dir="logs",
+        allowed_senders=None,
+        data_dir="/tmp/test-data",
+        gemma3_warm_up=False,
+        signal_cli_mode="jsonrpc",
+        signal_cli_receive_mode="poll",
+    )
+    bot = create_bot(config)
+    assert bot.signal_cli.push is False
+
+
+def test_create_bot_stdio_mode():
+    config = Config(
+        phone_number="+440001111111",
+        cli_path="signal-cli",
+        log_dir="logs",
+        allowed_senders=None,
+        data_dir="/tmp/test-data",
+        gemma3_warm_up=False,
+        signal_cli_mode="stdio",
+    )
+    bot = create_bot(config)
+    assert isinstance(bot.signal_cli, SignalCliStdio)
+    assert bot.signal_cli._cli_parts == ["signal-cli"]
+
+
+def test_create_bot_uses_dispatch_workers():
+    config = Config(
+        phone_number="+440001111111",
+        cli_path="signal-cli",
+        log_dir="logs",
+        allowed_senders=None,
+        data_dir="/tmp/test-data",
+        gemma3_warm_up=False,
+        dispatch_workers=7,
+    )
+    bot = create_bot(config)
+    assert bot.workers == 7
+
+
+def test_shutdown_flushes_buffered_logs(tmp_path, monkeypatch):
+    from datetime import datetime, timezone
+    from signal_bot import main
+    from signal_bot.message import Message, Direction
+    config = Config(
+        phone_number="+440001111111",
+        cli_path="signal-cli",
+        log_dir=str(tmp_path),
+        allowed_senders=None,
+        data_dir=str(tmp_path),
+        gemma3_warm_up=False,
+        log_flush_interval=60,
+    )
+    bot = create_bot(config)
+    monkeypatch.setattr(main, "_bot", bot)
+    monkeypatch.setattr(main, "_running", True)
+    msg = Message(
+        sender="+440001111111",
+        recipient="+440002222222",
+        body="buffered",
+        direction=Direction.INCOMING,
+        timestamp=datetime(2025, 3, 15, 10, 0, 0, tzinfo=timezone.utc),
+    )
+    log_file = tmp_path / "2025_03_15.txt"
+    bot.log_writer.write(msg, bot.log_dir)
+    # The writer thread may already have created the file, but the line stays buffered.
+    assert not log_file.exists() or log_file.read_text() == ""
+    main._shutdown(signal.SIGTERM, None)
+    deadline = time.monotonic() + 2
+    while not (log_file.exists() and log_file.read_text()) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert "buffered" in log_file.read_text()
+    assert main._running is False
+    bot.close()
@@ -122,3 +122,19 @@ def test_start_unknown_command_not_activated(tmp_path):
     mock_send = process(bot, [make_message("/unknown start")])
     mock_send.assert_not_called()
     assert "+440001111111" not in bot._modes
+
+
+def test_mode_transitions_ordered_within_batch(tmp_path):
+    bot = make_bot(tmp_path)
+    messages = [
+        make_message("/test start"),
+        make_message("abc"),
+        make_message("/test end"),
+        make_message("abc"),
+    ]
+    mock_send = process(bot, messages)
+    bodies = [c.args[1] for c in mock_send.call_args_list]
+    assert len(bodies) == 3
+    assert "Entered" in bodies[0]
+    assert bodies[1] == "cba"
+    assert "Exited" in bodies[2]
@@ -1,6 +1,7 @@
+import asyncio
 from signal_bot.app_interface import CommandApp
 from signal_bot.registry import AppRegistry
-from signal_bot.router import route_command
+from signal_bot.router import route_command_async
 
 
 class ReverseApp(CommandApp):
@@ -22,25 +23,27 @@ def make_registry_with_reverse_app() -> AppRegistry:
     return registry
 
 
+async def collect(responses):
+    return [r async for r in responses]
+
+
 def test_routes_command_to_app():
     registry = make_registry_with_reverse_app()
-    result = route_command("/test hello, world!", registry)
-    assert list(result) == ["!dlrow ,olleh"]
+    result = route_command_async("/test hello, world!", registry)
+    assert asyncio.run(collect(result)) == ["!dlrow ,olleh"]
 
 
 def test_non_command_returns_none():
     registry = make_registry_with_reverse_app()
-    result = route_command("just a regular message", registry)
-    assert result is None
+    assert route_command_async("just a regular message", registry) is None
 
 
 def test_unregistered_command_returns_none():
     registry = make_registry_with_reverse_app()
-    result = route_command("/unknown do stuff", registry)
-    assert result is None
+    assert route_command_async("/unknown do stuff", registry) is None
 
 
 def test_command_with_no_args():
     registry = make_registry_with_reverse_app()
-    result = route_command("/test", registry)
-    assert list(result) == [""]
+    result = route_command_async("/test", registry)
+    assert asyncio.run(collect(result)) == [""]
@@ -112,3 +112,33 @@ def test_receive_sets_timestamp_from_envelope():
         mock_run.return_value = MagicMock(returncode=0, stdout=output)
         messages = cli.receive()
         assert messages[0].timestamp.year == 2023
+
+
+def test_send_returns_timestamp():
+    cli = SignalCli(account=ACCOUNT)
+    with patch("signal_bot.signal_cli.subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(returncode=0, stdout="1700000000123\n")
+        assert cli.send("+449999999999", "Hello!") == 1700000000123
+        mock_run.return_value = MagicMock(returncode=0, stdout="")
+        assert cli.send("+449999999999", "Hello!") is None
+
+
+def test_send_edit():
+    cli = SignalCli(account=ACCOUNT)
+    with patch("signal_bot.signal_cli.subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(returncode=0, stdout="1700000000999\n")
+        cli.send("+449999999999", "Hello again", edit_timestamp=1700000000123)
+        assert mock_run.call_args.args[0] == [
+            "signal-cli", "-a", ACCOUNT, "send", "-m", "Hello again",
+            "--edit-timestamp", "1700000000123", "+449999999999",
+        ]
+
+
+def test_send_typing():
+    cli = SignalCli(account=ACCOUNT)
+    with patch("signal_bot.signal_cli.subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(returncode=0)
+        cli.send_typing("+449999999999")
+        assert mock_run.call_args.args[0] == ["signal-cli", "-a", ACCOUNT, "sendTyping", "+449999999999"]
+        cli.send_typing("+449999999999", stop=True)
+        assert mock_run.call_args.args[0] == ["signal-cli", "-a", ACCOUNT, "sendTyping", "--stop", "+449999999999"]
@@ -1,5 +1,8 @@
+import asyncio
 import json
-from io import BytesIO
+import queue
+import threading
+import time
 from unittest.mock import patch, MagicMock
 from signal_bot.signal_cli_jsonrpc import SignalCliJsonRpc
 from signal_bot.message import Direction
@@ -22,22 +25,49 @@ def make_envelope(source, timestamp_ms, message):
     }
 
 
+class FakeSocket:
+    """Stands in for a daemon connection, answering each request with the matching id."""
+
+    def __init__(self, responder):
+        self._responder = responder
+        self._incoming = queue.Queue()
+        self.sent = []
+        self.closed = False
+
+    def sendall(self, data):
+        if self.closed:
+            raise BrokenPipeError("socket closed")
+        for line in data.decode().splitlines():
+            request = json.loads(line)
+            self.sent.append(request)
+            response = self._responder(request)
+            if response is not None:
+                self.push({"jsonrpc": "2.0", "id": request["id"], **response})
+
+    def push(self, message):
+        self._incoming.put((json.dumps(message) + "\n").encode())
+
+    def recv(self, size):
+        return self._incoming.get()
+
+    def shutdown(self, how):
+        self._incoming.put(b"")
+
+    def close(self):
+        self.closed = True
+        self._incoming.put(b"")
+
+
 def mock_socket(response: dict):
-    payload = (json.dumps(response) + "\n").encode()
-    sock = MagicMock()
-    sock.__enter__ = lambda s: s
-    sock.__exit__ = MagicMock(return_value=False)
-    sock.recv.side_effect = [payload, b""]
-    return sock
+    return FakeSocket(lambda request: response)
 
 
 def test_send_calls_jsonrpc(monkeypatch):
     cli = SignalCliJsonRpc(account=ACCOUNT, host="localhost", port=7583)
-    sock = mock_socket({"jsonrpc": "2.0", "result": None, "id": 1})
+    sock = mock_socket({"result": None})
     with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
         cli.send("+449999999999", "Hello!")
-    sent = sock.sendall.call_args[0][0].decode()
-    data = json.loads(sent.strip())
+    data = sock.sent[0]
     assert data["method"] == "send"
     assert data["params"]["recipient"] == ["+449999999999"]
     assert data["params"]["message"] == "Hello!"
@@ -47,7 +77,7 @@ def test_send_calls_jsonrpc(monkeypatch):
 def test_receive_parses_messages():
     cli = SignalCliJsonRpc(account=ACCOUNT)
     envelope = make_envelope("+449999999999", 1700000000000, "Hello bot!")
-    sock = mock_socket({"jsonrpc": "2.0", "result": [envelope], "id": 2})
+    sock = mock_socket({"result": [envelope]})
     with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
         messages = cli.receive()
     assert len(messages) == 1
@@ -64,7 +94,7 @@ def test_receive_multiple_messages():
         make_envelope("+440001111111", 1700000000000, "First"),
         make_envelope("+440002222222", 1700000001000, "Second"),
     ]
-    sock = mock_socket({"jsonrpc": "2.0", "result": envelopes, "id": 2})
+    sock = mock_socket({"result": envelopes})
     with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
         messages = cli.receive()
     assert len(messages) == 2
@@ -74,7 +104,7 @@ def test_receive_multiple_messages():
 
 def test_receive_empty_result():
     cli = SignalCliJsonRpc(account=ACCOUNT)
-    sock = mock_socket({"jsonrpc": "2.0", "result": [], "id": 2})
+    sock = mock_socket({"result": []})
     with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
         messages = cli.receive()
     assert messages == []
@@ -84,7 +114,7 @@ def test_receive_skips_non_data_envelopes():
     cli = SignalCliJsonRpc(account=ACCOUNT)
     receipt = {"envelope": {"source": "+449999999999", "timestamp": 1700000000000, "receiptMessage": {"type": "DELIVERY"}}}
     data = make_envelope("+449999999999", 1700000001000, "Real message")
-    sock = mock_socket({"jsonrpc": "2.0", "result": [receipt, data], "id": 2})
+    sock = mock_socket({"result": [receipt, data]})
     with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
         messages = cli.receive()
     assert len(messages) == 1
@@ -94,7 +124,7 @@ def test_receive_skips_non_data_envelopes():
 def test_receive_skips_null_message_body():
     cli = SignalCliJsonRpc(account=ACCOUNT)
     envelope = make_envelope("+449999999999", 1700000000000, None)
-    sock = mock_socket({"jsonrpc": "2.0", "result": [envelope], "id": 2})
+    sock = mock_socket({"result": [envelope]})
     with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
         messages = cli.receive()
     assert messages == []
@@ -103,7 +133,7 @@ def test_receive_skips_null_message_body():
 def test_receive_sets_timestamp_from_envelope():
     cli = SignalCliJsonRpc(account=ACCOUNT)
     envelope = make_envelope("+449999999999", 1700000000000, "Timed")
-    sock = mock_socket({"jsonrpc": "2.0", "result": [envelope], "id": 2})
+    sock = mock_socket({"result": [envelope]})
     with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
         messages = cli.receive()
     assert messages[0].timestamp.year == 2023
@@ -111,10 +141,272 @@ def test_receive_sets_timestamp_from_envelope():
 
 def test_jsonrpc_error_raises():
     cli = SignalCliJsonRpc(account=ACCOUNT)
-    sock = mock_socket({"jsonrpc": "2.0", "error": {"code": -1, "message": "bad"}, "id": 1})
+    sock = mock_socket({"error": {"code": -1, "message": "bad"}})
     with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
         try:
             cli.send("+449999999999", "Hello!")
             assert False, "expected RuntimeError"
         except RuntimeError as e:
             assert "JSON-RPC error" in str(e)
+
+
+def test_connection_reused_across_calls():
+    cli = SignalCliJsonRpc(account=ACCOUNT)
+    sock = mock_socket({"result": None})
+    with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock) as mock_connect:
+        cli.send("+449999999999", "One")
+        cli.send("+449999999999", "Two")
+        cli.receive()
+    assert mock_connect.call_count == 1
+    assert [r["method"] for r in sock.sent] == ["send", "send", "receive"]
+
+
+def test_responses_matched_by_id_out_of_order():
+    held = []
+
+    def responder(request):
+        held.append(request)
+        if len(held) < 2:
+            return None
+        # Answer the second request first, then the first.
+        for r in reversed(held):
+            sock.push({"jsonrpc": "2.0", "id": r["id"], "result": {"echo": r["params"]["message"]}})
+        return None
+
+    sock = FakeSocket(responder)
+    cli = SignalCliJsonRpc(account=ACCOUNT)
+    with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
+        first = cli._submit("send", {"message": "first"})
+        second = cli._submit("send", {"message": "second"})
+        assert first.result(timeout=1)["result"] == {"echo": "first"}
+        assert second.result(timeout=1)["result"] == {"echo": "second"}
+
+
+def test_concurrent_requests_in_flight():
+    sock = mock_socket({"result": None})
+    cli = SignalCliJsonRpc(account=ACCOUNT)
+    with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
+        threads = [threading.Thread(target=cli.send, args=("+449999999999", f"msg {i}")) for i in range(10)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=2)
+    assert len(sock.sent) == 10
+    assert len({r["id"] for r in sock.sent}) == 10
+
+
+def test_reconnects_after_daemon_restart():
+    old = mock_socket({"result": None})
+    new = mock_socket({"result": None})
+    cli = SignalCliJsonRpc(account=ACCOUNT)
+    with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", side_effect=[old, new]):
+        cli.send("+449999999999", "Before")
+        old.close()
+        deadline = time.monotonic() + 1
+        while not cli._conn.closed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        cli.send("+449999999999", "After")
+    assert old.sent[0]["params"]["message"] == "Before"
+    assert new.sent[0]["params"]["message"] == "After"
+
+
+def test_pending_request_fails_when_connection_drops():
+    sock = FakeSocket(lambda request: None)
+    cli = SignalCliJsonRpc(account=ACCOUNT)
+    with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
+        future = cli._submit("send", {"message": "lost"})
+        sock.close()
+        try:
+            future.result(timeout=1)
+            assert False, "expected ConnectionError"
+        except ConnectionError:
+            pass
+
+
+def test_blocked_write_does_not_stall_reader():
+    futures = []
+    resolved = []
+
+    class FullBufferSocket(FakeSocket):
+        def sendall(self, data):
+            if json.loads(data)["params"].get("message") == "second":
+                # Like a full pipe: this write only completes once the reader has taken the first response.
+                resolved.append(futures[0].exception(timeout=2) is None)
+            super().sendall(data)
+
+    sock = FullBufferSocket(lambda request: {"result": None})
+    cli = SignalCliJsonRpc(account=ACCOUNT)
+    with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
+        futures.append(cli._submit("send", {"message": "first"}))
+        cli._submit("send", {"message": "second"}).result(timeout=2)
+    assert resolved == [True]
+
+
+def test_push_mode_subscribes_on_connect():
+    sock = mock_socket({"result": 0})
+    cli = SignalCliJsonRpc(account=ACCOUNT, push=True)
+    with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
+        assert cli.receive() == []
+    assert sock.sent[0]["method"] == "subscribeReceive"
+    assert sock.sent[0]["params"]["account"] == ACCOUNT
+
+
+def test_push_mode_delivers_notifications():
+    sock = mock_socket({"result": 0})
+    cli = SignalCliJsonRpc(account=ACCOUNT, push=True)
+    with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
+        cli.receive()
+        sock.push({"jsonrpc": "2.0", "method": "receive", "params": make_envelope("+449999999999", 1700000000000, "Pushed")})
+        messages = cli.receive(timeout=1)
+    assert len(messages) == 1
+    assert messages[0].body == "Pushed"
+    assert messages[0].sender == "+449999999999"
+    assert [r["method"] for r in sock.sent] == ["subscribeReceive"]
+
+
+def test_push_mode_accepts_subscription_notifications():
+    sock = mock_socket({"result": 0})
+    cli = SignalCliJsonRpc(account=ACCOUNT, push=True)
+    with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
+        cli.receive()
+        envelope = make_envelope("+449999999999", 1700000000000, "Subscribed")
+        sock.push({"jsonrpc": "2.0", "method": "receive", "params": {"subscription": 0, "result": envelope}})
+        messages = cli.receive(timeout=1)
+    assert [m.body for m in messages] == ["Subscribed"]
+
+
+def test_push_mode_tolerates_rejected_subscription():
+    sock = mock_socket({"error": {"code": -32601, "message": "already receiving"}})
+    cli = SignalCliJsonRpc(account=ACCOUNT, push=True)
+    with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
+        cli.receive()
+        sock.push({"jsonrpc": "2.0", "method": "receive", "params": make_envelope("+449999999999", 1700000000000, "Auto")})
+        messages = cli.receive(timeout=1)
+    assert [m.body for m in messages] == ["Auto"]
+
+
+def test_push_mode_skips_non_data_notifications():
+    sock = mock_socket({"result": 0})
+    cli = SignalCliJsonRpc(account=ACCOUNT, push=True)
+    with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
+        cli.receive()
+        receipt = {"envelope": {"source": "+449999999999", "timestamp": 1700000000000, "receiptMessage": {"type": "DELIVERY"}}}
+        sock.push({"jsonrpc": "2.0", "method": "receive", "params": receipt})
+        messages = cli.receive(timeout=0.2)
+    assert messages == []
+
+
+def test_send_async_awaits_response():
+    sock = mock_socket({"result": None})
+    cli = SignalCliJsonRpc(account=ACCOUNT)
+    with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
+        asyncio.run(cli.send_async("+449999999999", "Async hello"))
+    assert sock.sent[0]["method"] == "send"
+    assert sock.sent[0]["params"]["message"] == "Async hello"
+
+
+def test_receive_async_polls_when_not_pushing():
+    envelope = make_envelope("+449999999999", 1700000000000, "Polled")
+    sock = mock_socket({"result": [envelope]})
+    cli = SignalCliJsonRpc(account=ACCOUNT)
+    with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
+        messages = asyncio.run(cli.receive_async())
+    assert [m.body for m in messages] == ["Polled"]
+
+
+def test_async_error_raises():
+    sock = mock_socket({"error": {"code": -1, "message": "bad"}})
+    cli = SignalCliJsonRpc(account=ACCOUNT)
+    with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
+        try:
+            asyncio.run(cli.send_async("+449999999999", "Hello!"))
+            assert False, "expected RuntimeError"
+        except RuntimeError as e:
+            assert "JSON-RPC error" in str(e)
+
+
+def test_send_returns_timestamp_and_edits():
+    sock = mock_socket({"result": {"timestamp": 1700000000123, "results": []}})
+    cli = SignalCliJsonRpc(account=ACCOUNT)
+    with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
+        assert cli.send("+449999999999", "Hello") == 1700000000123
+        assert asyncio.run(cli.send_async("+449999999999", "Hello there", edit_timestamp=1700000000123)) == 1700000000123
+    assert "editTimestamp" not in sock.sent[0]["params"]
+    assert sock.sent[1]["params"]["editTimestamp"] == 1700000000123
+
+
+def test_send_typing():
+    sock = mock_socket({"result": {"timestamp": 1700000000123, "results": []}})
+    cli = SignalCliJsonRpc(account=ACCOUNT)
+    with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
+        cli.send_typing("+449999999999")
+        asyncio.run(cli.send_typing_async("+449999999999", stop=True))
+    assert [r["method"] for r in sock.sent] == ["sendTyping", "sendTyping"]
+    assert sock.sent[0]["params"] == {"account": ACCOUNT, "recipient": ["+449999999999"], "stop": False}
+    assert sock.sent[1]["params"]["stop"] is True
+
+
+class HeldSocket(FakeSocket):
+    """Answers "hold" requests only when release() is called, like a slow daemon."""
+
+    def __init__(self):
+        super().__init__(self._respond)
+        self.held = []
+
+    def _respond(self, request):
+        if request["params"].get("message") == "hold":
+            self.held.append(request["id"])
+            return None
+        return {"result": {"timestamp": 1}}
+
+    def release(self):
+        for request_id in self.held:
+            self.push({"jsonrpc": "2.0", "id": request_id, "result": {"timestamp": 1}})
+        self.held = []
+
+
+def test_late_response_after_timeout_keeps_connection_working():
+    sock = HeldSocket()
+    cli = SignalCliJsonRpc(account=ACCOUNT, timeout=0.05)
+    with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
+        try:
+            cli.send("+449999999999", "hold")
+            assert False, "expected TimeoutError"
+        except TimeoutError:
+            pass
+        conn = cli._conn
+        assert conn._pending == {}
+        sock.release()
+        assert cli.send("+449999999999", "next") == 1
+    assert conn._reader.is_alive() and not conn.closed
+
+
+def test_late_response_after_cancelled_async_call():
+    sock = HeldSocket()
+    cli = SignalCliJsonRpc(account=ACCOUNT)
+
+    async def main():
+        task = asyncio.create_task(cli.send_async("+449999999999", "hold"))
+        while not sock.held:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        sock.release()
+        return await cli.send_async("+449999999999", "next")
+
+    with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock):
+        assert asyncio.run(asyncio.wait_for(main(), timeout=2)) == 1
+    assert cli._conn._pending == {}
+    assert cli._conn._reader.is_alive()
+
+
+def test_reader_failure_closes_connection():
+    sock = mock_socket({"result": None})
+    cli = SignalCliJsonRpc(account=ACCOUNT)
+    with patch("signal_bot.signal_cli_jsonrpc.socket.create_connection", return_value=sock), \
+         patch.object(cli, "_handle_notification", side_effect=RuntimeError("boom")):
+        cli.send("+449999999999", "Hello")
+        conn = cli._conn
+        sock.push({"jsonrpc": "2.0", "method": "receive", "params": {}})
+        conn._reader.join(timeout=1)
+    assert conn.closed
@@ -0,0 +1,122 @@
+import json
+import queue
+import time
+from unittest.mock import patch
+from signal_bot.signal_cli_stdio import SignalCliStdio
+
+
+ACCOUNT = "+447786000000"
+
+
+class FakeStdin:
+    def __init__(self, proc):
+        self._proc = proc
+
+    def write(self, data):
+        if self._proc.returncode is not None:
+            raise BrokenPipeError("process exited")
+        for line in data.decode().splitlines():
+            request = json.loads(line)
+            self._proc.sent.append(request)
+            self._proc.push({"jsonrpc": "2.0", "id": request["id"], "result": None})
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeStdout:
+    def __init__(self):
+        self.lines = queue.Queue()
+
+    def read1(self, size):
+        return self.lines.get()
+
+    def close(self):
+        pass
+
+
+class FakeProcess:
+    """Stands in for a ``signal-cli jsonRpc`` child that answers every request."""
+
+    def __init__(self):
+        self.sent = []
+        self.returncode = None
+        self.stdin = FakeStdin(self)
+        self.stdout = FakeStdout()
+
+    def push(self, message):
+        self.stdout.lines.put((json.dumps(message) + "\n").encode())
+
+    def poll(self):
+        return self.returncode
+
+    def terminate(self):
+        self.exit()
+
+    def exit(self):
+        self.returncode = 0
+        self.stdout.lines.put(b"")
+
+    def wait(self, timeout=None):
+        return self.returncode
+
+    def kill(self):
+        self.exit()
+
+
+def wait_until_closed(cli):
+    deadline = time.monotonic() + 1
+    while not cli._conn.closed and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_starts_jsonrpc_process_once():
+    proc = FakeProcess()
+    cli = SignalCliStdio(account=ACCOUNT)
+    with patch("signal_bot.signal_cli_stdio.subprocess.Popen", return_value=proc) as mock_popen:
+        cli.send("+449999999999", "One")
+        cli.send("+449999999999", "Two")
+    assert mock_popen.call_count == 1
+    assert mock_popen.call_args[0][0] == ["signal-cli", "-a", ACCOUNT, "jsonRpc", "--receive-mode=manual"]
+    assert [r["params"]["message"] for r in proc.sent] == ["One", "Two"]
+
+
+def test_uses_custom_cli_path():
+    proc = FakeProcess()
+    cli = SignalCliStdio(account=ACCOUNT, cli_path="flatpak run org.asamk.SignalCli")
+    with patch("signal_bot.signal_cli_stdio.subprocess.Popen", return_value=proc) as mock_popen:
+        cli.send("+449999999999", "Hi!")
+    assert mock_popen.call_args[0][0][:3] == ["flatpak", "run", "org.asamk.SignalCli"]
+
+
+def test_push_mode_subscribes_to_a_manual_receive_process():
+    proc = FakeProcess()
+    cli = SignalCliStdio(account=ACCOUNT, push=True)
+    with patch("signal_bot.signal_cli_stdio.subprocess.Popen", return_value=proc) as mock_popen:
+        cli.receive()
+    assert "--receive-mode=manual" in mock_popen.call_args[0][0]
+    assert [r["method"] for r in proc.sent] == ["subscribeReceive"]
+
+
+def test_restarts_process_after_exit():
+    first, second = FakeProcess(), FakeProcess()
+    cli = SignalCliStdio(account=ACCOUNT)
+    with patch("signal_bot.signal_cli_stdio.subprocess.Popen", side_effect=[first, second]) as mock_popen:
+        cli.send("+449999999999", "Before")
+        first.exit()
+        wait_until_closed(cli)
+        cli.send("+449999999999", "After")
+    assert mock_popen.call_count == 2
+    assert second.sent[0]["params"]["message"] == "After"
+
+
+def test_close_terminates_process():
+    proc = FakeProcess()
+    cli = SignalCliStdio(account=ACCOUNT)
+    with patch("signal_bot.signal_cli_stdio.subprocess.Popen", return_value=proc):
+        cli.send("+449999999999", "Hi!")
+        cli.close()
+    assert proc.returncode is not None
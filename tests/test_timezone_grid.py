@@ -0,0 +1,60 @@
+import pytest
+from timezonefinder import TimezoneFinder
+from unittest.mock import MagicMock
+
+from signal_bot.apps.timezone_grid import TimezoneGrid
+
+_finder = TimezoneFinder(in_memory=False)
+
+
+def test_matches_exact_lookup():
+    grid = TimezoneGrid(lambda: _finder)
+    for lat, lng in [(51.5, -0.12), (40.71, -74.0), (35.68, 139.69), (42.03, -8.64), (0.0, -30.0)]:
+        assert grid.timezone_at(lat, lng) == _finder.timezone_at(lat=lat, lng=lng)
+
+
+def test_uniform_cell_answers_from_grid():
+    finder = MagicMock(wraps=_finder)
+    grid = TimezoneGrid(lambda: finder)
+    assert grid.timezone_at(52.02, 10.02) == "Europe/Berlin"
+    finder.reset_mock()
+    assert grid.timezone_at(52.07, 10.07) == "Europe/Berlin"
+    finder.timezone_at.assert_not_called()
+    finder.unique_timezone_at.assert_not_called()
+
+
+def test_border_cell_uses_exact_lookup():
+    # Tui (Spain) and Valença (Portugal) sit either side of the Minho, an hour apart.
+    finder = MagicMock(wraps=_finder)
+    grid = TimezoneGrid(lambda: finder)
+    assert grid.timezone_at(42.047, -8.645) == "Europe/Madrid"
+    assert grid.timezone_at(42.030, -8.633) == "Europe/Lisbon"
+    assert finder.timezone_at.call_count == 2
+
+
+def test_grid_persists(tmp_path):
+    path = tmp_path / "tz_grid.bin"
+    grid = TimezoneGrid(lambda: _finder, path)
+    grid.timezone_at(52.0, 10.0)
+    grid.close()
+    finder = MagicMock()
+    restarted = TimezoneGrid(lambda: finder, path)
+    assert restarted.timezone_at(52.0, 10.0) == "Europe/Berlin"
+    finder.unique_timezone_at.assert_not_called()
+    restarted.close()
+
+
+def test_grid_without_zone_names_is_rebuilt(tmp_path):
+    path = tmp_path / "tz_grid.bin"
+    grid = TimezoneGrid(lambda: _finder, path)
+    grid.timezone_at(52.0, 10.0)
+    grid.close()
+    (tmp_path / "tz_grid.json").unlink()
+    restarted = TimezoneGrid(lambda: _finder, path)
+    assert restarted.timezone_at(52.0, 10.0) == "Europe/Berlin"
+    restarted.close()
+
+
+def test_rejects_coarse_step():
+    with pytest.raises(ValueError):
+        TimezoneGrid(lambda: _finder, step=1.0)
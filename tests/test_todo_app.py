@@ -0,0 +1,323 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from signal_bot.apps.todo_app import TodoApp
+
+SENDER = "+440000000000"
+
+
+def _run(app, args):
+    return list(app.handle(args, sender=SENDER))[0]
+
+
+def _todo_path(tmp_path):
+    return tmp_path / "todo" / "440000000000.json"
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def app(request, tmp_path):
+    app = TodoApp(data_dir=tmp_path, storage=request.param)
+    yield app
+    app.close()
+
+
+def test_add_and_list(tmp_path):
+    app = TodoApp(data_dir=tmp_path)
+    assert _run(app, "add (A) Buy milk +home @shop") == "Added: Buy milk +home @shop"
+    assert _run(app, "list") == "1. [ ] (A) Buy milk +home @shop"
+    assert json.loads(_todo_path(tmp_path).read_text())[0]["projects"] == ["home"]
+
+
+def test_list_is_ordered_by_priority(app):
+    _run(app, "add no priority")
+    _run(app, "add (B) second")
+    _run(app, "add (A) first")
+    _run(app, "add also none")
+    assert _run(app, "list") == "1. [ ] (A) first\n2. [ ] (B) second\n3. [ ] no priority\n4. [ ] also none"
+
+
+def test_list_filters_keep_numbers(app):
+    _run(app, "add (A) Call mum @phone")
+    _run(app, "add Fix tap +house")
+    _run(app, "add Paint fence +house @garden")
+    assert _run(app, "list +house") == "2. [ ] Fix tap +house\n3. [ ] Paint fence +house @garden"
+    assert _run(app, "list @phone") == "1. [ ] (A) Call mum @phone"
+    assert _run(app, "list +nothing") == "No todos yet. Use 'add <task>' to create one."
+
+
+def test_done_undo_remove_and_report(app):
+    _run(app, "add one +p @c")
+    _run(app, "add two +p")
+    assert _run(app, "done 2") == "Completed: two +p"
+    assert _run(app, "report") == "1 open, 1 completed"
+    assert _run(app, "undo 1") == "Not marked as done."
+    assert _run(app, "undo 2") == "Undone: two +p"
+    assert _run(app, "done 3") == "Invalid todo number."
+    assert _run(app, "projects") == "Projects:\n  +p (2)"
+    assert _run(app, "contexts") == "Contexts:\n  @c (1)"
+    assert _run(app, "remove 1") == "Removed: one +p @c"
+    assert _run(app, "list") == "1. [ ] two +p"
+    assert _run(app, "contexts") == "No contexts found."
+    assert _run(app, "clear") == "All todos cleared."
+    assert _run(app, "report") == "0 open, 0 completed"
+    assert _run(app, "archive") == "Recently archived:\n[ ] two +p\n[ ] one +p @c"
+
+
+def test_sqlite_imports_json_list(tmp_path):
+    json_app = TodoApp(data_dir=tmp_path)
+    _run(json_app, "add plain")
+    _run(json_app, "add (A) urgent +work")
+    _run(json_app, "done 2")
+    sqlite_app = TodoApp(data_dir=tmp_path, storage="sqlite")
+    assert _run(sqlite_app, "list") == "1. [ ] (A) urgent +work\n2. [✓] plain"
+    assert _run(sqlite_app, "projects") == "Projects:\n  +work (1)"
+    assert not _todo_path(tmp_path).exists()
+    assert (tmp_path / "todo" / "440000000000.json.migrated").exists()
+    sqlite_app.close()
+
+
+def test_sqlite_uses_wal(tmp_path):
+    app = TodoApp(data_dir=tmp_path, storage="sqlite")
+    assert app.store._db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    app.close()
+
+
+def test_unknown_storage_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        TodoApp(data_dir=tmp_path, storage="csv")
+
+
+def test_file_not_reread_when_unchanged(tmp_path):
+    app = TodoApp(data_dir=tmp_path)
+    _run(app, "add Buy milk")
+    with patch("signal_bot.apps.todo_app.json.loads") as mock_loads:
+        _run(app, "list")
+    mock_loads.assert_not_called()
+
+
+def test_external_change_is_reloaded(tmp_path):
+    app = TodoApp(data_dir=tmp_path)
+    _run(app, "add Buy milk")
+    path = _todo_path(tmp_path)
+    path.write_text(json.dumps([{"task": "Edited elsewhere", "done": False, "priority": None}]))
+    assert _run(app, "list") == "1. [ ] Edited elsewhere"
+
+
+def test_write_behind_coalesces_writes(tmp_path):
+    app = TodoApp(data_dir=tmp_path, write_delay=60)
+    with patch.object(app.store, "_write", wraps=app.store._write) as mock_write:
+        _run(app, "add one")
+        _run(app, "add two")
+        _run(app, "done 1")
+        assert not _todo_path(tmp_path).exists()
+        assert _run(app, "list") == "1. [✓] one\n2. [ ] two"
+        app.close()
+    mock_write.assert_called_once()
+    assert [t["task"] for t in json.loads(_todo_path(tmp_path).read_text())] == ["one", "two"]
+
+
+def test_write_behind_flushes_after_delay(tmp_path):
+    app = TodoApp(data_dir=tmp_path, write_delay=0.01)
+    _run(app, "add one")
+    app.store._timer.join()
+    assert json.loads(_todo_path(tmp_path).read_text())[0]["task"] == "one"
+
+
+def test_stored_items_only_change_through_update(tmp_path):
+    app = TodoApp(data_dir=tmp_path, write_delay=60)
+    _run(app, "add one")
+    item = app.store.item_at("440000000000", 1)
+    item["completed_at"] = "2025-01-01"
+    assert "completed_at" not in app.store.item_at("440000000000", 1)
+    item["done"] = True
+    app.store.update("440000000000", [item])
+    assert app.store.item_at("440000000000", 1)["completed_at"] == "2025-01-01"
+    app.close()
+
+
+def test_write_behind_while_marking_done(tmp_path):
+    app = TodoApp(data_dir=tmp_path, write_delay=0.001)
+    _run(app, "add one")
+    for _ in range(200):
+        _run(app, "done 1")
+        _run(app, "undo 1")
+    app.close()
+    assert json.loads(_todo_path(tmp_path).read_text())[0]["done"] is False
+
+
+def test_write_is_atomic(tmp_path):
+    app = TodoApp(data_dir=tmp_path)
+    _run(app, "add one")
+    with patch("signal_bot.apps.todo_app.os.replace", side_effect=OSError("disk full")):
+        with pytest.raises(OSError):
+            _run(app, "add two")
+    assert [t["task"] for t in json.loads(_todo_path(tmp_path).read_text())] == ["one"]
+
+
+def test_bot_close_flushes_todos(tmp_path):
+    from signal_bot.bot import Bot
+    bot = Bot(account="+449999999999", log_dir=tmp_path / "logs", backend=MagicMock())
+    app = TodoApp(data_dir=tmp_path, write_delay=60)
+    bot.register_app(app)
+    _run(app, "add one")
+    bot.close()
+    assert _todo_path(tmp_path).exists()
+
+
+def _archive_path(tmp_path):
+    return tmp_path / "todo" / "440000000000-archive.jsonl"
+
+
+def test_remove_appends_to_archive(tmp_path):
+    app = TodoApp(data_dir=tmp_path)
+    _run(app, "add one")
+    _run(app, "add two")
+    _run(app, "remove 1")
+    _run(app, "clear")
+    lines = _archive_path(tmp_path).read_text().splitlines()
+    assert [json.loads(line)["task"] for line in lines] == ["one", "two"]
+    assert all("archived_at" in json.loads(line) for line in lines)
+
+
+def test_legacy_archive_migrated(tmp_path):
+    legacy = tmp_path / "todo" / "440000000000-archive.json"
+    legacy.parent.mkdir(parents=True)
+    legacy.write_text(json.dumps([{"task": "old", "done": True}]))
+    app = TodoApp(data_dir=tmp_path)
+    _run(app, "add new")
+    _run(app, "remove 1")
+    assert not legacy.exists()
+    lines = _archive_path(tmp_path).read_text().splitlines()
+    assert [json.loads(line)["task"] for line in lines] == ["old", "new"]
+
+
+def test_archive_command_shows_most_recent_first(tmp_path):
+    app = TodoApp(data_dir=tmp_path)
+    assert _run(app, "archive") == "Archive is empty."
+    for task in ("one", "two"):
+        _run(app, f"add {task}")
+        _run(app, "done 1")
+        _run(app, "remove 1")
+    assert _run(app, "archive") == "Recently archived:\n[✓] two\n[✓] one"
+
+
+def test_todos_get_stable_ids(tmp_path):
+    app = TodoApp(data_dir=tmp_path)
+    _run(app, "add one")
+    _run(app, "add (A) two")
+    _run(app, "remove 2")
+    _run(app, "add three")
+    assert [t["id"] for t in json.loads(_todo_path(tmp_path).read_text())] == [2, 3]
+
+
+def test_legacy_list_gets_ids_in_file_order(tmp_path):
+    path = _todo_path(tmp_path)
+    path.parent.mkdir(parents=True)
+    path.write_text(json.dumps([{"task": "b", "done": False, "priority": "B"}, {"task": "a", "done": False, "priority": "A"}]))
+    app = TodoApp(data_dir=tmp_path)
+    assert _run(app, "done 1") == "Completed: a"
+    assert [t["id"] for t in json.loads(path.read_text())] == [1, 2]
+
+
+def test_order_maintained_without_sorting(tmp_path):
+    app = TodoApp(data_dir=tmp_path)
+    _run(app, "add (C) c")
+    _run(app, "add none")
+    with patch("signal_bot.apps.todo_store.sorted") as mock_sorted:
+        _run(app, "add (A) a")
+        _run(app, "add (C) c2")
+        assert _run(app, "list") == "1. [ ] (A) a\n2. [ ] (C) c\n3. [ ] (C) c2\n4. [ ] none"
+        _run(app, "remove 2")
+        assert _run(app, "list") == "1. [ ] (A) a\n2. [ ] (C) c2\n3. [ ] none"
+    mock_sorted.assert_not_called()
+
+
+def test_numbers_from_last_list_stay_valid(app):
+    for task in ("one", "two", "three", "four"):
+        _run(app, f"add {task}")
+    _run(app, "list")
+    assert _run(app, "remove 1") == "Removed: one"
+    assert _run(app, "remove 3") == "Removed: three"
+    assert _run(app, "remove 1") == "Invalid todo number."
+    assert _run(app, "done 4") == "Completed: four"
+    assert _run(app, "list") == "1. [ ] two\n2. [✓] four"
+    assert _run(app, "done 1") == "Completed: two"
+
+
+def test_parse_numbers():
+    assert TodoApp._parse_numbers("3") == [3]
+    assert TodoApp._parse_numbers("1,3,5-8") == [1, 3, 5, 6, 7, 8]
+    assert TodoApp._parse_numbers("2 1, 2") == [2, 1]
+    assert TodoApp._parse_numbers("5-3") is None
+    assert TodoApp._parse_numbers("a") is None
+    assert TodoApp._parse_numbers("1-99999") is None
+    assert TodoApp._parse_numbers("") is None
+
+
+def test_add_several_lines(app):
+    assert _run(app, "add one\n(A) two +p\n\nthree") == "Added: one\nAdded: two +p\nAdded: three"
+    assert _run(app, "list") == "1. [ ] (A) two +p\n2. [ ] one\n3. [ ] three"
+
+
+def test_bulk_done_undo_remove(app):
+    _run(app, "add " + "\n".join(f"task {i}" for i in range(1, 9)))
+    assert _run(app, "done 1,3,5-6,12") == (
+        "Completed: task 1\nCompleted: task 3\nCompleted: task 5\nCompleted: task 6\nInvalid todo number: 12"
+    )
+    assert _run(app, "report") == "4 open, 4 completed"
+    assert _run(app, "undo 1-2") == "Undone: task 1\nNot marked as done: task 2"
+    assert _run(app, "remove 2-4,9,10") == (
+        "Removed: task 2\nRemoved: task 3\nRemoved: task 4\nInvalid todo numbers: 9, 10"
+    )
+    assert _run(app, "list") == "1. [ ] task 1\n2. [✓] task 5\n3. [✓] task 6\n4. [ ] task 7\n5. [ ] task 8"
+    assert _run(app, "done x") == "Invalid todo number."
+
+
+def test_bulk_command_persists_once(tmp_path):
+    app = TodoApp(data_dir=tmp_path)
+    _run(app, "add a\nb\nc")
+    _run(app, "list")
+    with patch.object(app.store, "_write", wraps=app.store._write) as mock_write:
+        _run(app, "remove 1-3")
+    mock_write.assert_called_once()
+    assert json.loads(_todo_path(tmp_path).read_text()) == []
+    assert len(_archive_path(tmp_path).read_text().splitlines()) == 3
+
+
+def test_add_and_import_parse_lines_alike(tmp_path):
+    lines = "(a) foo +p @c\n(A)bar\nx 2024-01-02 done thing"
+    added, imported = TodoApp(data_dir=tmp_path / "a"), TodoApp(data_dir=tmp_path / "i")
+    _run(added, "add " + lines)
+    _run(imported, "import " + lines)
+    assert _run(added, "list") == _run(imported, "list") == "1. [ ] (A) foo +p @c\n2. [ ] (A)bar\n3. [✓] done thing"
+
+
+def test_export_writes_todo_txt(app, tmp_path):
+    _run(app, "add (A) Call mum +family\nPay rent")
+    _run(app, "done 2")
+    assert _run(app, "export") == "Exported 2 todos to 440000000000.txt."
+    lines = (tmp_path / "todo" / "440000000000.txt").read_text().splitlines()
+    assert lines[0].startswith("(A) ") and lines[0].endswith(" Call mum +family")
+    assert lines[1].startswith("x ") and lines[1].endswith(" Pay rent")
+
+
+def test_import_lines_from_message(app):
+    assert _run(app, "import (B) Fix tap +house\nx 2024-01-02 Old thing\n\n") == "Imported 2 todos."
+    assert _run(app, "list") == "1. [ ] (B) Fix tap +house\n2. [✓] Old thing"
+    assert _run(app, "projects") == "Projects:\n  +house (1)"
+
+
+def test_import_file_in_batches(app, tmp_path):
+    path = tmp_path / "todo" / "440000000000.txt"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(f"task {i} @c{i % 2}\n" for i in range(2500)))
+    with patch.object(app.store, "add", wraps=app.store.add) as mock_add:
+        assert _run(app, "import") == "Imported 2500 todos."
+    assert [len(call.args[1]) for call in mock_add.call_args_list] == [1000, 1000, 500]
+    assert _run(app, "report") == "2500 open, 0 completed"
+
+
+def test_import_without_file(app):
+    assert _run(app, "import").startswith("Nothing to import")
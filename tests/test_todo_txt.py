@@ -0,0 +1,54 @@
+from signal_bot.apps.todo_txt import format_item, parse_line, parse_lines
+
+
+def test_parse_open_task():
+    item = parse_line("(A) 2024-01-02 Call mum +family @phone due:2024-01-05")
+    assert item == {
+        "task": "Call mum +family @phone due:2024-01-05",
+        "done": False,
+        "priority": "A",
+        "projects": ["family"],
+        "contexts": ["phone"],
+        "created_at": "2024-01-02",
+    }
+
+
+def test_parse_completed_task():
+    item = parse_line("x 2024-01-03 2024-01-01 Pay rent pri:B")
+    assert item["done"] is True
+    assert item["completed_at"] == "2024-01-03"
+    assert item["created_at"] == "2024-01-01"
+    assert item["priority"] == "B"
+    assert item["task"] == "Pay rent"
+
+
+def test_parse_plain_and_blank_lines():
+    assert parse_line("   ") is None
+    item = parse_line("email a+b about x@y")
+    assert item["task"] == "email a+b about x@y"
+    assert item["priority"] is None
+    assert item["projects"] == [] and item["contexts"] == []
+
+
+def test_lowercase_priority_is_accepted():
+    assert parse_line("(a) lower")["priority"] == "A"
+    assert parse_line("(A)glued")["priority"] is None
+
+
+def test_format_round_trips():
+    for line in (
+        "(A) 2024-01-02 Call mum +family @phone",
+        "x 2024-01-03 2024-01-01 Pay rent pri:B",
+        "x Done without dates",
+        "Plain task",
+    ):
+        assert format_item(parse_line(line)) == line
+
+
+def test_format_uses_date_of_timestamps():
+    item = {"task": "t", "done": False, "priority": None, "created_at": "2024-01-02T10:00:00+00:00"}
+    assert format_item(item) == "2024-01-02 t"
+
+
+def test_parse_lines_skips_blanks():
+    assert [item["task"] for item in parse_lines(["a\n", "\n", "b\n"])] == ["a", "b"]